@@ -0,0 +1,262 @@
+"""
+Escritor de registros de acceso en segundo plano
+
+AccessLogMiddleware encola cada registro en una cola acotada en memoria y
+un hilo del proceso los guarda con bulk_create cada ACCESS_LOG_BATCH_SIZE
+registros o cada ACCESS_LOG_FLUSH_INTERVAL_MS, lo que ocurra primero. Si
+la cola se llena (picos de ingesta o base de datos lenta) los registros se
+descartan y se cuentan en `dropped` en lugar de frenar las peticiones.
+
+Además acumula en memoria las métricas por minuto de todas las peticiones
+(también las no muestreadas) y las suma a access_log_minutes con un upsert
+en cada flush.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AccessLogWriter:
+    """
+    Cola acotada + hilo que escribe AccessLog por lotes
+    """
+
+    def __init__(self):
+        self.enabled = settings.ACCESS_LOG_ASYNC
+        self.queue_size = settings.ACCESS_LOG_QUEUE_SIZE
+        self.batch_size = settings.ACCESS_LOG_BATCH_SIZE
+        self.flush_interval = settings.ACCESS_LOG_FLUSH_INTERVAL_MS / 1000
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.failed_aggregates = 0
+
+        self._lock = threading.Lock()
+        self._aggregates = {}
+        self._aggregates_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        atexit.register(self.shutdown)
+
+    def enqueue(self, log):
+        """
+        Encola un AccessLog sin guardar; nunca bloquea la petición
+
+        Returns:
+            bool: False si el registro se descartó por cola llena
+        """
+        if not self.enabled:
+            return self._write_now([log])
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(log)
+        except queue.Full:
+            self.dropped += 1
+            metrics.ACCESS_LOG_DROPPED.inc()
+            # Avisar la primera vez y luego cada 1000 descartes
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Cola de AccessLog llena: {self.dropped} registros descartados")
+            return False
+
+        self.enqueued += 1
+        return True
+
+    def record(self, timestamp, module, endpoint, method, status_code, response_time_ms):
+        """
+        Acumula una petición en el agregado por minuto del proceso
+
+        Solo actualiza un dict en memoria; el upsert lo hace el hilo.
+        """
+        from .models import AccessLogAggregate
+
+        if self.enabled:
+            self._ensure_started()
+
+        key = (timestamp.replace(second=0, microsecond=0), module, endpoint[:255], method, status_code)
+        with self._aggregates_lock:
+            entry = self._aggregates.get(key)
+            if entry is None:
+                # [count, latency_sum_ms, latency_max_ms, *buckets]
+                entry = self._aggregates[key] = [0] * (3 + len(AccessLogAggregate.BUCKET_FIELDS))
+            entry[0] += 1
+            if response_time_ms is not None:
+                entry[1] += response_time_ms
+                entry[2] = max(entry[2], response_time_ms)
+                entry[3 + AccessLogAggregate.bucket_index(response_time_ms)] += 1
+
+        if not self.enabled:
+            self._write_aggregates()
+
+    def stats(self):
+        """Contadores del proceso actual"""
+        return {
+            'async': self.enabled,
+            'pid': os.getpid(),
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'queue_size': self.queue_size,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'pending_aggregates': len(self._aggregates),
+            'failed_aggregates': self.failed_aggregates,
+        }
+
+    def flush(self):
+        """Guarda todo lo pendiente en el hilo que llama (apagado, tests)"""
+        if self._queue is None:
+            return
+        batch = []
+        while True:
+            try:
+                log = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if log is None:
+                continue
+            batch.append(log)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+        self._write_aggregates()
+
+    def shutdown(self, timeout=5):
+        """Detiene el hilo y guarda los registros pendientes"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        try:
+            # Despertar al hilo si está esperando en la cola
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.flush()
+
+    def _ensure_started(self):
+        # Después de un fork (gunicorn --preload) el hilo del padre no existe
+        # en el hijo: cada proceso arranca su propio hilo y su propia cola
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._stop = threading.Event()
+            # Lo acumulado antes del fork es del proceso padre
+            with self._aggregates_lock:
+                self._aggregates = {}
+            self._thread = threading.Thread(
+                target=self._run,
+                name='access-log-writer',
+                daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            timeout = deadline - time.monotonic()
+            if timeout > 0:
+                try:
+                    log = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    log = None
+                if log is not None:
+                    batch.append(log)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                metrics.ACCESS_LOG_QUEUE_DEPTH.set(self._queue.qsize())
+                self._write(batch)
+                batch = []
+                self._write_aggregates()
+                deadline = time.monotonic() + self.flush_interval
+
+        self._write(batch)
+        self._write_aggregates()
+        connection.close()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        if not self._write_now(batch):
+            # Conexión posiblemente rota: se reabre en el siguiente lote
+            connection.close()
+
+    def _write_aggregates(self):
+        with self._aggregates_lock:
+            pending, self._aggregates = self._aggregates, {}
+        if not pending:
+            return
+        try:
+            upsert_aggregates(pending)
+        except Exception as e:
+            self.failed_aggregates += len(pending)
+            logger.error(f"Error al guardar {len(pending)} agregados de acceso: {e}")
+            connection.close()
+
+    def _write_now(self, batch):
+        from .models import AccessLog
+
+        try:
+            AccessLog.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Error al guardar {len(batch)} AccessLog: {e}")
+            return False
+        self.written += len(batch)
+        return True
+
+
+def upsert_aggregates(pending, chunk_size=500):
+    """
+    Suma los agregados pendientes a access_log_minutes
+
+    Args:
+        pending: dict {(bucket, module, endpoint, method, status_code): [count,
+            latency_sum_ms, latency_max_ms, *buckets]}
+    """
+    from .models import AccessLogAggregate
+
+    table = AccessLogAggregate._meta.db_table
+    key_columns = ['bucket', 'module', 'endpoint', 'method', 'status_code']
+    sum_columns = ['count', 'latency_sum_ms', *AccessLogAggregate.BUCKET_FIELDS]
+    columns = key_columns + ['count', 'latency_sum_ms', 'latency_max_ms', *AccessLogAggregate.BUCKET_FIELDS]
+    updates = [f'{column} = {table}.{column} + EXCLUDED.{column}' for column in sum_columns]
+    updates.append(f'latency_max_ms = GREATEST({table}.latency_max_ms, EXCLUDED.latency_max_ms)')
+    row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+
+    # Orden fijo de claves: varios procesos haciendo upsert no se bloquean mutuamente
+    rows = [list(key) + values for key, values in sorted(pending.items())]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES {', '.join([row_placeholder] * len(chunk))} "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {', '.join(updates)}",
+                [value for row in chunk for value in row]
+            )
+
+
+# Instancia global
+access_log_writer = AccessLogWriter()
@@ -5,7 +5,7 @@ Configuracion del Django Admin para la app Accounts
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
-from .models import CustomUser, Rol, Permiso, AuditLog, AccessLog
+from .models import CustomUser, Rol, Permiso, AuditLog, AccessLog, AccessLogAggregate, TokenRevocation
 
 
 @admin.register(CustomUser)
@@ -225,3 +225,40 @@ class AccessLogAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """Solo superusuarios pueden eliminar logs"""
         return request.user.is_superuser
+
+
+@admin.register(AccessLogAggregate)
+class AccessLogAggregateAdmin(admin.ModelAdmin):
+    """
+    Admin para las métricas de acceso por minuto (solo lectura)
+    """
+    list_display = ['bucket', 'module', 'method', 'endpoint', 'status_code', 'count', 'latency_max_ms']
+    list_filter = ['module', 'method', 'status_code']
+    search_fields = ['endpoint']
+    ordering = ['-bucket']
+    date_hierarchy = 'bucket'
+    
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+    
+    def has_add_permission(self, request):
+        """No permitir agregar manualmente"""
+        return False
+
+
+@admin.register(TokenRevocation)
+class TokenRevocationAdmin(admin.ModelAdmin):
+    """
+    Admin para las revocaciones de claims de tokens JWT (solo lectura)
+    """
+    list_display = ['revoked_at', 'user_id', 'reason', 'expires_at']
+    list_filter = ['reason']
+    search_fields = ['user_id']
+    ordering = ['-revoked_at']
+    
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+    
+    def has_add_permission(self, request):
+        """Se crean desde las señales de usuarios, roles y dispositivos"""
+        return False
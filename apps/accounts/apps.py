@@ -9,3 +9,9 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts'
     verbose_name = 'Gestión de Usuarios y Roles'
+    
+    def ready(self):
+        """
+        Importar señales
+        """
+        import apps.accounts.signals  # noqa
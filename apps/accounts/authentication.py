@@ -0,0 +1,233 @@
+"""
+Autenticación JWT con el usuario en caché
+
+JWTAuthentication busca el usuario en cada petición y las clases de
+permisos leen después user.rol.nombre (otra consulta) y
+has_permission() los permisos del rol (una más por permiso). Aquí el
+usuario se carga una vez con su rol y los códigos de permiso del rol
+(CustomUser.permission_codes) y se guarda en la caché de Django
+AUTH_USER_CACHE_SECONDS: autenticar y verificar permisos no toca la base.
+
+Guardar o borrar el usuario descarta su entrada; cambios en roles o
+permisos descartan las de todos (ver signals.py). Con LocMemCache y varios
+procesos, los demás procesos ven el cambio al vencer la entrada.
+
+Con JWT_STATELESS_CLAIMS, login_view y el refresh
+(TokenRefreshWithClaimsSerializer) agregan al access token el rol, los
+permisos y los dispositivos asignados del usuario (claim CLAIM), y
+StatelessJWTAuthentication arma el usuario desde el token sin caché ni
+base. Los cambios de usuario, rol o asignación de dispositivos registran
+una TokenRevocation; cada proceso las mantiene en memoria (claims_denylist,
+recargada cada JWT_DENYLIST_REFRESH_SECONDS) y los tokens afectados vuelven
+a leer el usuario como CachedJWTAuthentication.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+VERSION_KEY = 'auth_user:version'
+
+# Claim del access token con los datos del usuario (modo sin estado)
+CLAIM = 'usr'
+
+# Con más dispositivos asignados el token no lleva claims (se lee de la base)
+MAX_DEVICE_CLAIMS = 500
+
+
+def _user_key(user_id):
+    return f'auth_user:{cache.get_or_set(VERSION_KEY, 1, None)}:{user_id}'
+
+
+def get_cached_user(user_id):
+    """Usuario con rol y permission_codes resueltos, None si no existe"""
+    key = _user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = get_user_model().objects.select_related('rol').filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).first()
+        if user is None:
+            return None
+        user.permission_codes  # se calcula antes de guardarlo en la caché
+        cache.set(key, user, settings.AUTH_USER_CACHE_SECONDS)
+    return user
+
+
+def forget_user(user_id):
+    """Descarta el usuario de la caché"""
+    cache.delete(_user_key(user_id))
+
+
+def forget_all_users():
+    """Descarta todos los usuarios en caché (cambió un rol o sus permisos)"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que obtiene el usuario de get_cached_user()"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+def add_user_claims(access_token, user):
+    """Agrega CLAIM al access token si JWT_STATELESS_CLAIMS está activo"""
+    from apps.devices.models import Dispositivo
+
+    if not settings.JWT_STATELESS_CLAIMS:
+        return access_token
+
+    dispositivos = list(
+        Dispositivo.objects.filter(operador_asignado=user)
+        .values_list('id', flat=True)[:MAX_DEVICE_CLAIMS + 1]
+    )
+    if len(dispositivos) > MAX_DEVICE_CLAIMS:
+        return access_token
+
+    access_token[CLAIM] = {
+        'username': user.username,
+        'is_superuser': user.is_superuser,
+        'rol': [user.rol_id, user.rol.nombre] if user.rol_id else None,
+        'permisos': sorted(user.permission_codes),
+        'dispositivos': dispositivos,
+    }
+    return access_token
+
+
+def user_from_claims(user_id, claims):
+    """
+    Usuario armado con los claims del token, sin consultar la base
+
+    Es una instancia sin guardar: sirve para permisos y filtros, no para
+    modificar el usuario.
+    """
+    from .models import Rol
+
+    user = get_user_model()(
+        id=user_id,
+        username=claims['username'],
+        is_superuser=claims['is_superuser'],
+        is_active=True,
+    )
+    user._state.adding = False
+    if claims['rol']:
+        user.rol = Rol(id=claims['rol'][0], nombre=claims['rol'][1])
+    user.__dict__['permission_codes'] = frozenset(claims['permisos'])
+    user.assigned_device_ids = frozenset(claims['dispositivos'])
+    return user
+
+
+class ClaimsDenylist:
+    """Revocaciones vigentes del proceso, recargadas periódicamente"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._all_users = 0.0
+        self._users = {}
+        self._loaded_at = None
+
+    def _load(self):
+        from .models import TokenRevocation
+
+        all_users, users = 0.0, {}
+        for user_id, revoked_at in TokenRevocation.objects.filter(
+            expires_at__gt=timezone.now()
+        ).values_list('user_id', 'revoked_at'):
+            revoked_at = revoked_at.timestamp()
+            if user_id is None:
+                all_users = max(all_users, revoked_at)
+            else:
+                users[user_id] = max(users.get(user_id, 0.0), revoked_at)
+        self._all_users, self._users = all_users, users
+        self._loaded_at = time.monotonic()
+
+    def _refresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > settings.JWT_DENYLIST_REFRESH_SECONDS:
+            with self._lock:
+                self._load()
+
+    def is_revoked(self, user_id, issued_at):
+        """True si los claims del token (emitido en issued_at, epoch) ya no valen"""
+        self._refresh()
+        return issued_at <= max(self._all_users, self._users.get(user_id, 0.0))
+
+    def revoke(self, user_id=None, reason=''):
+        """Revoca los claims de los tokens emitidos hasta ahora (user_id None = todos)"""
+        from .models import TokenRevocation
+
+        now = timezone.now()
+        TokenRevocation.objects.filter(expires_at__lte=now).delete()
+        TokenRevocation.objects.create(
+            user_id=user_id, reason=reason, revoked_at=now,
+            expires_at=now + api_settings.ACCESS_TOKEN_LIFETIME,
+        )
+        with self._lock:
+            if user_id is None:
+                self._all_users = now.timestamp()
+            else:
+                self._users[user_id] = now.timestamp()
+
+
+# Instancia global del proceso
+claims_denylist = ClaimsDenylist()
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    """
+    Autenticación que confía en los claims del token (ver add_user_claims)
+
+    Los tokens sin claims o con claims revocados se autentican como en
+    CachedJWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        claims = validated_token.get(CLAIM)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if (
+            claims is None or user_id is None
+            or claims_denylist.is_revoked(user_id, validated_token.get('iat', 0))
+        ):
+            return super().get_user(validated_token)
+        return user_from_claims(user_id, claims)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Mismo esquema de seguridad OpenAPI (jwtAuth) que JWTAuthentication"""
+    target_class = 'apps.accounts.authentication.CachedJWTAuthentication'
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Mismo esquema de seguridad OpenAPI (jwtAuth) que JWTAuthentication"""
+    target_class = 'apps.accounts.authentication.StatelessJWTAuthentication'
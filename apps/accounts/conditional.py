@@ -0,0 +1,108 @@
+"""
+Peticiones condicionales (ETag / Last-Modified) en los catálogos de la API
+
+Sensores, topics MQTT y brokers cambian poco, pero los front-ends los piden
+en cada pantalla. Los listados calculan un validador con una sola consulta
+de agregación sobre el queryset ya filtrado (count + max(updated_at)), sin
+serializar nada, y responden 304 Not Modified si coincide con
+If-None-Match.
+
+La ETag incluye el SQL del queryset (con los filtros por permisos, p. ej.
+los de operador, y los de búsqueda/orden), la query string y el tipo de
+respuesta negociado, así que dos alcances de permisos o dos filtros
+distintos nunca comparten validador. Las altas y ediciones cambian max(updated_at) y las
+bajas el conteo; queryset.update() no actualiza updated_at y no se detecta.
+Los campos serializados de otras tablas (p. ej. created_by_username de los
+sensores) solo se detectan si la vista lista la fecha de modificación de
+esa relación en related_validator_fields.
+"""
+
+import hashlib
+
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """ETag entrecomillada a partir de las partes dadas"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    HttpResponseNotModified si el cliente ya tiene esta versión, si no None
+
+    Solo se valida If-None-Match: Last-Modified es informativo, porque una
+    baja no lo cambia y If-Modified-Since daría 304 con datos viejos.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        _patch_headers(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified=None):
+    """Agrega ETag/Last-Modified a la respuesta y obliga a revalidar"""
+    if response.status_code == 200:
+        _patch_headers(response, etag, last_modified)
+    return response
+
+
+def _patch_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Respuestas por usuario: solo caché del navegador, siempre revalidando
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+
+
+def static_response(request, response):
+    """
+    Respuesta condicional para datos que no dependen de la base (p. ej. choices)
+
+    La ETag se calcula sobre response.data.
+    """
+    etag = make_etag(request.accepted_media_type, repr(response.data))
+    return not_modified(request, etag) or add_validators(response, etag)
+
+
+class ConditionalListMixin:
+    """
+    ViewSet cuyo listado responde 304 si el queryset filtrado no cambió
+
+    validator_field: campo de fecha de modificación del modelo.
+    related_validator_fields: fechas de modificación de las relaciones que
+    muestra el serializer (p. ej. 'created_by__updated_at'), para que editar
+    la fila relacionada también cambie la ETag.
+    """
+    validator_field = 'updated_at'
+    related_validator_fields = ()
+
+    def list_validators(self, queryset):
+        """(ETag, Last-Modified) del queryset ya filtrado"""
+        dates = (self.validator_field, *self.related_validator_fields)
+        summary = queryset.order_by().aggregate(
+            total=Count('pk'), **{f'last_{i}': Max(field) for i, field in enumerate(dates)}
+        )
+        lasts = [summary[f'last_{i}'] for i in range(len(dates))]
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            sql, params = '', ()
+
+        etag = make_etag(
+            queryset.model._meta.label, summary['total'], *(last and last.isoformat() for last in lasts),
+            sql, params, self.request.GET.urlencode(), self.request.accepted_media_type,
+        )
+        return etag, max((last for last in lasts if last), default=None)
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.list_validators(self.filter_queryset(self.get_queryset()))
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return add_validators(super().list(request, *args, **kwargs), etag, last_modified)
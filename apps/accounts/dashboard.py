@@ -0,0 +1,129 @@
+"""
+Estadísticas del dashboard (GET /api/dashboard/stats/)
+
+Los conteos de usuarios, sensores y dispositivos salen de una sola
+consulta con agregación condicional, y total_lecturas de la estimación de
+PostgreSQL (pg_class.reltuples) cuando la tabla es grande: contar millones
+de lecturas en cada carga del dashboard no aporta precisión útil. Por lo
+mismo mis_lecturas del operador se cuenta hasta
+DASHBOARD_EXACT_COUNT_LIMIT y por encima se estima con el planificador. El resultado se guarda
+en caché DASHBOARD_CACHE_SECONDS (grupo 'dashboard' de response_cache): el
+global, compartido por todos los usuarios, y la parte del operador por
+usuario. Las escrituras de dispositivos, sensores y usuarios invalidan la
+caché (ver signals.py).
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q, Subquery, Value
+
+from . import response_cache
+
+logger = logging.getLogger(__name__)
+
+
+def estimated_count(model):
+    """
+    Filas de la tabla del modelo según las estadísticas de PostgreSQL
+
+    Suma las particiones si la tabla está particionada. Si la estimación
+    no llega a DASHBOARD_EXACT_COUNT_LIMIT (o la tabla nunca se analizó)
+    se cuenta de verdad, que a ese tamaño es barato.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint,
+                   bool_or(c.reltuples < 0)
+            FROM pg_class c
+            WHERE c.oid = %s::regclass
+               OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+        """, [table, table])
+        estimate, never_analyzed = cursor.fetchone()
+
+    if never_analyzed or estimate < settings.DASHBOARD_EXACT_COUNT_LIMIT:
+        return model.objects.count()
+    return estimate
+
+
+def _conteo(queryset):
+    """COUNT(*) del queryset como subconsulta escalar"""
+    # Agrupar por una constante no genera GROUP BY: una fila con el total
+    return Subquery(queryset.order_by().values(_total=Value(1)).annotate(n=Count('*')).values('n'))
+
+
+def _global_stats():
+    from apps.devices.models import Dispositivo
+    from apps.readings.models import Lectura
+    from apps.sensors.models import Sensor
+    from .models import CustomUser
+
+    # Una sola consulta: agregación condicional sobre dispositivos y
+    # subconsultas escalares para sensores y usuarios. Sin GROUP BY devuelve
+    # una fila aunque no haya dispositivos.
+    stats = Dispositivo.objects.order_by().values(_total=Value(1)).annotate(
+        total_dispositivos=Count('id'),
+        dispositivos_activos=Count('id', filter=Q(estado='activo')),
+        dispositivos_mqtt=Count('id', filter=Q(mqtt_enabled=True)),
+        total_sensores=_conteo(Sensor.objects.all()),
+        sensores_activos=_conteo(Sensor.objects.filter(estado='activo')),
+        total_usuarios=_conteo(CustomUser.objects.all()),
+    ).values(
+        'total_usuarios', 'total_sensores', 'sensores_activos',
+        'total_dispositivos', 'dispositivos_activos', 'dispositivos_mqtt',
+    ).get()
+
+    return {**stats, 'total_lecturas': estimated_count(Lectura)}
+
+
+def estimated_queryset_count(queryset):
+    """
+    Filas del queryset, exactas hasta DASHBOARD_EXACT_COUNT_LIMIT
+
+    El conteo se corta en el límite (COUNT sobre una subconsulta con LIMIT);
+    si lo alcanza se usa la estimación de filas del planificador (EXPLAIN),
+    que no recorre la tabla.
+    """
+    limit = settings.DASHBOARD_EXACT_COUNT_LIMIT
+    queryset = queryset.order_by()
+    counted = queryset[:limit].count()
+    if counted < limit:
+        return counted
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return max(int(plan[0]['Plan']['Plan Rows']), limit)
+
+
+def _operator_stats(user):
+    from apps.devices.models import Dispositivo
+    from apps.readings.models import Lectura
+
+    return {
+        'mis_dispositivos': Dispositivo.objects.filter(operador_asignado=user).count(),
+        'mis_lecturas': estimated_queryset_count(
+            Lectura.objects.filter(dispositivo__operador_asignado=user)
+        ),
+    }
+
+
+def get_stats(user):
+    """
+    Estadísticas del dashboard para el usuario, desde la caché si están
+
+    Los operadores reciben además mis_dispositivos y mis_lecturas.
+    """
+    timeout = settings.DASHBOARD_CACHE_SECONDS
+
+    stats = response_cache.cached('dashboard', 'global', _global_stats, timeout)
+
+    if not user.is_superuser and user.rol and user.rol.nombre == 'operador':
+        stats = {
+            **stats,
+            **response_cache.cached('dashboard', f'user:{user.id}', lambda: _operator_stats(user), timeout),
+        }
+    return stats
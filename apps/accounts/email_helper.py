@@ -9,6 +9,8 @@ from django.utils.html import strip_tags
 from django.conf import settings
 import logging
 
+from .metrics import timed_notification
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +37,7 @@ class EmailNotifier:
         
         return True, "Configuración OK"
     
+    @timed_notification('email')
     def send_html_email(self, to_email, subject, html_content, text_content=None):
         """
         Envía un email con contenido HTML y texto plano alternativo
@@ -77,6 +80,7 @@ class EmailNotifier:
             logger.error(f"Error enviando email a {to_email}: {str(e)}")
             return False, {'error': str(e)}
     
+    @timed_notification('email')
     def send_simple_email(self, to_email, subject, message):
         """
         Envía un email simple de texto plano
@@ -322,8 +326,10 @@ class EmailNotifier:
         Returns:
             dict: Resumen de envíos
         """
-        if not recipients and sensor.dispositivo and sensor.dispositivo.operador_asignado:
-            recipients = [sensor.dispositivo.operador_asignado]
+        device = reading.dispositivo
+        
+        if not recipients and device and device.operador_asignado:
+            recipients = [device.operador_asignado]
         
         threshold_subjects = {
             'exceeded': f'⚠️ Umbral Excedido - Sensor {sensor.nombre}',
@@ -351,16 +357,16 @@ class EmailNotifier:
                 <h2>📊 Alerta de Lectura de Sensor</h2>
                 <div class="reading">
                     <p><strong>🔬 Sensor:</strong> {sensor.nombre}</p>
-                    <p><strong>📏 Tipo:</strong> {sensor.tipo_sensor.nombre if sensor.tipo_sensor else 'N/A'}</p>
+                    <p><strong>📏 Tipo:</strong> {sensor.get_tipo_display()}</p>
                     <p class="value">Valor: {reading.valor} {sensor.unidad_medida or ''}</p>
                     <p><strong>⏰ Timestamp:</strong> {reading.timestamp}</p>
                 </div>
                 <div class="sensor-info">
                     <p><strong>Información del Sensor:</strong></p>
-                    <p>📱 Dispositivo: {sensor.dispositivo.nombre if sensor.dispositivo else 'N/A'}</p>
-                    <p>📍 Ubicación: {sensor.ubicacion or 'No especificada'}</p>
+                    <p>📱 Dispositivo: {device.nombre if device else 'N/A'}</p>
+                    <p>📍 Ubicación: {(device.ubicacion if device else '') or 'No especificada'}</p>
                     <p>🔢 Estado: {sensor.get_estado_display()}</p>
-                    <p>📡 Intervalo de lectura: {sensor.intervalo_lectura} segundos</p>
+                    <p>📏 Rango permitido: {sensor.rango_min} - {sensor.rango_max} {sensor.unidad_medida}</p>
                 </div>
             </div>
         </body>
@@ -0,0 +1,220 @@
+"""
+Serialización rápida de listados a partir de .values_list()
+
+En los listados grandes la mayor parte del tiempo se va en DRF, no en la
+base: crear una instancia del modelo por fila, resolver cada `source`
+(sensor.nombre) y pasar cada valor por el campo. ValuesSerializer compila
+una vez los campos de un ModelSerializer en columnas de values_list() con
+sus joins y un conversor por campo, y arma cada fila directamente. La
+salida JSON es idéntica a la del serializer; los campos que no puede
+compilar (anidados, SerializerMethodField sin anotación, source='*', etc.)
+hacen que la vista use el serializer normal.
+
+Se activa con FAST_SERIALIZERS_ENABLED en las vistas con FastListMixin,
+que compila cada combinación de vista, serializer y campos pedidos una sola
+vez por proceso.
+"""
+
+from collections import OrderedDict
+import threading
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.fields import empty
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+# Campos cuyo to_representation deja igual el valor que entrega psycopg
+_IDENTITY_FIELDS = (
+    drf_fields.IntegerField, drf_fields.CharField, drf_fields.BooleanField, drf_fields.ChoiceField,
+)
+
+_SKIP = object()
+
+# Planes compilados por proceso; ?fields= admite muchas combinaciones, así
+# que al superarlo se descarta el usado hace más tiempo
+MAX_PLANS = 256
+
+
+class Unsupported(Exception):
+    """El serializer tiene un campo que no se puede compilar a columnas"""
+
+
+class ValuesSerializer:
+    """
+    Campos de un ModelSerializer compilados a columnas de values_list()
+
+    method_fields mapea SerializerMethodField a una anotación del queryset
+    que da el mismo valor (p. ej. {'cantidad_sensores': 'num_sensores'}).
+    """
+
+    def __init__(self, serializer, method_fields=None):
+        self.model = serializer.Meta.model
+        self.method_fields = method_fields or {}
+        self.columns = []
+        self.accessors = []
+        for field in serializer._readable_fields:
+            self.accessors.append(self._compile(field))
+
+    def _column(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+        return self.columns.index(path)
+
+    def _model_field(self, name):
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise Unsupported(name)
+
+    def _compile(self, field):
+        """(nombre, índice, conversor, índice de la FK que debe existir)"""
+        name = field.field_name
+
+        if isinstance(field, drf_fields.SerializerMethodField):
+            if name not in self.method_fields:
+                raise Unsupported(name)
+            return name, self._column(self.method_fields[name]), None, None
+
+        if isinstance(field, (BaseSerializer, relations.ManyRelatedField)) or field.source == '*':
+            raise Unsupported(name)
+        if isinstance(field, drf_fields.FileField):
+            # La URL depende del request y el plan se comparte entre peticiones
+            raise Unsupported(name)
+
+        attrs = field.source_attrs
+        if len(attrs) == 1 and attrs[0].startswith('get_') and attrs[0].endswith('_display'):
+            model_field = self._model_field(attrs[0][4:-8])
+            choices = dict(model_field.flatchoices)
+            return name, self._column(model_field.name), lambda value: str(choices.get(value, value)), None
+
+        if isinstance(field, relations.PrimaryKeyRelatedField) and len(attrs) == 1:
+            # values_list() de la FK ya es la pk del relacionado
+            return name, self._column(self._model_field(attrs[0]).name), None, None
+        if isinstance(field, relations.RelatedField):
+            raise Unsupported(name)
+
+        if len(attrs) == 1:
+            self._model_field(attrs[0])
+            return name, self._column(attrs[0]), self._converter(field), None
+
+        if len(attrs) == 2:
+            # sensor.nombre: DRF omite el campo (o usa default/None) si la FK es nula
+            relation = self._model_field(attrs[0])
+            if not relation.is_relation or relation.many_to_many or relation.one_to_many:
+                raise Unsupported(name)
+            return (
+                name,
+                self._column('__'.join(attrs)),
+                self._converter(field),
+                (self._column(relation.name), field),
+            )
+
+        raise Unsupported(name)
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, _IDENTITY_FIELDS) or (
+            isinstance(field, drf_fields.JSONField) and not field.binary
+        ) or type(field) is drf_fields.FloatField:
+            return None
+        return field.to_representation
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def to_representation(self, rows):
+        accessors = self.accessors
+        data = []
+        for row in rows:
+            item = {}
+            for name, index, convert, required in accessors:
+                if required is not None and row[required[0]] is None:
+                    value = self._missing_relation(required[1])
+                    if value is _SKIP:
+                        continue
+                    item[name] = value
+                    continue
+                value = row[index]
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+    @staticmethod
+    def _missing_relation(field):
+        # Mismo criterio que Field.get_attribute ante un AttributeError
+        if field.default is not empty:
+            return field.get_default()
+        if field.allow_null:
+            return None
+        return _SKIP
+
+
+class _PlanCache:
+    """ValuesSerializer compilados (o None si no se pueden compilar), LRU"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plans = OrderedDict()
+
+    def get(self, key, compile):
+        with self._lock:
+            if key in self._plans:
+                self._plans.move_to_end(key)
+                return self._plans[key]
+
+        try:
+            plan = compile()
+        except Unsupported:
+            plan = None
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > MAX_PLANS:
+                self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans = OrderedDict()
+
+
+# Instancia global del proceso
+plan_cache = _PlanCache()
+
+
+class FastListMixin:
+    """
+    ViewSet cuyo listado usa ValuesSerializer cuando los campos pedidos lo permiten
+
+    fast_method_fields: ver ValuesSerializer. Las acciones propias pueden
+    usar fast_serializer() igual que list().
+    """
+    fast_actions = ('list',)
+    fast_method_fields = {}
+
+    def fast_serializer(self):
+        """
+        ValuesSerializer para la acción actual, o None si no aplica
+
+        Se compila una vez por (vista, serializer, campos pedidos con
+        ?fields= / ?expand=): las peticiones siguientes no instancian el
+        serializer.
+        """
+        if not settings.FAST_SERIALIZERS_ENABLED or self.action not in self.fast_actions:
+            return None
+        requested = self.requested_fields() if hasattr(self, 'requested_fields') else None
+        key = (type(self), self.get_serializer_class(), None if requested is None else frozenset(requested))
+        return plan_cache.get(key, lambda: ValuesSerializer(self.get_serializer(), self.fast_method_fields))
+
+    def list(self, request, *args, **kwargs):
+        fast = self.fast_serializer()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.to_representation(page))
+        return Response(fast.to_representation(queryset))
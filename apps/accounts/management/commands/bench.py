@@ -0,0 +1,72 @@
+"""
+Management command que ejecuta el benchmark de la API (benchmarks.bench_api)
+
+Guarda el resultado en JSON y, con --baseline, lo compara con una corrida
+anterior: termina con error si el p50 de algún escenario empeoró más que la
+tolerancia. Pensado para CI, siempre con los mismos tamaños de flota:
+    python manage.py bench --salida bench.json --baseline benchmarks/baseline.json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import bench_api
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia y throughput de los endpoints principales sobre una flota sintética'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dispositivos', type=int, default=200, help='Dispositivos de la flota (default: 200)')
+        parser.add_argument('--sensores', type=int, default=4, help='Sensores por dispositivo (default: 4)')
+        parser.add_argument('--lecturas', type=int, default=100, help='Lecturas por sensor (default: 100)')
+        parser.add_argument('--repeticiones', type=int, default=50, help='Peticiones por escenario (default: 50)')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+        parser.add_argument('--baseline', help='Resultado JSON anterior con el que comparar')
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=20.0,
+            help='Empeoramiento de p50 permitido respecto al baseline, en %% (default: 20)',
+        )
+        parser.add_argument('--conservar', action='store_true', help='No borrar la flota al terminar')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as archivo:
+                    baseline = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer el baseline: {e}")
+
+        try:
+            resultados = bench_api.ejecutar(
+                options['dispositivos'],
+                options['sensores'],
+                options['lecturas'],
+                options['repeticiones'],
+                conservar=options['conservar'],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as salida:
+                json.dump(resultados, salida, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"\n✓ Resultado guardado en {options['salida']}"))
+
+        if baseline is None:
+            return
+
+        regresiones = bench_api.comparar(resultados, baseline, options['tolerancia'])
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Sin regresiones respecto al baseline (tolerancia {options['tolerancia']}%)"
+            ))
+            return
+
+        for nombre, anterior, actual, cambio in regresiones:
+            self.stdout.write(self.style.ERROR(f'  ✗ {nombre}: p50 {anterior} → {actual} ms (+{cambio}%)'))
+        raise CommandError(f'{len(regresiones)} escenarios con regresión')
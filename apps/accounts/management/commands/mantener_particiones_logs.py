@@ -0,0 +1,87 @@
+"""
+Management command para mantener las particiones de access_logs y audit_logs
+
+Crea las particiones del mes actual y de los próximos meses, y elimina (o
+archiva y elimina) las que quedaron fuera de la retención. Pensado para
+ejecutarse a diario (cron):
+    python manage.py mantener_particiones_logs --archivar-en /backups/logs
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.accounts import partitions
+
+
+class Command(BaseCommand):
+    help = 'Crea particiones futuras y aplica la retención de access_logs y audit_logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-futuros',
+            type=int,
+            default=settings.LOG_PARTITIONS_AHEAD_MONTHS,
+            help='Meses por adelantado a crear (default: LOG_PARTITIONS_AHEAD_MONTHS)',
+        )
+        parser.add_argument(
+            '--archivar-en',
+            default=settings.LOG_ARCHIVE_DIR,
+            help='Directorio donde exportar las particiones antes de borrarlas (default: LOG_ARCHIVE_DIR)',
+        )
+        parser.add_argument(
+            '--separar-historico',
+            action='store_true',
+            help='Mover las filas de la partición por defecto a particiones mensuales',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar las particiones vencidas sin borrarlas',
+        )
+
+    def handle(self, *args, **options):
+        for table in partitions.PARTITIONED_TABLES:
+            self.stdout.write(f'\n📦 {table}')
+
+            months = []
+            if options['separar_historico']:
+                months.extend(partitions.default_partition_months(table))
+            month = partitions.month_start(timezone.now())
+            for _ in range(options['meses_futuros'] + 1):
+                months.append(month)
+                month = partitions.next_month(month)
+
+            retention = partitions.retention_days(table)
+            for month in months:
+                # Los meses vencidos del histórico se borran de la partición por defecto
+                if options['dry_run'] or partitions.is_expired(month, retention):
+                    continue
+                moved = partitions.ensure_partition(table, month)
+                if moved is not None:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'  ✓ {partitions.partition_name(table, month)} creada ({moved} filas movidas)'
+                    ))
+
+            if not retention:
+                self.stdout.write('  ∞ Sin retención configurada')
+                continue
+
+            for name, _ in partitions.expired_partitions(table, retention):
+                if options['dry_run']:
+                    self.stdout.write(self.style.WARNING(f'  ⚠ {name} vencida (dry-run)'))
+                    continue
+                if options['archivar_en']:
+                    path = partitions.archive_partition(name, options['archivar_en'])
+                    self.stdout.write(f'  📁 {name} archivada en {path}')
+                partitions.drop_partition(name)
+                self.stdout.write(self.style.SUCCESS(f'  🗑 {name} eliminada'))
+
+            if not options['dry_run']:
+                deleted = partitions.purge_default_partition(table, retention)
+                if deleted:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'  🗑 {deleted} filas vencidas eliminadas de {partitions.default_partition(table)}'
+                    ))
+
+            self.stdout.write(f'  Retención: {retention} días')
@@ -0,0 +1,81 @@
+"""
+Management command para llenar access_log_minutes a partir de access_logs
+
+Útil para el histórico anterior a los agregados. Solo inserta los minutos
+que aún no existen (ON CONFLICT DO NOTHING), así que no duplica lo que ya
+registró el escritor. Los conteos usan sample_weight, por lo que en módulos
+muestreados son una estimación.
+    python manage.py reconstruir_agregados_acceso --desde 2024-01-01
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.dateparse import parse_datetime, parse_date
+
+from apps.accounts.models import AccessLog, AccessLogAggregate
+
+
+def _parse_fecha(valor):
+    fecha = parse_datetime(valor) or parse_date(valor)
+    if fecha is None:
+        raise CommandError(f'Fecha inválida: {valor}')
+    return fecha
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los agregados por minuto de access_logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_parse_fecha, help='Fecha/hora inicial (inclusive)')
+        parser.add_argument('--hasta', type=_parse_fecha, help='Fecha/hora final (exclusive)')
+
+    def handle(self, *args, **options):
+        # Un bucket por límite: (límite anterior, límite]
+        limites = (None,) + AccessLogAggregate.LATENCY_BUCKETS
+        buckets = []
+        for inferior, superior in zip(limites, limites[1:]):
+            condicion = f'response_time_ms <= {superior}'
+            if inferior is not None:
+                condicion = f'response_time_ms > {inferior} AND {condicion}'
+            buckets.append(f'ROUND(COALESCE(SUM(sample_weight) FILTER (WHERE {condicion}), 0))')
+        buckets.append(
+            f'ROUND(COALESCE(SUM(sample_weight) FILTER '
+            f'(WHERE response_time_ms > {limites[-1]}), 0))'
+        )
+
+        condiciones = []
+        params = [AccessLogAggregate.ENDPOINT_ID_PATTERN]
+        if options['desde']:
+            condiciones.append('timestamp >= %s')
+            params.append(options['desde'])
+        if options['hasta']:
+            condiciones.append('timestamp < %s')
+            params.append(options['hasta'])
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+
+        columnas = [
+            'bucket', 'module', 'endpoint', 'method', 'status_code',
+            'count', 'latency_sum_ms', 'latency_max_ms', *AccessLogAggregate.BUCKET_FIELDS
+        ]
+        sql = f"""
+            INSERT INTO {AccessLogAggregate._meta.db_table} ({', '.join(columnas)})
+            SELECT date_trunc('minute', timestamp),
+                   module,
+                   LEFT(regexp_replace(endpoint, %s, '/{{id}}', 'g'), 255),
+                   method,
+                   status_code,
+                   ROUND(SUM(sample_weight)),
+                   ROUND(COALESCE(SUM(response_time_ms * sample_weight), 0)),
+                   COALESCE(MAX(response_time_ms), 0),
+                   {', '.join(buckets)}
+            FROM {AccessLog._meta.db_table}
+            {where}
+            GROUP BY 1, 2, 3, 4, 5
+            ON CONFLICT (bucket, module, endpoint, method, status_code) DO NOTHING
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            insertados = cursor.rowcount
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Agregados por minuto insertados: {insertados}'))
@@ -0,0 +1,100 @@
+"""
+Management command que fija las consultas SQL de los endpoints de listado
+
+Pide cada endpoint de listado (`*-list`) con page_size 1, 10 y 100 y cuenta
+las consultas. En un listado sin N+1 el número de consultas no depende del
+tamaño de la página; si crece con las filas devueltas se marca como N+1.
+También compara el máximo con el presupuesto de la vista
+(QUERY_BUDGET_DEFAULT / QUERY_BUDGET_PER_VIEW). Pensado para CI, sobre una
+base con datos suficientes:
+    python manage.py verificar_consultas --estricto
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework.test import APIClient
+
+from apps.accounts.models import CustomUser
+from apps.accounts.query_budget import budget_for
+
+PAGE_SIZES = (1, 10, 100)
+
+
+class Command(BaseCommand):
+    help = 'Cuenta las consultas SQL de los listados con 1, 10 y 100 filas por página'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Usuario con el que se consulta (default: primer superusuario)')
+        parser.add_argument('--vista', action='append', help='Limitar a estas vistas (p. ej. device-list)')
+        parser.add_argument(
+            '--estricto',
+            action='store_true',
+            help='Terminar con error si hay N+1 o presupuestos superados',
+        )
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            user = CustomUser.objects.filter(username=options['usuario']).first()
+        else:
+            user = CustomUser.objects.filter(is_superuser=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No hay usuario con el que consultar')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+
+        views = sorted(
+            name for name in get_resolver().reverse_dict
+            if isinstance(name, str) and name.endswith('-list')
+        )
+        if options['vista']:
+            views = [name for name in views if name in options['vista']]
+
+        self.stdout.write(f"{'Vista':<32} {'Filas':>13} {'Consultas':>13} {'Presup.':>8}  Resultado")
+        failures = []
+        for view in views:
+            rows, queries = [], []
+            error = None
+            for size in PAGE_SIZES:
+                try:
+                    with CaptureQueriesContext(connection) as captured:
+                        response = client.get(f'{reverse(view)}?page_size={size}', HTTP_HOST=host)
+                except Exception as e:
+                    error = str(e)
+                    break
+                if response.status_code != 200:
+                    error = f'HTTP {response.status_code}'
+                    break
+                data = response.data
+                results = data.get('results', data) if isinstance(data, dict) else data
+                rows.append(len(results))
+                queries.append(len(captured))
+
+            if error:
+                self.stdout.write(self.style.WARNING(f'{view:<32} ⚠ {error}'))
+                continue
+
+            budget = budget_for(view)
+            if queries[-1] > queries[0] and rows[-1] > rows[0]:
+                result, style = '✗ N+1', self.style.ERROR
+            elif max(queries) > budget:
+                result, style = '✗ presupuesto', self.style.ERROR
+            elif rows[-1] == rows[0]:
+                result, style = '? faltan datos', self.style.WARNING
+            else:
+                result, style = '✓', self.style.SUCCESS
+            if result.startswith('✗'):
+                failures.append(view)
+
+            self.stdout.write(style(
+                f"{view:<32} {'/'.join(map(str, rows)):>13} {'/'.join(map(str, queries)):>13} {budget:>8}  {result}"
+            ))
+
+        if failures and options['estricto']:
+            raise CommandError(f"Vistas con problemas: {', '.join(failures)}")
+        if not failures:
+            self.stdout.write(self.style.SUCCESS('\n✓ Sin N+1 ni presupuestos superados'))
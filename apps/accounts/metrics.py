@@ -0,0 +1,156 @@
+"""
+Métricas Prometheus de la plataforma
+
+Las métricas se definen aquí y se exponen en /metrics (ver metrics_view).
+Los contadores viven en memoria del proceso: medir no toca la base de datos
+ni otros procesos. Con PROMETHEUS_MULTIPROC_DIR configurado (gunicorn con
+varios workers) cada proceso escribe sus valores en archivos mmap de ese
+directorio y el scrape suma los de todos los workers; gunicorn.conf.py
+marca como terminados los workers que salen (child_exit) para que sus
+gauges dejen de sumarse.
+"""
+
+import functools
+import logging
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Latencia de las peticiones por vista y acción',
+    ['view', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Consultas SQL por petición',
+    ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds',
+    'Tiempo en la base de datos por petición',
+    ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+SERIALIZER_SECONDS = Histogram(
+    'serializer_seconds',
+    'Tiempo en generar serializer.data',
+    ['serializer'],
+    buckets=LATENCY_BUCKETS,
+)
+READINGS_INGESTED = Counter(
+    'readings_ingested_total',
+    'Lecturas procesadas por la ingesta',
+    ['result'],
+)
+INGESTION_BATCH_SIZE = Histogram(
+    'ingestion_batch_size',
+    'Lecturas por lote de ingesta',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+ACCESS_LOG_QUEUE_DEPTH = Gauge(
+    'access_log_queue_depth',
+    'Registros de acceso esperando en la cola del escritor',
+    multiprocess_mode='livesum',
+)
+ACCESS_LOG_DROPPED = Counter(
+    'access_log_dropped_total',
+    'Registros de acceso descartados por cola llena',
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    'response_cache_requests_total',
+    'Consultas a la caché de respuestas por grupo',
+    ['group', 'result'],
+)
+NOTIFICATION_LATENCY = Histogram(
+    'notification_send_seconds',
+    'Latencia de envío de notificaciones',
+    ['channel', 'result'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def status_class(status_code):
+    """200 -> '2xx': acota la cardinalidad de la etiqueta status"""
+    return f'{status_code // 100}xx'
+
+
+def timed_notification(channel):
+    """
+    Decorador para métodos de envío que devuelven (éxito, datos)
+
+    Registra la latencia en NOTIFICATION_LATENCY con el resultado.
+    """
+    def decorator(send):
+        @functools.wraps(send)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = send(*args, **kwargs)
+            success = isinstance(result, tuple) and result and result[0]
+            NOTIFICATION_LATENCY.labels(channel, 'ok' if success else 'error').observe(
+                time.perf_counter() - start
+            )
+            return result
+        return wrapper
+    return decorator
+
+
+class TimedSerializerMixin:
+    """
+    Serializer que mide serializer.data en SERIALIZER_SECONDS
+
+    Para medir también los listados (many=True) el serializer declara
+    Meta.list_serializer_class = TimedListSerializer; el listado se registra
+    con el nombre del serializer hijo. Los serializers anidados no pasan por
+    .data, así que no se cuentan dos veces.
+    """
+
+    @property
+    def data(self):
+        if not settings.METRICS_ENABLED:
+            return super().data
+        start = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            serializer = getattr(self, 'child', self)
+            SERIALIZER_SECONDS.labels(type(serializer).__name__).observe(time.perf_counter() - start)
+
+
+class TimedListSerializer(TimedSerializerMixin, ListSerializer):
+    """ListSerializer de los serializers con TimedSerializerMixin"""
+
+
+def metrics_view(request):
+    """
+    Expone las métricas en formato de texto de Prometheus
+    GET /metrics
+
+    Solo responde a las IPs de METRICS_ALLOWED_IPS (vacío = cualquiera).
+    """
+    if not settings.METRICS_ENABLED:
+        return HttpResponseNotFound()
+
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
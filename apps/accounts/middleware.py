@@ -2,10 +2,17 @@
 Middleware para auditoría y registro de accesos
 """
 
+import random
+import re
 import time
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 from django.urls import resolve
-from .models import AccessLog
+from .models import AccessLog, AccessLogAggregate
+from .access_log_writer import access_log_writer
+from . import metrics, query_budget
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,6 +49,14 @@ class AccessLogMiddleware(MiddlewareMixin):
         '/api/redoc/': 'api_docs',
     }
     
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.default_sample_rate = settings.ACCESS_LOG_SAMPLE_RATE_DEFAULT
+        self.sample_rates = settings.ACCESS_LOG_SAMPLE_RATES
+        self.exclude_patterns = [
+            re.compile(pattern) for pattern in settings.ACCESS_LOG_EXCLUDE_PATTERNS
+        ]
+    
     def process_request(self, request):
         """Marca el tiempo de inicio de la petición"""
         request._start_time = time.time()
@@ -59,6 +74,10 @@ class AccessLogMiddleware(MiddlewareMixin):
         if not path.startswith('/api/') and not path.startswith('/admin/'):
             return response
         
+        # Exclusiones configuradas por expresión regular
+        if any(pattern.search(path) for pattern in self.exclude_patterns):
+            return response
+        
         # Calcular tiempo de respuesta
         response_time_ms = None
         if hasattr(request, '_start_time'):
@@ -66,13 +85,32 @@ class AccessLogMiddleware(MiddlewareMixin):
         
         # Determinar módulo
         module = self._get_module_from_path(path)
+        timestamp = timezone.now()
+        
+        # Las métricas por minuto cuentan todas las peticiones, antes del muestreo
+        try:
+            access_log_writer.record(
+                timestamp,
+                module,
+                AccessLogAggregate.normalize_endpoint(path),
+                request.method,
+                response.status_code,
+                response_time_ms,
+            )
+        except Exception as e:
+            logger.error(f"Error al agregar métricas de acceso: {e}")
+        
+        # Muestrear las respuestas exitosas según el módulo
+        sample_weight = self._get_sample_weight(module, response.status_code, response_time_ms)
+        if sample_weight is None:
+            return response
         
         # Obtener información del usuario
-        user = None
+        user_id = None
         username = 'anonymous'
         if hasattr(request, 'user') and request.user.is_authenticated:
-            user = request.user
-            username = user.username
+            user_id = request.user.pk
+            username = request.user.username
         
         # Obtener IP
         ip_address = self._get_client_ip(request)
@@ -83,10 +121,10 @@ class AccessLogMiddleware(MiddlewareMixin):
         # Obtener query params
         query_params = dict(request.GET.items()) if request.GET else {}
         
-        # Crear registro de acceso (de forma asíncrona para no afectar el response)
+        # Encolar el registro: un hilo lo guarda por lotes fuera del request
         try:
-            AccessLog.objects.create(
-                user=user,
+            access_log_writer.enqueue(AccessLog(
+                user_id=user_id,
                 username=username,
                 module=module,
                 endpoint=path,
@@ -99,8 +137,10 @@ class AccessLogMiddleware(MiddlewareMixin):
                 metadata={
                     'content_type': request.content_type,
                     'response_reason': getattr(response, 'reason_phrase', ''),
-                }
-            )
+                },
+                sample_weight=sample_weight,
+                timestamp=timestamp,
+            ))
         except Exception as e:
             # No fallar el request si hay error en logging
             logger.error(f"Error al crear AccessLog: {e}")
@@ -114,6 +154,21 @@ class AccessLogMiddleware(MiddlewareMixin):
                 return module
         return 'other'
     
+    def _get_sample_weight(self, module, status_code, response_time_ms):
+        """
+        Peso del registro (1 / tasa de muestreo) o None si no se registra.
+        Errores y peticiones lentas se registran siempre con peso 1.
+        """
+        if status_code >= 400 or (response_time_ms or 0) > AccessLog.SLOW_THRESHOLD_MS:
+            return 1.0
+        
+        rate = self.sample_rates.get(module, self.default_sample_rate)
+        if rate >= 1:
+            return 1.0
+        if rate <= 0 or random.random() >= rate:
+            return None
+        return 1.0 / rate
+    
     def _get_client_ip(self, request):
         """Obtiene la IP real del cliente"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -124,6 +179,79 @@ class AccessLogMiddleware(MiddlewareMixin):
         return ip
 
 
+class MetricsMiddleware:
+    """
+    Middleware que mide latencia y consultas SQL de cada petición
+    Los valores quedan en las métricas Prometheus del proceso (ver metrics.py)
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.METRICS_ENABLED
+    
+    def __call__(self, request):
+        if not self.enabled or request.path == '/metrics':
+            return self.get_response(request)
+        
+        queries = _QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        
+        try:
+            # view_name de DRF incluye la acción: 'lectura-list', 'lectura-estadisticas'
+            match = request.resolver_match
+            view = match.view_name if match else 'unresolved'
+            metrics.REQUEST_LATENCY.labels(
+                view, request.method, metrics.status_class(response.status_code)
+            ).observe(elapsed)
+            metrics.REQUEST_DB_QUERIES.labels(view).observe(queries.count)
+            metrics.REQUEST_DB_SECONDS.labels(view).observe(queries.seconds)
+        except Exception as e:
+            logger.error(f"Error al registrar métricas: {e}")
+        
+        return response
+
+
+class _QueryTimer:
+    """execute_wrapper que cuenta y cronometra las consultas SQL"""
+    
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware de desarrollo/CI que controla las consultas SQL por vista
+    Solo se instala con QUERY_BUDGET_ENABLED (ver query_budget.py)
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        recorder = query_budget.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        response['X-Query-Count'] = str(recorder.count)
+        query_budget.check(view, recorder)
+        
+        return response
+
+
 class AuditMiddleware(MiddlewareMixin):
     """
     Middleware para auditoría de cambios en modelos críticos
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_email_notifications_enabled_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesslog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='Momento de la petición (no de la escritura, que es diferida)', verbose_name='Fecha y Hora'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_access_log_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesslog',
+            name='sample_weight',
+            field=models.FloatField(default=1.0, help_text='Peticiones que representa este registro (1 / tasa de muestreo)', verbose_name='Peso de Muestreo'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_access_log_sample_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessLogAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='Minuto')),
+                ('module', models.CharField(choices=[('auth', 'Autenticación'), ('users', 'Usuarios'), ('roles', 'Roles'), ('permissions', 'Permisos'), ('devices', 'Dispositivos'), ('sensors', 'Sensores'), ('readings', 'Lecturas'), ('mqtt', 'MQTT'), ('emqx', 'EMQX'), ('admin', 'Administración'), ('api_docs', 'Documentación API'), ('other', 'Otro')], max_length=20, verbose_name='Módulo')),
+                ('endpoint', models.CharField(help_text='Path con los ids numéricos reemplazados por {id}', max_length=255, verbose_name='Endpoint')),
+                ('method', models.CharField(max_length=10, verbose_name='Método HTTP')),
+                ('status_code', models.IntegerField(verbose_name='Código de Estado')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Peticiones')),
+                ('latency_sum_ms', models.BigIntegerField(default=0, verbose_name='Suma de Latencias (ms)')),
+                ('latency_max_ms', models.IntegerField(default=0, verbose_name='Latencia Máxima (ms)')),
+                ('le_10', models.BigIntegerField(default=0)),
+                ('le_25', models.BigIntegerField(default=0)),
+                ('le_50', models.BigIntegerField(default=0)),
+                ('le_100', models.BigIntegerField(default=0)),
+                ('le_250', models.BigIntegerField(default=0)),
+                ('le_500', models.BigIntegerField(default=0)),
+                ('le_1000', models.BigIntegerField(default=0)),
+                ('le_2000', models.BigIntegerField(default=0)),
+                ('le_5000', models.BigIntegerField(default=0)),
+                ('le_inf', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Agregado de Accesos',
+                'verbose_name_plural': 'Agregados de Accesos',
+                'db_table': 'access_log_minutes',
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['-bucket'], name='idx_access_minute_bucket'), models.Index(fields=['module', '-bucket'], name='idx_access_minute_module')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='accesslogaggregate',
+            constraint=models.UniqueConstraint(fields=('bucket', 'module', 'endpoint', 'method', 'status_code'), name='uniq_access_minute_key'),
+        ),
+    ]
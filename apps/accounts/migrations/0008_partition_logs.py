@@ -0,0 +1,84 @@
+# Particiona access_logs y audit_logs por mes (rango de timestamp).
+#
+# La tabla existente no se copia: se renombra a <tabla>_default y se adjunta
+# como partición por defecto de la nueva tabla particionada. Las particiones
+# mensuales las crea `python manage.py mantener_particiones_logs`, que además
+# puede separar el histórico de la partición por defecto (--separar-historico).
+#
+# La clave primaria pasa a ser (id, timestamp), como exige PostgreSQL para
+# tablas particionadas; id sigue siendo único porque sale de una secuencia.
+#
+# Requiere una ventana de mantenimiento en instalaciones con histórico: la
+# migración corre en una transacción con ACCESS EXCLUSIVE sobre ambas tablas
+# mientras crea la clave primaria, los índices y las claves foráneas sobre
+# todo el histórico (la partición por defecto). Mientras dura, toda petición
+# que registra un acceso o una auditoría queda bloqueada; el tiempo crece
+# con las filas existentes. Antes de migrar conviene detener los workers y
+# borrar los registros de acceso vencidos (ver INSTALL.md).
+
+from django.db import migrations
+
+TABLES = ['access_logs', 'audit_logs']
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            default = f'{table}_default'
+            sequence = f'{table}_id_seq'
+
+            cursor.execute(
+                "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) "
+                "FROM pg_index WHERE indrelid = %s::regclass AND NOT indisprimary",
+                [table]
+            )
+            indexes = cursor.fetchall()
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [table]
+            )
+            foreign_keys = cursor.fetchall()
+
+            # La tabla actual pasa a ser la partición por defecto
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {default}")
+            cursor.execute(f"ALTER TABLE {default} DROP CONSTRAINT {table}_pkey")
+            for name, _ in foreign_keys:
+                cursor.execute(f"ALTER TABLE {default} DROP CONSTRAINT {name}")
+            for name, _ in indexes:
+                cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_default"')
+
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {default}")
+            next_id = cursor.fetchone()[0]
+            cursor.execute(f"ALTER TABLE {default} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+
+            cursor.execute(
+                f"CREATE TABLE {table} (LIKE {default} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                f'PARTITION BY RANGE ("timestamp")'
+            )
+            cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.id")
+            cursor.execute("SELECT setval(%s, %s, false)", [sequence, next_id])
+            cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+            cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, "timestamp")')
+            # Los índices de la partición por defecto equivalentes se reutilizan
+            for _, definition in indexes:
+                cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_access_log_aggregates'),
+    ]
+
+    operations = [
+        # Al revertir las tablas quedan particionadas; para el ORM son equivalentes
+        migrations.RunPython(partition_tables, migrations.RunPython.noop, elidable=False),
+    ]
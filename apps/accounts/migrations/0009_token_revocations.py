@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_partition_logs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(blank=True, help_text='Vacío = tokens de todos los usuarios', null=True, verbose_name='Usuario')),
+                ('reason', models.CharField(max_length=50, verbose_name='Motivo')),
+                ('revoked_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Revocación')),
+                ('expires_at', models.DateTimeField(verbose_name='Vigente Hasta')),
+            ],
+            options={
+                'verbose_name': 'Revocación de Token',
+                'verbose_name_plural': 'Revocaciones de Tokens',
+                'db_table': 'token_revocations',
+                'ordering': ['-revoked_at'],
+                'indexes': [models.Index(fields=['expires_at'], name='idx_token_revocation_expires')],
+            },
+        ),
+    ]
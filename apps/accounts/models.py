@@ -2,8 +2,12 @@
 Modelos de la app Accounts - Gestión de Usuarios, Roles y Permisos
 """
 
+import re
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 
 class Permiso(models.Model):
@@ -186,15 +190,40 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_tipo_usuario_display()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda los valores cargados para detectar cambios al guardar sin
+        volver a consultar (ver signals.revocar_claims_de_usuario)
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Las señales post_save ya compararon contra los valores anteriores
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is not None:
+            self._loaded_values = {campo: getattr(self, campo) for campo in loaded}
+    
+    @cached_property
+    def permission_codes(self):
+        """
+        Códigos de los permisos del rol, consultados una vez por instancia
+        (los usuarios autenticados por JWT vienen con ellos desde la caché)
+        """
+        if not self.rol_id:
+            return frozenset()
+        return frozenset(self.rol.permisos.values_list('codigo', flat=True))
+    
     def has_permission(self, codigo_permiso):
         """
         Verifica si el usuario tiene un permiso específico
         """
         if self.is_superuser:
             return True
-        if self.rol:
-            return self.rol.permisos.filter(codigo=codigo_permiso).exists()
-        return False
+        return codigo_permiso in self.permission_codes
     
     def generate_telegram_verification_code(self):
         """
@@ -365,6 +394,7 @@ class AuditLog(models.Model):
         verbose_name = 'Registro de Auditoría'
         verbose_name_plural = 'Registros de Auditoría'
         ordering = ['-timestamp']
+        # Particionada por mes sobre timestamp (ver apps.accounts.partitions)
         db_table = 'audit_logs'
         indexes = [
             models.Index(fields=['-timestamp'], name='idx_audit_timestamp'),
@@ -381,8 +411,12 @@ class AuditLog(models.Model):
 class AccessLog(models.Model):
     """
     Modelo de Historial de Acceso a Módulos
-    Registra cada acceso a endpoints/módulos del sistema
+    Registra los accesos a endpoints/módulos del sistema; las respuestas
+    exitosas pueden estar muestreadas (ver sample_weight)
     """
+    # Umbral de petición lenta (se registra siempre, sin muestreo)
+    SLOW_THRESHOLD_MS = 2000
+    
     MODULE_CHOICES = [
         ('auth', 'Autenticación'),
         ('users', 'Usuarios'),
@@ -463,16 +497,23 @@ class AccessLog(models.Model):
         verbose_name='Metadata',
         help_text='Información adicional sobre el acceso'
     )
+    sample_weight = models.FloatField(
+        default=1.0,
+        verbose_name='Peso de Muestreo',
+        help_text='Peticiones que representa este registro (1 / tasa de muestreo)'
+    )
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name='Fecha y Hora',
-        db_index=True
+        db_index=True,
+        help_text='Momento de la petición (no de la escritura, que es diferida)'
     )
     
     class Meta:
         verbose_name = 'Registro de Acceso'
         verbose_name_plural = 'Registros de Acceso'
         ordering = ['-timestamp']
+        # Particionada por mes sobre timestamp (ver apps.accounts.partitions)
         db_table = 'access_logs'
         indexes = [
             models.Index(fields=['-timestamp'], name='idx_access_timestamp'),
@@ -494,4 +535,107 @@ class AccessLog(models.Model):
     @property
     def is_slow(self):
         """Indica si la petición fue lenta (>2 segundos)"""
-        return self.response_time_ms and self.response_time_ms > 2000
+        return self.response_time_ms and self.response_time_ms > self.SLOW_THRESHOLD_MS
+
+
+class AccessLogAggregate(models.Model):
+    """
+    Métricas de acceso agregadas por minuto
+    Las mantiene el escritor de AccessLog con todas las peticiones (también
+    las no muestreadas), así las estadísticas no recorren access_logs
+    """
+    # Límites superiores (ms) de los buckets del histograma de latencia;
+    # el último bucket (le_inf) cuenta el resto
+    LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2000, 5000)
+    BUCKET_FIELDS = tuple(f'le_{limit}' for limit in LATENCY_BUCKETS) + ('le_inf',)
+    # Segmentos de path que son ids (numéricos o UUID); válido en Python y en PostgreSQL
+    ENDPOINT_ID_PATTERN = r'/([0-9]+|[0-9a-fA-F-]{36})(?=/|$)'
+    
+    bucket = models.DateTimeField(verbose_name='Minuto')
+    module = models.CharField(
+        max_length=20,
+        choices=AccessLog.MODULE_CHOICES,
+        verbose_name='Módulo'
+    )
+    endpoint = models.CharField(
+        max_length=255,
+        verbose_name='Endpoint',
+        help_text='Path con los ids numéricos reemplazados por {id}'
+    )
+    method = models.CharField(max_length=10, verbose_name='Método HTTP')
+    status_code = models.IntegerField(verbose_name='Código de Estado')
+    count = models.BigIntegerField(default=0, verbose_name='Peticiones')
+    latency_sum_ms = models.BigIntegerField(default=0, verbose_name='Suma de Latencias (ms)')
+    latency_max_ms = models.IntegerField(default=0, verbose_name='Latencia Máxima (ms)')
+    le_10 = models.BigIntegerField(default=0)
+    le_25 = models.BigIntegerField(default=0)
+    le_50 = models.BigIntegerField(default=0)
+    le_100 = models.BigIntegerField(default=0)
+    le_250 = models.BigIntegerField(default=0)
+    le_500 = models.BigIntegerField(default=0)
+    le_1000 = models.BigIntegerField(default=0)
+    le_2000 = models.BigIntegerField(default=0)
+    le_5000 = models.BigIntegerField(default=0)
+    le_inf = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Agregado de Accesos'
+        verbose_name_plural = 'Agregados de Accesos'
+        ordering = ['-bucket']
+        db_table = 'access_log_minutes'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bucket', 'module', 'endpoint', 'method', 'status_code'],
+                name='uniq_access_minute_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-bucket'], name='idx_access_minute_bucket'),
+            models.Index(fields=['module', '-bucket'], name='idx_access_minute_module'),
+        ]
+    
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:%M} {self.method} {self.endpoint} [{self.status_code}]: {self.count}"
+    
+    @classmethod
+    def normalize_endpoint(cls, path):
+        """Reemplaza los ids del path por {id} para agrupar por ruta"""
+        return re.sub(cls.ENDPOINT_ID_PATTERN, '/{id}', path)
+    
+    @classmethod
+    def bucket_index(cls, response_time_ms):
+        """Índice del bucket del histograma para una latencia"""
+        for index, limit in enumerate(cls.LATENCY_BUCKETS):
+            if response_time_ms <= limit:
+                return index
+        return len(cls.LATENCY_BUCKETS)
+
+
+class TokenRevocation(models.Model):
+    """
+    Revocación de los claims de los access tokens JWT emitidos antes de
+    revoked_at (ver apps.accounts.authentication.StatelessJWTAuthentication)
+    Esos tokens siguen siendo válidos pero su usuario se vuelve a leer de la
+    base. Pasado expires_at ya no queda ningún token afectado.
+    """
+    user_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Usuario',
+        help_text='Vacío = tokens de todos los usuarios'
+    )
+    reason = models.CharField(max_length=50, verbose_name='Motivo')
+    revoked_at = models.DateTimeField(default=timezone.now, verbose_name='Fecha de Revocación')
+    expires_at = models.DateTimeField(verbose_name='Vigente Hasta')
+    
+    class Meta:
+        verbose_name = 'Revocación de Token'
+        verbose_name_plural = 'Revocaciones de Tokens'
+        ordering = ['-revoked_at']
+        db_table = 'token_revocations'
+        indexes = [
+            models.Index(fields=['expires_at'], name='idx_token_revocation_expires'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id or 'todos'} - {self.reason} ({self.revoked_at:%Y-%m-%d %H:%M:%S})"
@@ -0,0 +1,14 @@
+"""
+Paginación por defecto de la API
+"""
+
+from rest_framework.pagination import PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    PageNumberPagination con tamaño de página configurable por el cliente
+    GET /api/sensors/?page=2&page_size=20
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
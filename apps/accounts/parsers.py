@@ -0,0 +1,33 @@
+"""
+Parser JSON de la API basado en orjson
+"""
+
+import codecs
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import OrjsonRenderer
+
+
+class OrjsonParser(JSONParser):
+    """
+    JSONParser que decodifica con orjson
+
+    orjson solo lee UTF-8 y siempre rechaza NaN/Infinity (como STRICT_JSON);
+    otros charsets pasan por JSONParser.
+    """
+    renderer_class = OrjsonRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,207 @@
+"""
+Particionado mensual de access_logs y audit_logs
+
+Ambas tablas están particionadas por rango de `timestamp` (migración
+0008_partition_logs). Cada mes vive en `<tabla>_pYYYY_MM` y lo que no cae
+en ninguna partición (p. ej. el histórico anterior a la migración) queda en
+la partición por defecto `<tabla>_default`.
+
+La retención se aplica borrando particiones completas (DROP TABLE), lo que
+no deja filas muertas ni requiere VACUUM. Ver el comando
+mantener_particiones_logs.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Tabla particionada -> setting con los días de retención (0 = sin límite)
+PARTITIONED_TABLES = {
+    'access_logs': 'ACCESS_LOG_RETENTION_DAYS',
+    'audit_logs': 'AUDIT_LOG_RETENTION_DAYS',
+}
+
+PARTITION_NAME = re.compile(r'^(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$')
+
+
+def month_start(value):
+    """Primer instante del mes de `value` (UTC)"""
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value):
+    return month_start(month_start(value) + timedelta(days=32))
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def default_partition(table):
+    return f'{table}_default'
+
+
+def list_partitions(table):
+    """
+    Particiones mensuales existentes
+
+    Returns:
+        list: [(nombre, inicio_del_mes)] ordenadas por mes
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match and match.group('table') == table:
+            month = datetime(int(match.group('year')), int(match.group('month')), 1, tzinfo=dt_timezone.utc)
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def ensure_partition(table, month):
+    """
+    Crea la partición del mes si no existe
+
+    Si la partición por defecto tiene filas de ese mes se mueven a la nueva
+    partición antes de adjuntarla (PostgreSQL no permite crear una
+    partición cuyo rango tenga filas en la partición por defecto). La
+    partición por defecto queda bloqueada desde la verificación hasta el
+    commit: una fila de ese mes insertada en el medio haría fallar el
+    ATTACH. Las escrituras de la tabla esperan mientras tanto, por eso el
+    comando crea los meses futuros antes de que lleguen sus filas.
+
+    Returns:
+        int | None: Filas movidas desde la partición por defecto, o None si
+        la partición ya existía
+    """
+    start = month_start(month)
+    end = next_month(start)
+    name = partition_name(table, start)
+    default = default_partition(table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        if cursor.fetchone()[0]:
+            return None
+
+        # ATTACH la toma igual; antes, para que nada entre al rango revisado
+        cursor.execute(f"LOCK TABLE {default} IN ACCESS EXCLUSIVE MODE")
+        # Otro proceso pudo crearla mientras se esperaba el bloqueo
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        if cursor.fetchone()[0]:
+            return None
+
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {default} WHERE "timestamp" >= %s AND "timestamp" < %s)',
+            [start, end]
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            return 0
+
+        cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f'WITH moved AS ('
+            f'  DELETE FROM {default} WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *'
+            f') INSERT INTO {name} SELECT * FROM moved',
+            [start, end]
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    logger.info(f"Partición {name} creada con {moved} filas movidas desde {default}")
+    return moved
+
+
+def default_partition_months(table):
+    """Meses con filas en la partición por defecto"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', \"timestamp\" AT TIME ZONE 'UTC') "
+            f"FROM {default_partition(table)} ORDER BY 1"
+        )
+        return [row[0].replace(tzinfo=dt_timezone.utc) for row in cursor.fetchall()]
+
+
+def is_expired(month, retention_days, now=None):
+    """
+    Indica si el mes completo quedó fuera de la retención
+
+    Una partición se elimina solo cuando su última fila vence, así que se
+    conservan entre `retention_days` y `retention_days` + 1 mes de datos.
+    """
+    if not retention_days:
+        return False
+    return next_month(month) <= (now or timezone.now()) - timedelta(days=retention_days)
+
+
+def expired_partitions(table, retention_days, now=None):
+    """Particiones mensuales vencidas según la retención"""
+    return [
+        (name, month) for name, month in list_partitions(table)
+        if is_expired(month, retention_days, now)
+    ]
+
+
+def archive_partition(name, directory):
+    """
+    Exporta una partición a <directory>/<name>.csv.gz con COPY
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}.csv.gz')
+    with connection.cursor() as cursor, gzip.open(path, 'wb') as output:
+        with cursor.copy(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+            for data in copy:
+                output.write(data)
+    return path
+
+
+def drop_partition(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {name}")
+    logger.info(f"Partición {name} eliminada")
+
+
+def purge_default_partition(table, retention_days, now=None):
+    """
+    Borra las filas vencidas de la partición por defecto
+
+    Returns:
+        int: Filas eliminadas
+    """
+    if not retention_days:
+        return 0
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {default_partition(table)} WHERE "timestamp" < %s', [cutoff])
+        return cursor.rowcount
+
+
+def retention_days(table):
+    return getattr(settings, PARTITIONED_TABLES[table])
@@ -4,6 +4,8 @@ Permisos personalizados para la plataforma IoT Sensor Platform
 
 from rest_framework import permissions
 
+from apps.devices.authentication import dispositivo_autenticado
+
 
 class IsSuperuser(permissions.BasePermission):
     """
@@ -183,6 +185,9 @@ class CanManageDevices(permissions.BasePermission):
 class CanCreateReadings(permissions.BasePermission):
     """
     Permiso para crear lecturas de sensores
+    
+    Un dispositivo autenticado con clave de API solo puede crear lecturas
+    (create y bulk); el alcance a sus sensores lo aplica la ingesta.
     """
     message = 'No tiene permisos para crear lecturas.'
     
@@ -190,6 +195,9 @@ class CanCreateReadings(permissions.BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
+        if dispositivo_autenticado(request) is not None:
+            return getattr(view, 'action', None) in ('create', 'bulk')
+        
         # Lectura para todos
         if request.method in permissions.SAFE_METHODS:
             return True
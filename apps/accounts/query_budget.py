@@ -0,0 +1,157 @@
+"""
+Presupuesto de consultas SQL por petición y detector de N+1
+
+Pensado para desarrollo y CI (QUERY_BUDGET_ENABLED). QueryBudgetMiddleware
+registra las consultas de cada petición, agrupa las repetidas por huella
+(la consulta sin literales ni listas IN) y avisa, o falla con
+QUERY_BUDGET_RAISE, cuando una vista supera su presupuesto o repite la
+misma consulta QUERY_BUDGET_REPEAT_THRESHOLD veces o más: el patrón típico
+de un N+1. El resumen por vista queda en `query_report`.
+"""
+
+import atexit
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Una vista superó su presupuesto de consultas o repitió una consulta"""
+
+
+def fingerprint(sql):
+    """SQL normalizado: sin literales y con las listas IN colapsadas"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper que guarda las consultas de una petición"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        """[(huella, veces)] de las consultas repetidas `threshold` veces o más"""
+        return [(sql, times) for sql, times in self.fingerprints.most_common() if times >= threshold]
+
+
+def budget_for(view):
+    return settings.QUERY_BUDGET_PER_VIEW.get(view, settings.QUERY_BUDGET_DEFAULT)
+
+
+def check(view, recorder):
+    """
+    Compara las consultas de una petición con el presupuesto de la vista
+
+    Registra el resultado en query_report, avisa por log y, con
+    QUERY_BUDGET_RAISE, lanza QueryBudgetExceeded.
+    """
+    budget = budget_for(view)
+    repeated = recorder.repeated(settings.QUERY_BUDGET_REPEAT_THRESHOLD)
+    exceeded = recorder.count > budget
+    query_report.add(view, recorder, exceeded, repeated)
+
+    if not exceeded and not repeated:
+        return
+
+    problems = []
+    if exceeded:
+        problems.append(f'{recorder.count} consultas (presupuesto {budget})')
+    for sql, times in repeated[:3]:
+        problems.append(f'posible N+1, {times}x: {sql[:200]}')
+    message = f"Consultas SQL en {view}: " + '; '.join(problems)
+
+    if settings.QUERY_BUDGET_RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryReport:
+    """Resumen de consultas por vista acumulado en el proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def add(self, view, recorder, exceeded, repeated):
+        with self._lock:
+            stats = self._views.setdefault(view, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_ms': 0.0,
+                'over_budget': 0,
+                'repeated': Counter(),
+            })
+            stats['requests'] += 1
+            stats['queries'] += recorder.count
+            stats['max_queries'] = max(stats['max_queries'], recorder.count)
+            stats['db_ms'] += recorder.seconds * 1000
+            stats['over_budget'] += int(exceeded)
+            for sql, times in repeated:
+                stats['repeated'][sql] = max(stats['repeated'][sql], times)
+
+    def as_dict(self):
+        """Vistas ordenadas de más a menos consultas por petición"""
+        with self._lock:
+            views = sorted(self._views.items(), key=lambda item: item[1]['max_queries'], reverse=True)
+            return {
+                view: {
+                    'requests': stats['requests'],
+                    'avg_queries': round(stats['queries'] / stats['requests'], 1),
+                    'max_queries': stats['max_queries'],
+                    'budget': budget_for(view),
+                    'avg_db_ms': round(stats['db_ms'] / stats['requests'], 2),
+                    'over_budget': stats['over_budget'],
+                    'repeated': [
+                        {'sql': sql, 'times': times} for sql, times in stats['repeated'].most_common(5)
+                    ],
+                }
+                for view, stats in views
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(self.as_dict(), output, indent=2, ensure_ascii=False)
+
+
+# Instancia global
+query_report = QueryReport()
+
+
+def _write_report_at_exit():
+    if settings.QUERY_BUDGET_REPORT_FILE and query_report.as_dict():
+        query_report.write(settings.QUERY_BUDGET_REPORT_FILE)
+
+
+atexit.register(_write_report_at_exit)
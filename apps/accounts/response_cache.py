@@ -0,0 +1,189 @@
+"""
+Caché de respuestas de los endpoints de lectura frecuente
+
+Los datos se guardan en la caché de Django (CACHES: LocMemCache por
+defecto, Redis u otro backend compartido por configuración) bajo un grupo
+con versión: las señales de los modelos de los que depende cada grupo
+(ver GROUP_DEPENDENCIES y signals.py) incrementan la versión y las claves
+viejas dejan de usarse. La clave incluye el rol del usuario (o el usuario,
+si la respuesta depende de él), la ruta, los parámetros de la query string
+y el tipo de respuesta negociado.
+
+Las escrituras de campos que ningún grupo muestra (GROUP_IGNORED_FIELDS:
+last_login de los usuarios, estado de conexión de los dispositivos en el
+dashboard) no invalidan. La versión vive en la caché configurada: con
+LocMemCache (el default) cada proceso tiene la suya y la invalidación solo
+llega al proceso que hizo la escritura; los demás siguen sirviendo sus
+entradas hasta RESPONSE_CACHE_SECONDS. Con varios workers use una caché
+compartida (Redis, Memcached).
+
+Aciertos y fallos se cuentan por grupo en la métrica
+response_cache_requests_total de /metrics.
+"""
+
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .conditional import not_modified
+from .metrics import RESPONSE_CACHE_REQUESTS
+
+# Modelos (app_label.Model) cuyas escrituras invalidan cada grupo
+GROUP_DEPENDENCIES = {
+    'sensors': ('sensors.Sensor', settings.AUTH_USER_MODEL),
+    'mqtt_devices': (
+        'devices.Dispositivo', 'devices.DispositivoSensor', 'sensors.Sensor', settings.AUTH_USER_MODEL,
+    ),
+    'mqtt_topics': ('mqtt.MQTTTopic',),
+    'dashboard': ('devices.Dispositivo', 'sensors.Sensor', settings.AUTH_USER_MODEL),
+}
+
+# Campos de cada modelo que las respuestas del grupo no muestran: un save()
+# que solo escribe estos campos no invalida el grupo
+_LAST_LOGIN = {settings.AUTH_USER_MODEL: ('last_login',)}
+GROUP_IGNORED_FIELDS = {
+    'sensors': _LAST_LOGIN,
+    'mqtt_devices': _LAST_LOGIN,
+    'dashboard': {
+        **_LAST_LOGIN,
+        # Heartbeats y cambios de conexión: el dashboard no cuenta estados de conexión
+        'devices.Dispositivo': ('last_seen', 'connection_status', 'updated_at'),
+    },
+}
+
+# Encabezados que se guardan con los datos (validadores de conditional.py)
+_CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+_MISSING = object()
+
+
+def _version_key(group):
+    return f'response_cache:{group}:version'
+
+
+def _version(group):
+    return cache.get_or_set(_version_key(group), 1, None)
+
+
+def invalidate(group):
+    """Descarta todas las entradas del grupo"""
+    try:
+        cache.incr(_version_key(group))
+    except ValueError:
+        cache.set(_version_key(group), 1, None)
+
+
+def saved_fields(instance, update_fields=None, created=False):
+    """
+    Nombres de los campos que escribió un save(), o None si no se sabe
+
+    Son update_fields si se indicaron; si no, los que cambiaron respecto de
+    los valores cargados de la base (_loaded_values, ver Dispositivo.from_db).
+    """
+    if update_fields is not None:
+        return set(update_fields)
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None:
+        return None
+    fields = set()
+    for field in instance._meta.concrete_fields:
+        if field.attname not in loaded:
+            # Cargado con only()/defer(): no se sabe si cambió
+            return None
+        if loaded[field.attname] != getattr(instance, field.attname):
+            fields.add(field.name)
+    return fields
+
+
+def invalidate_model(model, fields=None):
+    """
+    Descarta los grupos que dependen del modelo
+
+    fields: campos escritos (ver saved_fields); se conservan los grupos que
+    ignoran todos ellos (GROUP_IGNORED_FIELDS). None invalida siempre.
+    """
+    label = model._meta.label
+    for group, models in GROUP_DEPENDENCIES.items():
+        if label not in models:
+            continue
+        ignored = GROUP_IGNORED_FIELDS.get(group, {}).get(label, ())
+        if fields is not None and fields <= set(ignored):
+            continue
+        invalidate(group)
+
+
+def cached(group, key, compute, timeout=None):
+    """
+    Valor de `key` en el grupo, calculado con compute() si no está
+
+    Si compute() devuelve None no se guarda nada.
+    timeout: segundos, por defecto RESPONSE_CACHE_SECONDS
+    """
+    full_key = f'response_cache:{group}:{_version(group)}:{key}'
+    value = cache.get(full_key, _MISSING)
+    if value is not _MISSING:
+        RESPONSE_CACHE_REQUESTS.labels(group, 'hit').inc()
+        return value
+
+    RESPONSE_CACHE_REQUESTS.labels(group, 'miss').inc()
+    value = compute()
+    if value is not None:
+        cache.set(full_key, value, settings.RESPONSE_CACHE_SECONDS if timeout is None else timeout)
+    return value
+
+
+def user_scope(user, per_user=False):
+    """Parte de la clave según quién pide: rol, o el usuario si per_user"""
+    if user.is_superuser:
+        return 'superuser'
+    scope = f'rol:{user.rol.nombre}' if user.rol else 'rol:-'
+    return f'{scope}:user:{user.id}' if per_user else scope
+
+
+def request_key(request, per_user=False):
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(
+        f'{request.path}|{params}|{request.accepted_media_type}'.encode(), usedforsecurity=False,
+    ).hexdigest()
+    return f'{user_scope(request.user, per_user)}:{digest}'
+
+
+def cache_response(group, per_user=False):
+    """
+    Decorador para vistas DRF (funciones o acciones de ViewSet) de solo lectura
+
+    Guarda response.data de las respuestas 200 y las sirve desde la caché
+    hasta que se invalide el grupo. per_user: la respuesta depende del
+    usuario y no solo de su rol (p. ej. filtros de operador). Si la respuesta
+    trae ETag, los aciertos también responden 304 a If-None-Match.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            computed = []
+
+            def compute():
+                response = view(*args, **kwargs)
+                computed.append(response)
+                if response.status_code != 200:
+                    return None
+                headers = {name: response[name] for name in _CACHED_HEADERS if response.has_header(name)}
+                return response.data, headers
+
+            entry = cached(group, request_key(request, per_user), compute)
+            if computed:
+                return computed[0]
+
+            data, headers = entry
+            if 'ETag' in headers:
+                response = not_modified(request, headers['ETag'])
+                if response is not None:
+                    return response
+            return Response(data, headers=headers)
+        return wrapper
+    return decorator
@@ -3,9 +3,14 @@ Serializers para la app Accounts
 """
 
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from .models import CustomUser, Rol, Permiso
+from .authentication import add_user_claims, get_cached_user
+from .models import CustomUser, Rol, Permiso, AccessLog, AuditLog
 
 
 # ============ Serializers de Autenticación ============
@@ -88,6 +93,27 @@ class LoginSerializer(serializers.Serializer):
             )
 
 
+class TokenRefreshWithClaimsSerializer(TokenRefreshSerializer):
+    """
+    Refresh de tokens que agrega al nuevo access token los mismos claims
+    que login_view (JWT_STATELESS_CLAIMS), con los datos actuales del usuario
+
+    Si el usuario no existe o está inactivo el token sale sin claims y la
+    autenticación lo rechaza como a cualquier otro.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if not settings.JWT_STATELESS_CLAIMS:
+            return data
+
+        access = AccessToken(data['access'])
+        user = get_cached_user(access[api_settings.USER_ID_CLAIM])
+        if user is not None and user.is_active:
+            data['access'] = str(add_user_claims(access, user))
+        return data
+
+
 # ============ Serializers de Modelos ============
 
 class PermisoSerializer(serializers.ModelSerializer):
@@ -206,19 +232,13 @@ class AuditLogSerializer(serializers.ModelSerializer):
     action_display = serializers.CharField(source='get_action_display', read_only=True)
     
     class Meta:
-        model = 'accounts.AuditLog'
+        model = AuditLog
         fields = [
             'id', 'user', 'user_display', 'username', 'model_name',
             'object_id', 'object_repr', 'action', 'action_display',
             'changes', 'ip_address', 'user_agent', 'timestamp'
         ]
         read_only_fields = fields
-    
-    def to_representation(self, instance):
-        from .models import AuditLog
-        if not isinstance(instance, AuditLog):
-            instance = AuditLog.objects.get(pk=instance.pk)
-        return super().to_representation(instance)
 
 
 class AccessLogSerializer(serializers.ModelSerializer):
@@ -231,20 +251,15 @@ class AccessLogSerializer(serializers.ModelSerializer):
     is_slow = serializers.BooleanField(read_only=True)
     
     class Meta:
-        model = 'accounts.AccessLog'
+        model = AccessLog
         fields = [
             'id', 'user', 'user_display', 'username', 'module',
             'module_display', 'endpoint', 'method', 'status_code',
             'ip_address', 'user_agent', 'response_time_ms',
-            'query_params', 'metadata', 'timestamp', 'is_error', 'is_slow'
+            'query_params', 'metadata', 'sample_weight', 'timestamp',
+            'is_error', 'is_slow'
         ]
         read_only_fields = fields
-    
-    def to_representation(self, instance):
-        from .models import AccessLog
-        if not isinstance(instance, AccessLog):
-            instance = AccessLog.objects.get(pk=instance.pk)
-        return super().to_representation(instance)
 
 
 class CreateAccessLogSerializer(serializers.ModelSerializer):
@@ -252,7 +267,7 @@ class CreateAccessLogSerializer(serializers.ModelSerializer):
     Serializer para crear registros de acceso (write-only)
     """
     class Meta:
-        model = 'accounts.AccessLog'
+        model = AccessLog
         fields = [
             'module', 'endpoint', 'method', 'status_code',
             'ip_address', 'user_agent', 'response_time_ms',
@@ -260,7 +275,6 @@ class CreateAccessLogSerializer(serializers.ModelSerializer):
         ]
     
     def create(self, validated_data):
-        from .models import AccessLog
         # Agregar usuario del contexto
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
@@ -0,0 +1,145 @@
+"""
+Señales de la app Accounts
+"""
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.devices.authentication import api_key_cache
+from apps.devices.models import Dispositivo, DispositivoAPIKey, DispositivoSensor
+from apps.mqtt.models import MQTTTopic
+from apps.sensors.models import Sensor
+from . import authentication, response_cache
+from .models import Permiso, Rol
+
+
+@receiver(post_save, sender=Dispositivo)
+@receiver(post_delete, sender=Dispositivo)
+@receiver(post_save, sender=DispositivoSensor)
+@receiver(post_delete, sender=DispositivoSensor)
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+@receiver(post_save, sender=MQTTTopic)
+@receiver(post_delete, sender=MQTTTopic)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidar_respuestas_en_cache(sender, instance, **kwargs):
+    """
+    Descarta las respuestas en caché que dependen del modelo (estadísticas
+    del dashboard incluidas; ver response_cache.GROUP_DEPENDENCIES).
+    Las escrituras por lotes (bulk_create, update) no disparan señales:
+    se reflejan al vencer RESPONSE_CACHE_SECONDS / DASHBOARD_CACHE_SECONDS.
+    Los saves que solo escriben campos que un grupo no muestra (last_login,
+    estado de conexión) no lo invalidan. Corre antes que apps.mqtt.signals,
+    que actualiza los valores cargados del dispositivo al guardarlo.
+    """
+    fields = None
+    if 'created' in kwargs:
+        fields = response_cache.saved_fields(instance, kwargs.get('update_fields'), kwargs['created'])
+    response_cache.invalidate_model(sender, fields)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def olvidar_usuario_autenticado(sender, instance, **kwargs):
+    """
+    Descarta el usuario de la caché de autenticación
+    (apps.accounts.authentication) para que la próxima petición lo recargue.
+    """
+    authentication.forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Rol)
+@receiver(post_delete, sender=Rol)
+@receiver(post_save, sender=Permiso)
+@receiver(post_delete, sender=Permiso)
+@receiver(m2m_changed, sender=Rol.permisos.through)
+def olvidar_usuarios_por_cambio_de_rol(sender, **kwargs):
+    """
+    Un cambio en roles o permisos afecta a todos los usuarios del rol:
+    se descartan todos los usuarios en caché y los claims de los tokens.
+    """
+    if not kwargs.get('action', 'post_').startswith('post_'):
+        return
+    authentication.forget_all_users()
+    authentication.claims_denylist.revoke(None, 'roles')
+
+
+# Campos del usuario que viajan en los claims: {nombre: attname}
+CAMPOS_DE_CLAIMS = {'username': 'username', 'is_active': 'is_active', 'is_superuser': 'is_superuser', 'rol': 'rol_id'}
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def revocar_claims_de_usuario(sender, instance, **kwargs):
+    """
+    Si cambian los datos que viajan en los claims del token (ver
+    authentication.add_user_claims), los tokens ya emitidos dejan de usarlos.
+    """
+    if instance.pk is None:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & {*CAMPOS_DE_CLAIMS, *CAMPOS_DE_CLAIMS.values()}:
+        # p. ej. last_login al iniciar sesión
+        return
+    
+    cargados = getattr(instance, '_loaded_values', None)
+    if cargados is not None and all(attname in cargados for attname in CAMPOS_DE_CLAIMS.values()):
+        anterior = {attname: cargados[attname] for attname in CAMPOS_DE_CLAIMS.values()}
+    else:
+        # Sin valores cargados (o con only()/defer()): se leen de la base
+        anterior = sender.objects.filter(pk=instance.pk).values(*CAMPOS_DE_CLAIMS.values()).first()
+    if anterior and any(getattr(instance, attname) != valor for attname, valor in anterior.items()):
+        authentication.claims_denylist.revoke(instance.pk, 'usuario')
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revocar_claims_de_usuario_eliminado(sender, instance, **kwargs):
+    authentication.claims_denylist.revoke(instance.pk, 'usuario eliminado')
+
+
+@receiver(pre_save, sender=Dispositivo)
+def revocar_claims_por_asignacion(sender, instance, **kwargs):
+    """
+    Cambió el operador asignado: los dispositivos en los tokens del operador
+    anterior y del nuevo ya no son los actuales.
+    """
+    cargados = getattr(instance, '_loaded_values', None)
+    if instance._state.adding or cargados is None:
+        anteriores = {None}
+    elif 'operador_asignado_id' in cargados:
+        anteriores = {cargados['operador_asignado_id']}
+    else:
+        # Cargado con only()/defer(): no se sabe el anterior
+        anteriores = {None, instance.operador_asignado_id}
+    
+    if anteriores == {instance.operador_asignado_id}:
+        return
+    for operador_id in (anteriores | {instance.operador_asignado_id}) - {None}:
+        authentication.claims_denylist.revoke(operador_id, 'dispositivos')
+
+
+@receiver(post_delete, sender=Dispositivo)
+def revocar_claims_por_dispositivo_eliminado(sender, instance, **kwargs):
+    if instance.operador_asignado_id:
+        authentication.claims_denylist.revoke(instance.operador_asignado_id, 'dispositivos')
+
+
+@receiver(post_save, sender=DispositivoAPIKey)
+@receiver(post_delete, sender=DispositivoAPIKey)
+def olvidar_clave_de_api(sender, instance, **kwargs):
+    """Una clave creada, revocada o borrada se recarga en la próxima petición"""
+    api_key_cache.forget(instance.prefijo)
+
+
+@receiver(post_save, sender=Dispositivo)
+@receiver(post_delete, sender=Dispositivo)
+@receiver(post_save, sender=DispositivoSensor)
+@receiver(post_delete, sender=DispositivoSensor)
+def olvidar_claves_del_dispositivo(sender, instance, **kwargs):
+    """
+    Las claves de API guardan el dispositivo y sus sensores asignados
+    (apps.devices.authentication): se recargan si cambian.
+    """
+    dispositivo_id = instance.pk if sender is Dispositivo else instance.dispositivo_id
+    api_key_cache.forget_device(dispositivo_id)
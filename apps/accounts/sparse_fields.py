@@ -0,0 +1,94 @@
+"""
+Campos a pedido en las respuestas de la API (?fields= / ?expand=)
+
+    GET /api/devices/?fields=id,nombre,connection_status
+    GET /api/devices/?expand=sensores_asignados
+
+Los listados devuelven por defecto solo Meta.list_fields del serializer;
+las relaciones pesadas (Meta.expandable_fields) se agregan con ?expand= y
+?fields= elige exactamente los campos. El detalle devuelve todos los campos
+salvo que se pida ?fields=. Las vistas consultan wants() para no precargar
+ni unir relaciones que no se van a serializar.
+"""
+
+from rest_framework.exceptions import ValidationError
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer que acepta fields=[...] y descarta el resto de sus campos
+
+    Meta.list_fields: campos por defecto en los listados
+    Meta.expandable_fields: {expansión: [campos]} que los listados solo
+    incluyen con ?expand=<expansión>
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsViewSetMixin:
+    """
+    ViewSet que aplica ?fields= / ?expand= a su serializer
+
+    Solo en sparse_actions; en detail_actions (detalle) el valor por defecto
+    son todos los campos, en las demás Meta.list_fields.
+    """
+    sparse_actions = ('list', 'retrieve')
+    detail_actions = ('retrieve',)
+
+    def requested_fields(self):
+        """Campos a serializar, None = todos"""
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self._parse_requested_fields()
+        return self._requested_fields
+
+    def _parse_requested_fields(self):
+        # Sin request (p. ej. al generar el esquema OpenAPI) van todos los campos
+        if getattr(self, 'action', None) not in self.sparse_actions or getattr(self, 'request', None) is None:
+            return None
+
+        meta = self.get_serializer_class().Meta
+        expandable = getattr(meta, 'expandable_fields', {})
+        params = self.request.query_params
+
+        expand = _names(params.get('expand', ''))
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            raise ValidationError({
+                'expand': f"Expansiones desconocidas: {', '.join(unknown)}. "
+                          f"Disponibles: {', '.join(expandable) or 'ninguna'}"
+            })
+
+        if params.get('fields'):
+            fields = _names(params['fields'])
+            unknown = [name for name in fields if name not in meta.fields]
+            if unknown:
+                raise ValidationError({'fields': f"Campos desconocidos: {', '.join(unknown)}"})
+            fields = set(fields)
+        elif self.action in self.detail_actions or not hasattr(meta, 'list_fields'):
+            return None
+        else:
+            fields = set(meta.list_fields)
+
+        for name in expand:
+            fields.update(expandable[name])
+        return fields
+
+    def wants(self, *names):
+        """True si se va a serializar alguno de los campos"""
+        fields = self.requested_fields()
+        return fields is None or any(name in fields for name in names)
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.requested_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
@@ -6,6 +6,8 @@ import requests
 import logging
 from django.conf import settings
 
+from .metrics import timed_notification
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +20,7 @@ class TelegramNotifier:
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
     
+    @timed_notification('telegram')
     def send_message(self, chat_id, message, parse_mode='HTML'):
         """
         Envía un mensaje a un chat específico
@@ -0,0 +1,34 @@
+"""
+Utilidades compartidas por los tests de las apps
+"""
+
+from django.test import override_settings
+from django.urls import reverse
+
+# Mismos tamaños que verificar_consultas
+PAGE_SIZES = (1, 10, 100)
+
+
+class ConsultasConstantesMixin:
+    """
+    APITestCase que fija las consultas de un listado por tamaño de página
+
+    Autentica con self.usuario (definido en setUpTestData) y desactiva los
+    registros de acceso, cuyas consultas no son del listado.
+    """
+
+    def setUp(self):
+        super().setUp()
+        sin_registros = override_settings(ACCESS_LOG_EXCLUDE_PATTERNS=['^/api/'])
+        sin_registros.enable()
+        self.addCleanup(sin_registros.disable)
+        self.client.force_authenticate(self.usuario)
+
+    def assertConsultasConstantes(self, vista, consultas, params=''):
+        """Mismas `consultas` con page_size 1, 10 y 100, con páginas llenas"""
+        for size in PAGE_SIZES:
+            with self.subTest(vista=vista, page_size=size):
+                with self.assertNumQueries(consultas):
+                    response = self.client.get(f'{reverse(vista)}?page_size={size}{params}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), size)
@@ -0,0 +1,213 @@
+"""
+Tests de la app Accounts
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.devices.flota import crear_flota, dispositivos_de_flota
+from . import partitions
+from .authentication import CLAIM, StatelessJWTAuthentication, claims_denylist
+from .dashboard import _global_stats
+from .models import AccessLog, AuditLog, CustomUser, Permiso, Rol, TokenRevocation
+from .testing import ConsultasConstantesMixin
+
+
+class ListadosConsultasTest(ConsultasConstantesMixin, APITestCase):
+    """Los listados de accounts usan las mismas consultas con cualquier tamaño de página"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_superuser(
+            username='admin-consultas', email='admin-consultas@example.com', password='x'
+        )
+        permisos = Permiso.objects.bulk_create(
+            Permiso(nombre=f'permiso {i}', codigo=f'permiso_{i}') for i in range(100)
+        )
+        roles = Rol.objects.bulk_create(Rol(nombre=f'rol-{i}') for i in range(100))
+        for rol in roles:
+            rol.permisos.set(permisos[:3])
+        CustomUser.objects.bulk_create(
+            CustomUser(username=f'usuario{i}', email=f'usuario{i}@example.com', rol=roles[i])
+            for i in range(100)
+        )
+        ahora = timezone.now()
+        AuditLog.objects.bulk_create(
+            AuditLog(
+                user=cls.usuario, username=cls.usuario.username, model_name='Sensor',
+                object_id=i, object_repr=f'sensor {i}', action='CREATE', timestamp=ahora,
+            )
+            for i in range(100)
+        )
+        AccessLog.objects.bulk_create(
+            AccessLog(
+                user=cls.usuario, username=cls.usuario.username, module='sensors',
+                endpoint='/api/sensors/', method='GET', status_code=200, timestamp=ahora,
+            )
+            for _ in range(100)
+        )
+
+    def test_usuarios(self):
+        # COUNT, página con su rol y los permisos del rol
+        self.assertConsultasConstantes('user-list', 3)
+
+    def test_roles(self):
+        # COUNT, página y permisos de los roles
+        self.assertConsultasConstantes('role-list', 3)
+
+    def test_permisos(self):
+        # COUNT del paginador y página
+        self.assertConsultasConstantes('permiso-list', 2)
+
+    def test_auditoria(self):
+        # COUNT del paginador y página con su usuario
+        self.assertConsultasConstantes('audit-log-list', 2)
+
+    def test_accesos(self):
+        # COUNT del paginador y página con su usuario
+        self.assertConsultasConstantes('access-log-list', 2)
+
+
+@override_settings(JWT_STATELESS_CLAIMS=True, ACCESS_LOG_EXCLUDE_PATTERNS=['^/api/'])
+class TokenClaimsTest(APITestCase):
+    """Tokens con claims (JWT_STATELESS_CLAIMS): login, refresh y revocación"""
+
+    @classmethod
+    def setUpTestData(cls):
+        permisos = Permiso.objects.bulk_create(
+            Permiso(nombre=f'claims {codigo}', codigo=codigo) for codigo in ('ver_lecturas', 'crear_lecturas')
+        )
+        cls.rol = Rol.objects.create(nombre='rol-claims')
+        cls.rol.permisos.set(permisos[:1])
+        cls.otro_rol = Rol.objects.create(nombre='rol-claims-2')
+        cls.otro_rol.permisos.set(permisos)
+        cls.usuario = CustomUser.objects.create_user(
+            username='claims', email='claims@example.com', password='x', rol=cls.rol
+        )
+        crear_flota(2, 0, prefijo='claims', operador=cls.usuario)
+        cls.dispositivos = list(dispositivos_de_flota('claims').values_list('id', flat=True))
+
+    def setUp(self):
+        # Revocaciones de otros tests que sigan en memoria
+        TokenRevocation.objects.all().delete()
+        claims_denylist._load()
+        cache.clear()
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'username': 'claims', 'password': 'x'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def refresh(self, refresh):
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assertClaims(self, access, rol, permisos):
+        claims = AccessToken(access)[CLAIM]
+        self.assertEqual(claims['rol'], [rol.id, rol.nombre])
+        self.assertEqual(claims['permisos'], permisos)
+        self.assertCountEqual(claims['dispositivos'], self.dispositivos)
+
+    def test_login_y_refresh_llevan_claims(self):
+        tokens = self.login()
+        self.assertClaims(tokens['access'], self.rol, ['ver_lecturas'])
+        self.assertClaims(self.refresh(tokens['refresh'])['access'], self.rol, ['ver_lecturas'])
+
+    def test_refresh_con_datos_actuales(self):
+        tokens = self.login()
+        self.usuario.rol = self.otro_rol
+        self.usuario.save()
+        self.assertClaims(self.refresh(tokens['refresh'])['access'], self.otro_rol, ['crear_lecturas', 'ver_lecturas'])
+
+    @override_settings(JWT_STATELESS_CLAIMS=False)
+    def test_sin_claims(self):
+        tokens = self.login()
+        self.assertNotIn(CLAIM, AccessToken(tokens['access']))
+        self.assertNotIn(CLAIM, AccessToken(self.refresh(tokens['refresh'])['access']))
+
+    def test_autentica_desde_los_claims(self):
+        token = AccessToken(self.login()['access'])
+        with self.assertNumQueries(0):
+            user = StatelessJWTAuthentication().get_user(token)
+        self.assertEqual((user.id, user.rol.nombre), (self.usuario.id, self.rol.nombre))
+        self.assertEqual(user.permission_codes, {'ver_lecturas'})
+        self.assertEqual(user.assigned_device_ids, set(self.dispositivos))
+
+    def test_token_sin_claims_lee_la_base(self):
+        token = AccessToken(self.login()['access'])
+        del token[CLAIM]
+        with self.assertNumQueries(2):  # usuario con rol y sus permisos
+            user = StatelessJWTAuthentication().get_user(token)
+        self.assertEqual(user.permission_codes, {'ver_lecturas'})
+        self.assertFalse(hasattr(user, 'assigned_device_ids'))
+
+    def test_revocacion(self):
+        token = AccessToken(self.login()['access'])
+        self.usuario.rol = self.otro_rol
+        self.usuario.save()
+
+        user = StatelessJWTAuthentication().get_user(token)
+        self.assertEqual(user.rol_id, self.otro_rol.id)
+        self.assertEqual(user.permission_codes, {'ver_lecturas', 'crear_lecturas'})
+
+    def test_revocacion_por_asignacion(self):
+        token = AccessToken(self.login()['access'])
+        dispositivos_de_flota('claims').first().delete()
+        self.assertTrue(claims_denylist.is_revoked(self.usuario.id, token['iat']))
+
+
+class DashboardStatsTest(APITestCase):
+    """Conteos globales del dashboard"""
+
+    def test_conteos(self):
+        CustomUser.objects.create_user(username='dashboard', email='dashboard@example.com', password='x')
+        crear_flota(3, 2, lecturas_por_sensor=2, prefijo='dashboard')
+        dispositivos_de_flota('dashboard').filter(id__in=dispositivos_de_flota('dashboard')[:1]).update(
+            estado='inactivo', mqtt_enabled=False
+        )
+        self.assertEqual(_global_stats(), {
+            'total_usuarios': 1,
+            'total_sensores': 6,
+            'sensores_activos': 6,
+            'total_dispositivos': 3,
+            'dispositivos_activos': 2,
+            'dispositivos_mqtt': 2,
+            'total_lecturas': 12,
+        })
+
+    def test_sin_dispositivos(self):
+        self.assertEqual(_global_stats()['total_dispositivos'], 0)
+
+
+class ParticionesTest(TestCase):
+    """Creación de particiones mensuales con filas en la partición por defecto"""
+
+    def test_mueve_filas_bajo_bloqueo(self):
+        mes = datetime(2001, 1, 1, tzinfo=dt_timezone.utc)
+        logs = AccessLog.objects.bulk_create(
+            AccessLog(username='historico', module='sensors', endpoint='/api/sensors/', method='GET', status_code=200)
+            for _ in range(2)
+        )
+        AccessLog.objects.filter(id__in=[log.id for log in logs]).update(timestamp=mes.replace(day=15))
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(partitions.ensure_partition('access_logs', mes), 2)
+        sql = [consulta['sql'] for consulta in consultas]
+        bloqueo = next(i for i, q in enumerate(sql) if q.startswith('LOCK TABLE access_logs_default'))
+        movimiento = next(i for i, q in enumerate(sql) if 'DELETE FROM access_logs_default' in q)
+        self.assertLess(bloqueo, movimiento)
+
+        self.assertIn(('access_logs_p2001_01', mes), partitions.list_partitions('access_logs'))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM access_logs_p2001_01')
+            self.assertEqual(cursor.fetchone()[0], 2)
+        self.assertIsNone(partitions.ensure_partition('access_logs', mes))
@@ -10,12 +10,13 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.core.signing import Signer, BadSignature
 import logging
 
-from .models import CustomUser, Rol, Permiso
+from .models import CustomUser, Rol, Permiso, AccessLog
 from .serializers import (
     CustomUserSerializer, CustomUserCreateUpdateSerializer,
     RolSerializer, PermisoSerializer, RegisterSerializer, LoginSerializer
 )
 from .permissions import IsSuperuser, CanManageUsers
+from .authentication import add_user_claims
 
 logger = logging.getLogger(__name__)
 
@@ -57,13 +58,15 @@ def login_view(request):
     if serializer.is_valid():
         user = serializer.validated_data['user']
         refresh = RefreshToken.for_user(user)
+        # Rol, permisos y dispositivos en el token si JWT_STATELESS_CLAIMS
+        access = add_user_claims(refresh.access_token, user)
         
         logger.info(f"Usuario autenticado: {user.username}")
         
         return Response({
             'user': CustomUserSerializer(user).data,
             'refresh': str(refresh),
-            'access': str(refresh.access_token),
+            'access': str(access),
             'message': 'Login exitoso'
         }, status=status.HTTP_200_OK)
     
@@ -100,7 +103,7 @@ class RolViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar Roles
     """
-    queryset = Rol.objects.all()
+    queryset = Rol.objects.prefetch_related('permisos')
     serializer_class = RolSerializer
     permission_classes = [IsAuthenticated, IsSuperuser]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -113,7 +116,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar Usuarios
     """
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.select_related('rol').prefetch_related('rol__permisos')
     permission_classes = [IsAuthenticated, CanManageUsers]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name']
@@ -188,35 +191,13 @@ def dashboard_stats(request):
     """
     Obtener estadisticas para el dashboard
     GET /api/dashboard/stats/
-    """
-    from apps.sensors.models import Sensor
-    from apps.devices.models import Dispositivo
-    from apps.readings.models import Lectura
-    
-    stats = {
-        'total_usuarios': CustomUser.objects.count(),
-        'total_sensores': Sensor.objects.count(),
-        'sensores_activos': Sensor.objects.filter(estado='activo').count(),
-        'total_dispositivos': Dispositivo.objects.count(),
-        'dispositivos_activos': Dispositivo.objects.filter(estado='activo').count(),
-        'dispositivos_mqtt': Dispositivo.objects.filter(mqtt_enabled=True).count(),
-        'total_lecturas': Lectura.objects.count(),
-    }
     
-    # Si es operador, solo mostrar sus estadisticas
-    if not request.user.is_superuser:
-        if request.user.rol and request.user.rol.nombre == 'operador':
-            dispositivos_operador = Dispositivo.objects.filter(
-                operador_asignado=request.user
-            )
-            stats.update({
-                'mis_dispositivos': dispositivos_operador.count(),
-                'mis_lecturas': Lectura.objects.filter(
-                    dispositivo__in=dispositivos_operador
-                ).count(),
-            })
+    Se sirven desde caché (DASHBOARD_CACHE_SECONDS) y total_lecturas es
+    una estimación en tablas grandes; ver apps.accounts.dashboard.
+    """
+    from .dashboard import get_stats
     
-    return Response(stats)
+    return Response(get_stats(request.user))
 
 
 # ============ Vistas de Cifrado/Descifrado ============
@@ -309,6 +290,47 @@ def decrypt_id_view(request):
 
 # ============ ViewSets de Auditoría ============
 
+def filter_date_range(queryset, params, field='timestamp'):
+    """
+    Filtra por from_date/to_date (fecha o fecha y hora ISO 8601)
+    
+    Un to_date sin hora incluye todo ese día. Los límites se pasan como
+    datetime con zona horaria para que PostgreSQL descarte las particiones
+    mensuales fuera del rango.
+    
+    Raises:
+        ValidationError: Si alguna fecha no es válida
+    """
+    from datetime import datetime, time, timedelta
+    from django.utils import timezone
+    from django.utils.dateparse import parse_date, parse_datetime
+    from rest_framework.exceptions import ValidationError
+    
+    for param, lookup in (('from_date', 'gte'), ('to_date', 'lte')):
+        value = params.get(param)
+        if not value:
+            continue
+        
+        try:
+            moment = parse_datetime(value)
+            day = None if moment else parse_date(value)
+        except ValueError:
+            moment = day = None
+        if moment is None and day is None:
+            raise ValidationError({param: f'Fecha inválida: {value}'})
+        
+        if day is not None:
+            moment = datetime.combine(day, time.min)
+            if param == 'to_date':
+                moment += timedelta(days=1)
+                lookup = 'lt'
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        queryset = queryset.filter(**{f'{field}__{lookup}': moment})
+    
+    return queryset
+
+
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para consultar registros de auditoría (solo lectura)
@@ -343,13 +365,8 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         if user_id:
             queryset = queryset.filter(user_id=user_id)
         
-        # Filtrar por rango de fechas
-        from_date = self.request.query_params.get('from_date', None)
-        to_date = self.request.query_params.get('to_date', None)
-        if from_date:
-            queryset = queryset.filter(timestamp__gte=from_date)
-        if to_date:
-            queryset = queryset.filter(timestamp__lte=to_date)
+        # Filtrar por rango de fechas (descarta particiones fuera del rango)
+        queryset = filter_date_range(queryset, self.request.query_params)
         
         return queryset
     
@@ -420,20 +437,15 @@ class AccessLogViewSet(viewsets.ReadOnlyModelViewSet):
         # Filtrar respuestas lentas
         slow_only = self.request.query_params.get('slow_only', None)
         if slow_only and slow_only.lower() == 'true':
-            queryset = queryset.filter(response_time_ms__gt=2000)
+            queryset = queryset.filter(response_time_ms__gt=AccessLog.SLOW_THRESHOLD_MS)
         
         # Filtrar por usuario
         user_id = self.request.query_params.get('user_id', None)
         if user_id and self.request.user.is_superuser:
             queryset = queryset.filter(user_id=user_id)
         
-        # Filtrar por rango de fechas
-        from_date = self.request.query_params.get('from_date', None)
-        to_date = self.request.query_params.get('to_date', None)
-        if from_date:
-            queryset = queryset.filter(timestamp__gte=from_date)
-        if to_date:
-            queryset = queryset.filter(timestamp__lte=to_date)
+        # Filtrar por rango de fechas (descarta particiones fuera del rango)
+        queryset = filter_date_range(queryset, self.request.query_params)
         
         return queryset
     
@@ -442,25 +454,156 @@ class AccessLogViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Obtener estadísticas de acceso
         GET /api/access-logs/stats/
+        
+        Para superusuarios, y si solo se filtra por module, method,
+        status_code, errors_only y fechas, se calcula sobre los agregados por
+        minuto (access_log_minutes), que cuentan todas las peticiones. En otro
+        caso (o con ?source=access_logs) se recorre access_logs y los conteos
+        suman sample_weight, así que estiman el total real de peticiones
+        aunque las respuestas exitosas estén muestreadas.
         """
-        from django.db.models import Count, Avg, Max, Min
-        from .models import AccessLog
+        from django.db.models import Count, F, Q, Sum
+        
+        if self._can_use_aggregates(request):
+            return Response(self._aggregate_stats(request.query_params))
         
         queryset = self.get_queryset()
+        weight = Sum('sample_weight')
+        
+        def weighted(field):
+            return {
+                key: round(count)
+                for key, count in queryset.values(field).annotate(count=weight).values_list(field, 'count')
+            }
+        
+        totals = queryset.aggregate(
+            total=weight,
+            rows=Count('id'),
+            timed=Sum('sample_weight', filter=Q(response_time_ms__isnull=False)),
+            time_sum=Sum(F('response_time_ms') * F('sample_weight')),
+            errors=Sum('sample_weight', filter=Q(status_code__gte=400)),
+        )
+        
+        most_accessed = queryset.values('endpoint', 'method').annotate(count=weight).order_by('-count')[:10]
         
         stats = {
-            'total_requests': queryset.count(),
-            'by_module': dict(queryset.values('module').annotate(count=Count('id')).values_list('module', 'count')),
-            'by_method': dict(queryset.values('method').annotate(count=Count('id')).values_list('method', 'count')),
-            'by_status': dict(queryset.values('status_code').annotate(count=Count('id')).values_list('status_code', 'count')),
-            'errors_count': queryset.filter(status_code__gte=400).count(),
-            'avg_response_time_ms': queryset.filter(response_time_ms__isnull=False).aggregate(Avg('response_time_ms'))['response_time_ms__avg'],
+            'source': 'access_logs',
+            'total_requests': round(totals['total'] or 0),
+            'sampled_rows': totals['rows'],
+            'by_module': weighted('module'),
+            'by_method': weighted('method'),
+            'by_status': weighted('status_code'),
+            'errors_count': round(totals['errors'] or 0),
+            'avg_response_time_ms': totals['time_sum'] / totals['timed'] if totals['timed'] else None,
             'slowest_endpoint': queryset.filter(response_time_ms__isnull=False).order_by('-response_time_ms').values('endpoint', 'response_time_ms').first(),
-            'most_accessed_endpoints': list(queryset.values('endpoint', 'method').annotate(count=Count('id')).order_by('-count')[:10])
+            'most_accessed_endpoints': [
+                {**row, 'count': round(row['count'])} for row in most_accessed
+            ]
         }
         
         return Response(stats)
     
+    # Filtros que se pueden responder con los agregados por minuto
+    AGGREGATE_FILTERS = {'module', 'method', 'status_code', 'errors_only', 'from_date', 'to_date'}
+    
+    def _can_use_aggregates(self, request):
+        params = request.query_params
+        if params.get('source') == 'access_logs' or not request.user.is_superuser:
+            return False
+        return all(key in self.AGGREGATE_FILTERS or key == 'source' for key in params)
+    
+    def _aggregate_stats(self, params):
+        """Estadísticas a partir de access_log_minutes"""
+        from django.db.models import Q, Sum
+        from .models import AccessLogAggregate
+        
+        queryset = AccessLogAggregate.objects.all()
+        if params.get('module'):
+            queryset = queryset.filter(module=params['module'])
+        if params.get('method'):
+            queryset = queryset.filter(method=params['method'].upper())
+        if params.get('status_code'):
+            queryset = queryset.filter(status_code=params['status_code'])
+        if params.get('errors_only', '').lower() == 'true':
+            queryset = queryset.filter(status_code__gte=400)
+        # Resolución de un minuto
+        queryset = filter_date_range(queryset, params, field='bucket')
+        
+        def grouped(field):
+            return dict(queryset.values(field).annotate(count=Sum('count')).values_list(field, 'count'))
+        
+        bucket_fields = AccessLogAggregate.BUCKET_FIELDS
+        totals = queryset.aggregate(
+            total=Sum('count'),
+            errors=Sum('count', filter=Q(status_code__gte=400)),
+            time_sum=Sum('latency_sum_ms'),
+            **{field: Sum(field) for field in bucket_fields}
+        )
+        histogram = [totals[field] or 0 for field in bucket_fields]
+        timed = sum(histogram)
+        
+        slowest = queryset.filter(latency_max_ms__gt=0).order_by('-latency_max_ms').values('endpoint', 'latency_max_ms').first()
+        most_accessed = queryset.values('endpoint', 'method').annotate(count=Sum('count')).order_by('-count')[:10]
+        
+        return {
+            'source': 'aggregates',
+            'total_requests': totals['total'] or 0,
+            'by_module': grouped('module'),
+            'by_method': grouped('method'),
+            'by_status': grouped('status_code'),
+            'errors_count': totals['errors'] or 0,
+            'avg_response_time_ms': totals['time_sum'] / timed if timed else None,
+            'latency_percentiles_ms': {
+                f'p{int(quantile * 100)}': self._histogram_quantile(histogram, quantile)
+                for quantile in (0.5, 0.95, 0.99)
+            },
+            'slowest_endpoint': {
+                'endpoint': slowest['endpoint'],
+                'response_time_ms': slowest['latency_max_ms'],
+            } if slowest else None,
+            'most_accessed_endpoints': list(most_accessed),
+        }
+    
+    @staticmethod
+    def _histogram_quantile(histogram, quantile):
+        """
+        Estima un percentil interpolando dentro del bucket (como Prometheus).
+        Si cae en el último bucket se devuelve el último límite conocido.
+        """
+        from .models import AccessLogAggregate
+        
+        total = sum(histogram)
+        if not total:
+            return None
+        
+        limits = AccessLogAggregate.LATENCY_BUCKETS
+        rank = quantile * total
+        cumulative = 0
+        for index, count in enumerate(histogram):
+            if cumulative + count >= rank and count:
+                if index == len(limits):
+                    return limits[-1]
+                lower = limits[index - 1] if index else 0
+                return round(lower + (limits[index] - lower) * (rank - cumulative) / count, 1)
+            cumulative += count
+        return limits[-1]
+    
+    @action(detail=False, methods=['get'], url_path='writer-status')
+    def writer_status(self, request):
+        """
+        Estado del escritor de registros de este proceso (cola, descartes)
+        GET /api/access-logs/writer-status/
+        """
+        from .access_log_writer import access_log_writer
+        
+        if not request.user.is_superuser:
+            return Response(
+                {'error': 'Solo superusuarios pueden ver el estado del escritor'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return Response(access_log_writer.stats())
+    
     @action(detail=False, methods=['post'])
     def create_log(self, request):
         """
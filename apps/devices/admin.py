@@ -3,7 +3,7 @@ Configuracion del Django Admin para la app Devices
 """
 
 from django.contrib import admin
-from .models import Dispositivo, DispositivoSensor
+from .models import Dispositivo, DispositivoAPIKey, DispositivoSensor
 
 
 @admin.register(Dispositivo)
@@ -45,3 +45,24 @@ class DispositivoSensorAdmin(admin.ModelAdmin):
     search_fields = ['dispositivo__nombre', 'sensor__nombre']
     ordering = ['-fecha_asignacion']
     readonly_fields = ['fecha_asignacion']
+
+
+@admin.register(DispositivoAPIKey)
+class DispositivoAPIKeyAdmin(admin.ModelAdmin):
+    """
+    Admin para claves de API de dispositivos
+    
+    Se generan desde POST /api/devices/{id}/api_keys/ (la clave en claro no
+    se guarda); aquí solo se pueden revocar desmarcando "activa".
+    """
+    list_display = ['prefijo', 'dispositivo', 'nombre', 'activa', 'expira_en', 'ultimo_uso', 'created_at']
+    list_filter = ['activa', 'created_at']
+    search_fields = ['prefijo', 'nombre', 'dispositivo__nombre', 'dispositivo__identificador_unico']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'dispositivo', 'prefijo', 'clave_hash', 'ultimo_uso', 'creada_por', 'created_at'
+    ]
+    
+    def has_add_permission(self, request):
+        """Las claves se generan por la API"""
+        return False
@@ -0,0 +1,188 @@
+"""
+Autenticación de dispositivos con clave de API
+
+Los dispositivos que envían lecturas (POST /api/readings/ y
+/api/readings/bulk/) se autentican con su propia clave
+(Authorization: ApiKey iot_<prefijo>_<secreto>, ver DispositivoAPIKey) en
+lugar del JWT de un usuario. La clave se busca por prefijo en una caché en
+memoria del proceso (api_key_cache) junto con el dispositivo y sus sensores
+asignados activos: autenticar y acotar la petición no consulta usuarios,
+roles ni permisos, y con la caché caliente no toca la base.
+
+Guardar o borrar una clave, el dispositivo o sus asignaciones descarta las
+entradas del proceso (ver apps.accounts.signals); los demás procesos las
+recargan al pasar DEVICE_API_KEY_CACHE_SECONDS.
+"""
+
+from collections import OrderedDict
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework import authentication, exceptions
+
+from .models import DispositivoAPIKey, DispositivoSensor
+
+KEYWORD = 'ApiKey'
+
+# Claves en caché por proceso; al superarlo se descarta la usada hace más tiempo
+MAX_ENTRIES = 10000
+
+
+class DispositivoAutenticado:
+    """
+    request.user de una petición autenticada con clave de API
+
+    Solo tiene acceso a la ingesta de lecturas del dispositivo (ver
+    CanCreateReadings) y a los sensores asignados (sensor_ids). dispositivo
+    es la instancia en caché: no se debe modificar.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_superuser = False
+    is_staff = False
+    pk = id = None
+    rol = None
+    permission_codes = frozenset()
+
+    def __init__(self, dispositivo, sensor_ids):
+        self.dispositivo = dispositivo
+        self.username = f'dispositivo:{dispositivo.identificador_unico}'
+        self.sensor_ids = sensor_ids
+        self.assigned_device_ids = frozenset((dispositivo.id,))
+
+    def __str__(self):
+        return self.username
+
+    def has_permission(self, permission_code):
+        return False
+
+
+def dispositivo_autenticado(request):
+    """El DispositivoAutenticado de la petición, o None si es un usuario"""
+    user = getattr(request, 'user', None)
+    return user if isinstance(user, DispositivoAutenticado) else None
+
+
+class APIKeyCache:
+    """
+    Claves de API del proceso por prefijo, con su dispositivo y sensores
+
+    LRU acotada a MAX_ENTRIES. Los prefijos inexistentes no se guardan:
+    claves inventadas no desplazan a las de los dispositivos reales.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _load(self, prefijo):
+        api_key = DispositivoAPIKey.objects.select_related('dispositivo').filter(prefijo=prefijo).first()
+        if api_key is None:
+            return None
+
+        dispositivo = api_key.dispositivo
+        sensor_ids = frozenset(
+            DispositivoSensor.objects.filter(dispositivo=dispositivo, activo=True)
+            .values_list('sensor_id', flat=True)
+        )
+        DispositivoAPIKey.objects.filter(pk=api_key.pk).update(ultimo_uso=timezone.now())
+        return {
+            'clave_hash': api_key.clave_hash,
+            'activa': api_key.activa,
+            'expira_en': api_key.expira_en and api_key.expira_en.timestamp(),
+            'dispositivo_id': dispositivo.id,
+            'principal': DispositivoAutenticado(dispositivo, sensor_ids),
+        }
+
+    def get(self, prefijo):
+        """Entrada del prefijo (None si no existe), cargándola si venció"""
+        with self._lock:
+            cargada = self._entries.get(prefijo)
+            if cargada is not None and time.monotonic() - cargada[0] <= settings.DEVICE_API_KEY_CACHE_SECONDS:
+                self._entries.move_to_end(prefijo)
+                return cargada[1]
+
+        entry = self._load(prefijo)
+        if entry is None:
+            return None
+        with self._lock:
+            self._entries[prefijo] = (time.monotonic(), entry)
+            self._entries.move_to_end(prefijo)
+            while len(self._entries) > MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return entry
+
+    def forget(self, prefijo):
+        with self._lock:
+            self._entries.pop(prefijo, None)
+
+    def forget_device(self, dispositivo_id):
+        """Descarta las claves del dispositivo (cambió él o sus sensores)"""
+        with self._lock:
+            self._entries = OrderedDict(
+                (prefijo, cargada) for prefijo, cargada in self._entries.items()
+                if cargada[1]['dispositivo_id'] != dispositivo_id
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+
+
+# Instancia global del proceso
+api_key_cache = APIKeyCache()
+
+
+class DispositivoAPIKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Autentica Authorization: ApiKey <clave> contra api_key_cache
+
+    Las peticiones con otro esquema (p. ej. Bearer) se dejan a las demás
+    clases de autenticación.
+    """
+    keyword = KEYWORD
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Encabezado de clave de API inválido.')
+
+        try:
+            clave = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Clave de API inválida.')
+
+        prefijo = DispositivoAPIKey.separar_clave(clave)
+        entry = api_key_cache.get(prefijo) if prefijo else None
+        if entry is None or not hmac.compare_digest(entry['clave_hash'], DispositivoAPIKey.hash_clave(clave)):
+            raise exceptions.AuthenticationFailed('Clave de API inválida.')
+        if not entry['activa']:
+            raise exceptions.AuthenticationFailed('La clave de API fue revocada.')
+        if entry['expira_en'] is not None and entry['expira_en'] <= time.time():
+            raise exceptions.AuthenticationFailed('La clave de API expiró.')
+
+        return entry['principal'], prefijo
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class DispositivoAPIKeyScheme(OpenApiAuthenticationExtension):
+    """Esquema de seguridad OpenAPI de las claves de API de dispositivos"""
+    target_class = 'apps.devices.authentication.DispositivoAPIKeyAuthentication'
+    name = 'deviceApiKey'
+
+    def get_security_definition(self, auto_schema):
+        return {
+            'type': 'apiKey',
+            'in': 'header',
+            'name': 'Authorization',
+            'description': f'Clave de API del dispositivo: "{KEYWORD} iot_<prefijo>_<secreto>"',
+        }
@@ -0,0 +1,182 @@
+"""
+Flotas sintéticas de dispositivos, sensores y lecturas
+
+Para benchmarks y pruebas de carga. Todo se crea por lotes: bulk_create no
+dispara las señales post_save de Dispositivo y las lecturas históricas se
+generan con un solo INSERT ... SELECT. Los dispositivos de una flota
+comparten el prefijo de identificador_unico, con el que se borran después
+(eliminar_flota). Con password_mqtt se crean también sus usuarios EMQX y
+reglas ACL (las mismas de apps.mqtt.signals), todos con esa contraseña.
+"""
+
+import logging
+import random
+
+from django.db import connection, transaction
+
+from .models import Dispositivo, DispositivoSensor
+from apps.sensors.models import Sensor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# (tipo, unidad, rango_min, rango_max, intervalo de publicación en segundos)
+PERFILES_SENSOR = [
+    ('temperatura', '°C', -10.0, 50.0, 60),
+    ('humedad', '%', 0.0, 100.0, 60),
+    ('presion', 'hPa', 900.0, 1100.0, 300),
+    ('luz', 'lux', 0.0, 100000.0, 30),
+    ('gas', 'ppm', 0.0, 5000.0, 10),
+    ('distancia', 'cm', 0.0, 400.0, 5),
+]
+
+TIPOS_DISPOSITIVO = ['esp32', 'esp8266', 'raspberry_pi', 'arduino']
+
+
+def crear_flota(dispositivos, sensores_por_dispositivo, lecturas_por_sensor=0,
+                prefijo='flota', operador=None, semilla=42, password_mqtt=None):
+    """
+    Crea una flota sintética
+
+    Args:
+        dispositivos: Cantidad de dispositivos
+        sensores_por_dispositivo: Sensores (propios) asignados a cada dispositivo
+        lecturas_por_sensor: Lecturas históricas por sensor, separadas por su
+            publish_interval hacia atrás desde ahora
+        prefijo: Prefijo de identificador_unico y de los nombres
+        operador: Usuario asignado a todos los dispositivos (opcional)
+        password_mqtt: Si se indica, crea un usuario EMQX por dispositivo
+            (device_<identificador_unico>) con esta contraseña y sus ACL
+
+    Returns:
+        dict: Cantidades creadas
+    """
+    rng = random.Random(semilla)
+
+    with transaction.atomic():
+        nuevos = [
+            Dispositivo(
+                nombre=f'{prefijo} {i:06d}',
+                tipo=rng.choice(TIPOS_DISPOSITIVO),
+                identificador_unico=f'{prefijo}-{i:06d}',
+                ubicacion=f'Lote {i % 50 + 1}',
+                estado='activo',
+                mqtt_enabled=True,
+                mqtt_client_id=f'device_{prefijo}-{i:06d}',
+                connection_status='online' if rng.random() < 0.8 else 'offline',
+                operador_asignado=operador,
+            )
+            for i in range(dispositivos)
+        ]
+        creados = Dispositivo.objects.bulk_create(nuevos, batch_size=BATCH_SIZE)
+
+        sensores = []
+        for dispositivo in creados:
+            for j in range(sensores_por_dispositivo):
+                tipo, unidad, minimo, maximo, intervalo = PERFILES_SENSOR[j % len(PERFILES_SENSOR)]
+                sensores.append(Sensor(
+                    nombre=f'{dispositivo.identificador_unico} {tipo} {j}',
+                    tipo=tipo,
+                    unidad_medida=unidad,
+                    rango_min=minimo,
+                    rango_max=maximo,
+                    estado='activo',
+                    mqtt_topic_suffix=tipo,
+                    publish_interval=intervalo,
+                ))
+        sensores = Sensor.objects.bulk_create(sensores, batch_size=BATCH_SIZE)
+
+        # Los sensores se crearon en orden, sensores_por_dispositivo por dispositivo
+        asignaciones = [
+            DispositivoSensor(dispositivo=creados[k // sensores_por_dispositivo], sensor=sensor)
+            for k, sensor in enumerate(sensores)
+        ]
+        DispositivoSensor.objects.bulk_create(asignaciones, batch_size=BATCH_SIZE)
+
+        usuarios_mqtt = 0
+        if password_mqtt:
+            usuarios_mqtt = _crear_usuarios_emqx(creados, password_mqtt)
+
+        lecturas = 0
+        if lecturas_por_sensor:
+            lecturas = _generar_lecturas(prefijo, lecturas_por_sensor)
+
+    logger.info(
+        f"Flota '{prefijo}' creada: {len(creados)} dispositivos, "
+        f"{len(sensores)} sensores, {lecturas} lecturas"
+    )
+    return {
+        'dispositivos': len(creados),
+        'sensores': len(sensores),
+        'asignaciones': len(asignaciones),
+        'usuarios_mqtt': usuarios_mqtt,
+        'lecturas': lecturas,
+    }
+
+
+def _crear_usuarios_emqx(dispositivos, password):
+    """Usuarios EMQX y reglas ACL por lotes, sin las señales de apps.mqtt"""
+    from apps.mqtt.models import EMQXACL, EMQXUser
+    from apps.mqtt.signals import default_acl_rules
+
+    usuarios = []
+    for dispositivo in dispositivos:
+        usuario = EMQXUser(username=dispositivo.mqtt_client_id, dispositivo=dispositivo)
+        usuario.set_password(password)
+        usuarios.append(usuario)
+    usuarios = EMQXUser.objects.bulk_create(usuarios, batch_size=BATCH_SIZE)
+
+    reglas = [
+        regla
+        for usuario, dispositivo in zip(usuarios, dispositivos)
+        for regla in default_acl_rules(usuario, dispositivo)
+    ]
+    EMQXACL.objects.bulk_create(reglas, batch_size=BATCH_SIZE)
+    return len(usuarios)
+
+
+def _generar_lecturas(prefijo, lecturas_por_sensor):
+    """Lecturas históricas dentro del rango de cada sensor, en un solo INSERT"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO lecturas (dispositivo_id, sensor_id, valor, timestamp, metadata_json, mqtt_retained)
+            SELECT ds.dispositivo_id,
+                   ds.sensor_id,
+                   s.rango_min + random() * (s.rango_max - s.rango_min),
+                   now() - g * make_interval(secs => COALESCE(s.publish_interval, 60)),
+                   jsonb_build_object('rssi', -40 - floor(random() * 80)::int,
+                                      'bateria', floor(random() * 101)::int),
+                   false
+            FROM dispositivos_sensores ds
+            JOIN dispositivos d ON d.id = ds.dispositivo_id
+            JOIN sensores s ON s.id = ds.sensor_id
+            CROSS JOIN generate_series(1, %s) g
+            WHERE d.identificador_unico LIKE %s
+        """, [lecturas_por_sensor, f'{prefijo}-%'])
+        return cursor.rowcount
+
+
+def dispositivos_de_flota(prefijo):
+    return Dispositivo.objects.filter(identificador_unico__startswith=f'{prefijo}-')
+
+
+def eliminar_flota(prefijo):
+    """
+    Borra los dispositivos de la flota, sus sensores y todo lo que cuelga de ellos
+
+    Returns:
+        int: Dispositivos borrados
+    """
+    from apps.mqtt.models import EMQXUser
+
+    dispositivos = dispositivos_de_flota(prefijo)
+    with transaction.atomic():
+        # En bloque antes que los dispositivos: las ACL caen por CASCADE
+        EMQXUser.objects.filter(dispositivo__in=dispositivos).delete()
+        sensores = list(
+            Sensor.objects.filter(dispositivosensor__dispositivo__in=dispositivos).values_list('id', flat=True)
+        )
+        Sensor.objects.filter(id__in=sensores).delete()
+        _, borrados = dispositivos.delete()
+    return borrados.get(Dispositivo._meta.label, 0)
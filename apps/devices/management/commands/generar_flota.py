@@ -0,0 +1,77 @@
+"""
+Management command que crea (o elimina) una flota sintética de dispositivos
+
+Todo por lotes (apps.devices.flota): miles de dispositivos, sensores,
+asignaciones, usuarios EMQX con sus ACL y lecturas históricas en segundos,
+sin las señales por dispositivo. Para planificación de capacidad junto con
+`manage.py simular_carga`:
+    python manage.py generar_flota --dispositivos 5000 --sensores 4 --password-mqtt secreto
+    python manage.py generar_flota --eliminar
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import CustomUser
+from apps.devices.flota import crear_flota, dispositivos_de_flota, eliminar_flota
+
+
+class Command(BaseCommand):
+    help = 'Crea una flota sintética de dispositivos, sensores y lecturas por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dispositivos', type=int, default=1000, help='Cantidad de dispositivos (default: 1000)')
+        parser.add_argument('--sensores', type=int, default=4, help='Sensores por dispositivo (default: 4)')
+        parser.add_argument('--lecturas', type=int, default=0, help='Lecturas históricas por sensor (default: 0)')
+        parser.add_argument('--prefijo', default='flota', help='Prefijo de identificador_unico (default: flota)')
+        parser.add_argument('--operador', help='Username del operador asignado a los dispositivos')
+        parser.add_argument(
+            '--password-mqtt',
+            help='Crear usuarios EMQX (device_<identificador>) con esta contraseña y sus ACL',
+        )
+        parser.add_argument('--eliminar', action='store_true', help='Eliminar la flota con este prefijo')
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+
+        if options['eliminar']:
+            inicio = time.perf_counter()
+            borrados = eliminar_flota(prefijo)
+            self.stdout.write(self.style.SUCCESS(
+                f"🗑 {borrados} dispositivos de '{prefijo}' eliminados ({time.perf_counter() - inicio:.1f} s)"
+            ))
+            return
+
+        if dispositivos_de_flota(prefijo).exists():
+            raise CommandError(f"Ya existe una flota '{prefijo}'; elimínela con --eliminar o use otro --prefijo")
+
+        operador = None
+        if options['operador']:
+            operador = CustomUser.objects.filter(username=options['operador']).first()
+            if operador is None:
+                raise CommandError(f"No existe el usuario '{options['operador']}'")
+
+        self.stdout.write(
+            f"📦 Creando flota '{prefijo}': {options['dispositivos']} dispositivos x "
+            f"{options['sensores']} sensores, {options['lecturas']} lecturas por sensor"
+        )
+        inicio = time.perf_counter()
+        creados = crear_flota(
+            options['dispositivos'],
+            options['sensores'],
+            options['lecturas'],
+            prefijo=prefijo,
+            operador=operador,
+            password_mqtt=options['password_mqtt'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {creados['dispositivos']} dispositivos, {creados['sensores']} sensores, "
+            f"{creados['usuarios_mqtt']} usuarios EMQX y {creados['lecturas']} lecturas "
+            f"en {time.perf_counter() - inicio:.1f} s"
+        ))
+        if not options['password_mqtt']:
+            self.stdout.write(self.style.WARNING(
+                '⚠ Sin --password-mqtt los dispositivos no tienen usuario EMQX; '
+                'simular_carga --destino mqtt necesitará --usuario'
+            ))
@@ -0,0 +1,85 @@
+"""
+Management command que simula el tráfico de una flota sintética
+
+Publica lecturas de cada sensor según su publish_interval en el broker MQTT
+o en POST /api/readings/bulk/ (ver benchmarks.simular_carga) y reporta tasa
+lograda, latencias y errores:
+    python manage.py simular_carga --prefijo flota --password secreto --duracion 60
+    python manage.py simular_carga --destino http --token <jwt> --velocidad 10
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import simular_carga
+
+
+class Command(BaseCommand):
+    help = 'Publica lecturas de una flota sintética a MQTT o a la API y mide el resultado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default='flota', help='Flota a simular (default: flota)')
+        parser.add_argument('--destino', choices=['mqtt', 'http'], default='mqtt')
+        parser.add_argument('--duracion', type=float, default=60, help='Segundos de simulación (default: 60)')
+        parser.add_argument(
+            '--velocidad',
+            type=float,
+            default=1.0,
+            help='Multiplica la tasa de publicación de cada sensor (default: 1)',
+        )
+        parser.add_argument('--jitter', type=float, default=0.1, help='Variación del intervalo, 0.1 = ±10%% (default: 0.1)')
+        parser.add_argument('--host', default='localhost', help='Broker MQTT (default: localhost)')
+        parser.add_argument('--port', type=int, default=1883, help='Puerto MQTT (default: 1883)')
+        parser.add_argument('--password', help='Contraseña MQTT de la flota, o de --usuario')
+        parser.add_argument('--usuario', help='Superusuario MQTT: usa conexiones compartidas en lugar de una por dispositivo')
+        parser.add_argument('--conexiones', type=int, default=10, help='Conexiones compartidas con --usuario (default: 10)')
+        parser.add_argument('--monitor', action='store_true', help='Medir la latencia de entrega con un suscriptor')
+        parser.add_argument('--url', default='http://localhost:8000', help='URL base de la API (destino http)')
+        parser.add_argument('--token', help='Access token JWT (destino http)')
+        parser.add_argument('--lote', type=int, default=simular_carga.LOTE_HTTP, help='Lecturas por POST (destino http)')
+        parser.add_argument('--concurrencia', type=int, default=4, help='POST en paralelo (destino http)')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el resumen')
+
+    def handle(self, *args, **options):
+        try:
+            resumen = simular_carga.ejecutar(
+                options['prefijo'],
+                options['destino'],
+                options['duracion'],
+                velocidad=options['velocidad'],
+                jitter=options['jitter'],
+                host=options['host'],
+                port=options['port'],
+                password=options['password'],
+                usuario=options['usuario'],
+                conexiones=options['conexiones'],
+                monitor=options['monitor'],
+                url=options['url'],
+                token=options['token'],
+                lote=options['lote'],
+                concurrencia=options['concurrencia'],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"\n📊 {resumen['confirmadas']}/{resumen['enviadas']} lecturas en {resumen['duracion_s']} s: "
+            f"{resumen['tasa_lograda']}/s (objetivo {resumen['tasa_objetivo']}/s)"
+        )
+        for nombre in ('latencia', 'latencia_entrega'):
+            if nombre in resumen:
+                latencia = resumen[nombre]
+                self.stdout.write(
+                    f"   {nombre}: p50 {latencia['p50_ms']} ms  p95 {latencia['p95_ms']} ms  "
+                    f"p99 {latencia['p99_ms']} ms"
+                )
+        if resumen['errores']:
+            for motivo, cantidad in resumen['errores'].items():
+                self.stdout.write(self.style.WARNING(f'   ⚠ {motivo}: {cantidad}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('   ✓ Sin errores'))
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as salida:
+                json.dump(resumen, salida, indent=2, ensure_ascii=False)
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispositivoAPIKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(blank=True, max_length=100, verbose_name='Nombre')),
+                ('prefijo', models.CharField(help_text='Parte pública de la clave, usada para buscarla', max_length=16, unique=True, verbose_name='Prefijo')),
+                ('clave_hash', models.CharField(max_length=64, verbose_name='Hash de la Clave')),
+                ('activa', models.BooleanField(default=True, verbose_name='Activa')),
+                ('expira_en', models.DateTimeField(blank=True, null=True, verbose_name='Expira En')),
+                ('ultimo_uso', models.DateTimeField(blank=True, help_text='Aproximado: se actualiza al cargar la clave en la caché de un proceso', null=True, verbose_name='Último Uso')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('creada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='api_keys_creadas', to=settings.AUTH_USER_MODEL, verbose_name='Creada Por')),
+                ('dispositivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_keys', to='devices.dispositivo', verbose_name='Dispositivo')),
+            ],
+            options={
+                'verbose_name': 'Clave de API de Dispositivo',
+                'verbose_name_plural': 'Claves de API de Dispositivos',
+                'db_table': 'dispositivos_api_keys',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -2,6 +2,9 @@
 Modelos de la app Devices - Gestión de Dispositivos IoT
 """
 
+import hashlib
+import secrets
+
 from django.db import models
 from django.conf import settings
 
@@ -121,6 +124,16 @@ class Dispositivo(models.Model):
     
     def __str__(self):
         return f"{self.nombre} ({self.identificador_unico})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda los valores cargados para detectar cambios de estado al guardar
+        (contadores de apps.mqtt.fleet_status)
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
 
 class DispositivoSensor(models.Model):
@@ -162,3 +175,90 @@ class DispositivoSensor(models.Model):
     
     def __str__(self):
         return f"{self.dispositivo.nombre} - {self.sensor.nombre}"
+
+
+class DispositivoAPIKey(models.Model):
+    """
+    Clave de API de un dispositivo para enviar lecturas sin un usuario
+
+    La clave tiene la forma iot_<prefijo>_<secreto>: el prefijo se guarda en
+    claro para buscarla y del resto solo el SHA-256 (el secreto es aleatorio
+    de 256 bits, no necesita salt ni un hash lento). La clave en claro solo
+    se conoce al generarla (ver generar()).
+    """
+    PREFIJO_CLAVE = 'iot'
+    
+    dispositivo = models.ForeignKey(
+        Dispositivo,
+        on_delete=models.CASCADE,
+        related_name='api_keys',
+        verbose_name='Dispositivo'
+    )
+    nombre = models.CharField(max_length=100, blank=True, verbose_name='Nombre')
+    prefijo = models.CharField(
+        max_length=16,
+        unique=True,
+        verbose_name='Prefijo',
+        help_text='Parte pública de la clave, usada para buscarla'
+    )
+    clave_hash = models.CharField(max_length=64, verbose_name='Hash de la Clave')
+    activa = models.BooleanField(default=True, verbose_name='Activa')
+    expira_en = models.DateTimeField(null=True, blank=True, verbose_name='Expira En')
+    ultimo_uso = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Último Uso',
+        help_text='Aproximado: se actualiza al cargar la clave en la caché de un proceso'
+    )
+    creada_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='api_keys_creadas',
+        verbose_name='Creada Por'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    
+    class Meta:
+        verbose_name = 'Clave de API de Dispositivo'
+        verbose_name_plural = 'Claves de API de Dispositivos'
+        ordering = ['-created_at']
+        db_table = 'dispositivos_api_keys'
+    
+    def __str__(self):
+        return f"{self.dispositivo.nombre} - {self.prefijo}"
+    
+    @staticmethod
+    def hash_clave(clave):
+        return hashlib.sha256(clave.encode()).hexdigest()
+    
+    @classmethod
+    def separar_clave(cls, clave):
+        """Prefijo de la clave, o None si no tiene el formato esperado"""
+        partes = clave.split('_', 2)
+        if len(partes) != 3 or partes[0] != cls.PREFIJO_CLAVE or not partes[2]:
+            return None
+        if not (partes[1].isascii() and partes[1].isalnum()) or len(partes[1]) > cls._meta.get_field('prefijo').max_length:
+            return None
+        return partes[1]
+    
+    @classmethod
+    def generar(cls, dispositivo, nombre='', creada_por=None, expira_en=None):
+        """
+        Crea una clave para el dispositivo
+        
+        Returns:
+            tuple: (DispositivoAPIKey, clave en claro)
+        """
+        prefijo = secrets.token_hex(6)
+        clave = f'{cls.PREFIJO_CLAVE}_{prefijo}_{secrets.token_urlsafe(32)}'
+        api_key = cls.objects.create(
+            dispositivo=dispositivo,
+            nombre=nombre,
+            prefijo=prefijo,
+            clave_hash=cls.hash_clave(clave),
+            creada_por=creada_por,
+            expira_en=expira_en,
+        )
+        return api_key, clave
@@ -3,7 +3,11 @@ Serializers para la app Devices
 """
 
 from rest_framework import serializers
-from .models import Dispositivo, DispositivoSensor
+from django.utils import timezone
+
+from .models import Dispositivo, DispositivoAPIKey, DispositivoSensor
+from apps.accounts.metrics import TimedListSerializer, TimedSerializerMixin
+from apps.accounts.sparse_fields import SparseFieldsSerializerMixin
 from apps.sensors.serializers import SensorSerializer
 
 
@@ -28,9 +32,12 @@ class DispositivoSensorSerializer(serializers.ModelSerializer):
         read_only_fields = ['fecha_asignacion']
 
 
-class DispositivoSerializer(serializers.ModelSerializer):
+class DispositivoSerializer(TimedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer para el modelo Dispositivo
+    
+    En el listado los sensores asignados solo se incluyen con
+    ?expand=sensores_asignados (ver apps.accounts.sparse_fields)
     """
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
@@ -51,6 +58,7 @@ class DispositivoSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Dispositivo
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'nombre', 'tipo', 'tipo_display', 'identificador_unico',
             'ubicacion', 'estado', 'estado_display', 'descripcion',
@@ -59,9 +67,21 @@ class DispositivoSerializer(serializers.ModelSerializer):
             'sensores_asignados', 'cantidad_sensores', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+        list_fields = [
+            'id', 'nombre', 'tipo', 'tipo_display', 'identificador_unico',
+            'ubicacion', 'estado', 'estado_display', 'mqtt_enabled', 'last_seen',
+            'connection_status', 'connection_status_display', 'operador_asignado',
+            'operador_username', 'cantidad_sensores'
+        ]
+        expandable_fields = {'sensores_asignados': ['sensores_asignados']}
     
     def get_cantidad_sensores(self, obj):
-        return obj.sensores.count()
+        # Anotado por DispositivoViewSet cuando no se precargan las asignaciones
+        if hasattr(obj, 'num_sensores'):
+            return obj.num_sensores
+        # Las asignaciones ya se cargan para sensores_asignados (precargadas en
+        # DispositivoViewSet); contarlas en memoria evita un COUNT por dispositivo
+        return len(obj.dispositivosensor_set.all())
     
     def validate_identificador_unico(self, value):
         # Verificar que el identificador unico no exista ya
@@ -132,3 +152,29 @@ class AsignarOperadorDispositivoSerializer(serializers.Serializer):
         except CustomUser.DoesNotExist:
             raise serializers.ValidationError("El usuario no existe.")
         return value
+
+
+class DispositivoAPIKeySerializer(serializers.ModelSerializer):
+    """
+    Serializer para las claves de API de un dispositivo (sin el hash)
+    """
+    creada_por_username = serializers.CharField(
+        source='creada_por.username',
+        read_only=True,
+        default=None
+    )
+    
+    class Meta:
+        model = DispositivoAPIKey
+        fields = [
+            'id', 'nombre', 'prefijo', 'activa', 'expira_en', 'ultimo_uso',
+            'creada_por', 'creada_por_username', 'created_at'
+        ]
+        read_only_fields = [
+            'prefijo', 'activa', 'ultimo_uso', 'creada_por', 'created_at'
+        ]
+    
+    def validate_expira_en(self, value):
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError("La fecha de expiración debe ser futura.")
+        return value
@@ -0,0 +1,125 @@
+"""
+Tests de la app Devices
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import CustomUser
+from apps.accounts.testing import ConsultasConstantesMixin
+from apps.readings.models import Lectura, LecturaRechazada
+from .authentication import api_key_cache
+from .flota import crear_flota, dispositivos_de_flota
+from .models import DispositivoAPIKey, DispositivoSensor
+
+
+class DispositivoListConsultasTest(ConsultasConstantesMixin, APITestCase):
+    """
+    El listado de dispositivos usa las mismas consultas con cualquier
+    tamaño de página (sin N+1 en DispositivoSerializer)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_superuser(
+            username='admin-consultas', email='admin-consultas@example.com', password='x'
+        )
+        crear_flota(100, 3, prefijo='consultas', operador=cls.usuario)
+
+    def test_listado(self):
+        # COUNT del paginador y página con cantidad_sensores anotada
+        self.assertConsultasConstantes('device-list', 2)
+
+    def test_listado_con_sensores_asignados(self):
+        # COUNT, página y asignaciones con sus sensores y creadores
+        self.assertConsultasConstantes('device-list', 3, '&expand=sensores_asignados')
+        response = self.client.get(f"{reverse('device-list')}?page_size=1&expand=sensores_asignados")
+        dispositivo = response.data['results'][0]
+        self.assertEqual(len(dispositivo['sensores_asignados']), 3)
+        self.assertEqual(dispositivo['cantidad_sensores'], 3)
+
+
+@override_settings(ACCESS_LOG_EXCLUDE_PATTERNS=['^/api/'])
+class APIKeyTest(APITestCase):
+    """Ingesta con la clave de API de un dispositivo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin-claves', email='admin-claves@example.com', password='x'
+        )
+        crear_flota(2, 1, prefijo='claves')
+        cls.propio, cls.otro = dispositivos_de_flota('claves').order_by('id')
+        cls.sensor_propio = DispositivoSensor.objects.get(dispositivo=cls.propio).sensor_id
+        cls.sensor_otro = DispositivoSensor.objects.get(dispositivo=cls.otro).sensor_id
+        cls.api_key, cls.clave = DispositivoAPIKey.generar(cls.propio, nombre='test')
+
+    def setUp(self):
+        api_key_cache.clear()
+
+    def enviar(self, lecturas, clave=None):
+        return self.client.post(
+            reverse('reading-bulk'), {'lecturas': lecturas}, format='json',
+            HTTP_AUTHORIZATION=f'ApiKey {clave or self.clave}',
+        )
+
+    def test_clave_valida(self):
+        response = self.enviar([{'sensor': self.sensor_propio, 'valor': 20}])
+        self.assertEqual(response.status_code, 201, response.data)
+        lectura = Lectura.objects.get()
+        self.assertEqual((lectura.dispositivo_id, lectura.sensor_id), (self.propio.id, self.sensor_propio))
+
+    def test_solo_sensores_del_dispositivo(self):
+        response = self.enviar([
+            {'sensor': self.sensor_propio, 'valor': 20},
+            {'sensor': self.sensor_otro, 'valor': 20},
+            {'dispositivo': self.otro.id, 'sensor': self.sensor_otro, 'valor': 20},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(error['indice'], error['motivo']) for error in response.data['errores']],
+            [(1, 'sensor_no_asignado'), (2, 'no_autorizado')],
+        )
+        # El rechazo no_autorizado queda a nombre del dispositivo de la clave
+        self.assertEqual(LecturaRechazada.objects.get(motivo='no_autorizado').dispositivo_id, self.propio.id)
+        self.assertEqual(Lectura.objects.count(), 1)
+
+    def test_clave_invalida(self):
+        prefijo = self.api_key.prefijo
+        self.assertEqual(self.enviar([], clave=f'iot_{prefijo}_otro').status_code, 401)
+        self.assertEqual(self.enviar([], clave='iot_inexistente_x').status_code, 401)
+        # Los prefijos inexistentes no ocupan la caché
+        self.assertEqual(list(api_key_cache._entries), [prefijo])
+
+    def test_revocacion(self):
+        self.assertEqual(self.enviar([{'sensor': self.sensor_propio, 'valor': 20}]).status_code, 201)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.delete(
+            f"{reverse('device-revoke-api-key', args=[self.propio.id])}?prefijo={self.api_key.prefijo}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(None)
+
+        response = self.enviar([{'sensor': self.sensor_propio, 'valor': 20}])
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(str(response.data['detail']), 'La clave de API fue revocada.')
+
+    def test_expiracion(self):
+        self.api_key.expira_en = timezone.now() - timedelta(seconds=1)
+        self.api_key.save()
+        response = self.enviar([{'sensor': self.sensor_propio, 'valor': 20}])
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(str(response.data['detail']), 'La clave de API expiró.')
+
+    def test_cache_lru(self):
+        _, otra_clave = DispositivoAPIKey.generar(self.otro)
+        with mock.patch('apps.devices.authentication.MAX_ENTRIES', 1):
+            self.enviar([], clave=self.clave)
+            self.enviar([], clave=otra_clave)
+        self.assertEqual(list(api_key_cache._entries), [DispositivoAPIKey.separar_clave(otra_clave)])
@@ -6,26 +6,38 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import Count, Prefetch
 import logging
 
-from .models import Dispositivo, DispositivoSensor
+from .models import Dispositivo, DispositivoAPIKey, DispositivoSensor
 from .serializers import (
-    DispositivoSerializer, DispositivoSensorSerializer,
+    DispositivoSerializer, DispositivoSensorSerializer, DispositivoAPIKeySerializer,
     AsignarSensorDispositivoSerializer, AsignarOperadorDispositivoSerializer
 )
-from apps.accounts.permissions import CanManageDevices, IsSuperuser
+from apps.accounts.conditional import static_response
+from apps.accounts.permissions import CanManageDevices, IsSuperuser, IsSuperuserOrOperator
+from apps.accounts.response_cache import cache_response
+from apps.accounts.fast_serializers import FastListMixin
+from apps.accounts.sparse_fields import SparseFieldsViewSetMixin
 from apps.accounts.models import CustomUser
 from apps.sensors.models import Sensor
 
 logger = logging.getLogger(__name__)
 
 
-class DispositivoViewSet(viewsets.ModelViewSet):
+class DispositivoViewSet(FastListMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar Dispositivos
+    
+    Listado y detalle aceptan ?fields= y ?expand=sensores_asignados
     """
+    # Todo lo que usa DispositivoSerializer, en un número fijo de consultas
+    # sin importar el tamaño de la página
     queryset = Dispositivo.objects.select_related('operador_asignado').prefetch_related(
-        'sensores', 'dispositivosensor_set__sensor'
+        Prefetch(
+            'dispositivosensor_set',
+            queryset=DispositivoSensor.objects.select_related('sensor__created_by'),
+        )
     ).all()
     serializer_class = DispositivoSerializer
     permission_classes = [IsAuthenticated, CanManageDevices]
@@ -33,10 +45,19 @@ class DispositivoViewSet(viewsets.ModelViewSet):
     search_fields = ['nombre', 'tipo', 'identificador_unico', 'ubicacion']
     ordering_fields = ['nombre', 'tipo', 'created_at']
     ordering = ['-created_at']
+    fast_method_fields = {'cantidad_sensores': 'num_sensores'}
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
+        # Solo precargar lo que se va a serializar (?fields= / ?expand=)
+        if not self.wants('operador_username'):
+            queryset = queryset.select_related(None)
+        if not self.wants('sensores_asignados'):
+            queryset = queryset.prefetch_related(None)
+            if self.wants('cantidad_sensores'):
+                queryset = queryset.annotate(num_sensores=Count('dispositivosensor'))
+        
         # Si el usuario es operador, solo ver sus dispositivos asignados
         if not self.request.user.is_superuser:
             if self.request.user.rol and self.request.user.rol.nombre == 'operador':
@@ -187,6 +208,71 @@ class DispositivoViewSet(viewsets.ModelViewSet):
                 'error': 'La asignacion no existe'
             }, status=status.HTTP_404_NOT_FOUND)
     
+    @action(detail=True, methods=['get', 'post'], permission_classes=[IsAuthenticated, IsSuperuserOrOperator])
+    def api_keys(self, request, pk=None):
+        """
+        Listar o generar claves de API del dispositivo (para enviar lecturas)
+        GET /api/devices/{id}/api_keys/
+        POST /api/devices/{id}/api_keys/
+        Body: {"nombre": str, "expira_en": datetime (opcional)}
+        
+        La clave en claro solo se devuelve al generarla.
+        """
+        dispositivo = self.get_object()
+        
+        if request.method == 'GET':
+            api_keys = dispositivo.api_keys.select_related('creada_por')
+            return Response(DispositivoAPIKeySerializer(api_keys, many=True).data)
+        
+        serializer = DispositivoAPIKeySerializer(data=request.data)
+        if serializer.is_valid():
+            api_key, clave = DispositivoAPIKey.generar(
+                dispositivo,
+                nombre=serializer.validated_data.get('nombre', ''),
+                creada_por=request.user,
+                expira_en=serializer.validated_data.get('expira_en'),
+            )
+            
+            logger.info(f"Clave de API {api_key.prefijo} generada para dispositivo {dispositivo.nombre}")
+            
+            return Response({
+                'message': 'Clave de API generada. Guardela: no se volvera a mostrar',
+                'clave': clave,
+                'api_key': DispositivoAPIKeySerializer(api_key).data
+            }, status=status.HTTP_201_CREATED)
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['delete'], permission_classes=[IsAuthenticated, IsSuperuserOrOperator])
+    def revoke_api_key(self, request, pk=None):
+        """
+        Revocar una clave de API del dispositivo
+        DELETE /api/devices/{id}/revoke_api_key/?prefijo=X
+        """
+        dispositivo = self.get_object()
+        prefijo = request.query_params.get('prefijo', None)
+        
+        if not prefijo:
+            return Response({
+                'error': 'Se requiere el parametro prefijo'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            api_key = dispositivo.api_keys.get(prefijo=prefijo)
+        except DispositivoAPIKey.DoesNotExist:
+            return Response({
+                'error': 'La clave de API no existe'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        api_key.activa = False
+        api_key.save(update_fields=['activa'])
+        
+        logger.info(f"Clave de API {api_key.prefijo} revocada en dispositivo {dispositivo.nombre}")
+        
+        return Response({
+            'message': 'Clave de API revocada exitosamente'
+        })
+    
     @action(detail=False, methods=['get'])
     def tipos(self, request):
         """
@@ -194,9 +280,10 @@ class DispositivoViewSet(viewsets.ModelViewSet):
         GET /api/devices/tipos/
         """
         tipos = [{'value': t[0], 'label': t[1]} for t in Dispositivo.TIPO_DISPOSITIVO_CHOICES]
-        return Response(tipos)
+        return static_response(request, Response(tipos))
     
     @action(detail=False, methods=['get'])
+    @cache_response('mqtt_devices', per_user=True)
     def mqtt_devices(self, request):
         """
         Obtener dispositivos con MQTT habilitado
@@ -0,0 +1,144 @@
+"""
+Contadores en memoria del estado de conexión de la flota MQTT
+
+GET /api/mqtt/device-status/ se consulta constantemente desde los paneles
+de monitoreo; en lugar de contar dispositivos en cada petición, cada proceso
+mantiene los conteos por (connection_status, broker, tipo, operador) de los
+dispositivos con mqtt_enabled. Se cargan con un solo GROUP BY y las señales
+de Dispositivo los ajustan al cambiar de estado (ver signals.py), así que
+responder cuesta lo mismo con 10 o con 100.000 dispositivos. Los cambios
+hechos por otros procesos o por escrituras por lotes (update, bulk_create)
+se ven al recargar, como máximo cada FLEET_STATUS_REFRESH_SECONDS.
+
+Un cambio se aplica después del commit y solo si no hubo una carga desde
+antes de guardarlo (generation): esa carga pudo haberlo contado ya, así que
+en ese caso los conteos se vuelven a cargar en lugar de sumarlo dos veces.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count
+
+STATUSES = ('online', 'offline', 'error')
+BREAKDOWNS = ('broker', 'tipo', 'operador')
+
+# Posición de cada desglose en la clave de los conteos
+_KEY_INDEX = {'broker': 1, 'tipo': 2, 'operador': 3}
+
+
+def device_key(dispositivo, broker_id):
+    """Clave de conteo del dispositivo, None si no cuenta (MQTT deshabilitado)"""
+    if not dispositivo.mqtt_enabled:
+        return None
+    return (dispositivo.connection_status, broker_id, dispositivo.tipo, dispositivo.operador_asignado_id)
+
+
+TRACKED_FIELDS = ('mqtt_enabled', 'connection_status', 'tipo', 'operador_asignado_id')
+
+
+def remember(dispositivo):
+    """Toma los valores actuales como los cargados, para el próximo save()"""
+    loaded = getattr(dispositivo, '_loaded_values', None) or {}
+    loaded.update(
+        (field, dispositivo.__dict__[field]) for field in TRACKED_FIELDS if field in dispositivo.__dict__
+    )
+    dispositivo._loaded_values = loaded
+
+
+def loaded_key(dispositivo, broker_id):
+    """
+    Clave del dispositivo según los valores con que se cargó de la base
+    (Dispositivo.from_db). False si no se conocen, p. ej. con only()/defer().
+    """
+    loaded = getattr(dispositivo, '_loaded_values', None)
+    if loaded is None or any(field not in loaded for field in TRACKED_FIELDS):
+        return False
+    if not loaded['mqtt_enabled']:
+        return None
+    return (loaded['connection_status'], broker_id, loaded['tipo'], loaded['operador_asignado_id'])
+
+
+class FleetStatus:
+    """Conteos del proceso, recargados cuando se invalidan o vencen"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = None
+        self._loaded_at = 0.0
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """Número de cargas hechas; se toma antes de guardar un dispositivo"""
+        return self._generation
+
+    def _load(self):
+        from apps.devices.models import Dispositivo
+
+        rows = (
+            Dispositivo.objects.filter(mqtt_enabled=True)
+            .values_list('connection_status', 'mqtt_config__broker_id', 'tipo', 'operador_asignado_id')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        self._counts = Counter({row[:4]: row[4] for row in rows})
+        self._loaded_at = time.monotonic()
+        self._generation += 1
+
+    def _current(self):
+        if self._counts is None or time.monotonic() - self._loaded_at > settings.FLEET_STATUS_REFRESH_SECONDS:
+            self._load()
+        return self._counts
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+    def move(self, old_key, new_key, generation):
+        """
+        Pasa un dispositivo de old_key a new_key (None = no contado)
+
+        generation: la de antes de guardar el dispositivo. Si hubo una carga
+        después, ya puede incluir el cambio y se recarga en su lugar.
+        """
+        if old_key == new_key:
+            return
+        with self._lock:
+            if self._counts is None:
+                return
+            if generation != self._generation:
+                self._counts = None
+                return
+            if old_key is not None:
+                self._counts[old_key] -= 1
+                if self._counts[old_key] <= 0:
+                    del self._counts[old_key]
+            if new_key is not None:
+                self._counts[new_key] += 1
+
+    def summary(self, operador_id=None, breakdowns=()):
+        """
+        Totales por estado, opcionalmente de un solo operador y desglosados
+
+        Returns:
+            tuple: (totales {estado: n}, {desglose: {valor: {estado: n}}})
+        """
+        with self._lock:
+            counts = list(self._current().items())
+
+        totals = Counter()
+        detail = {name: {} for name in breakdowns}
+        for key, total in counts:
+            if operador_id is not None and key[3] != operador_id:
+                continue
+            totals[key[0]] += total
+            for name in breakdowns:
+                detail[name].setdefault(key[_KEY_INDEX[name]], Counter())[key[0]] += total
+        return totals, detail
+
+
+# Instancia global del proceso
+fleet_status = FleetStatus()
@@ -393,6 +393,16 @@ class DeviceMQTTConfig(models.Model):
     
     def __str__(self):
         return f"Config MQTT: {self.dispositivo.nombre}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda los valores cargados para detectar cambios de broker al guardar
+        (contadores de apps.mqtt.fleet_status)
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
 
 class EMQXUser(models.Model):
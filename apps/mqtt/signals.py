@@ -2,13 +2,15 @@
 Señales para sincronización automática entre Dispositivos y Usuarios EMQX
 """
 
-from django.db.models.signals import post_save, pre_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 import logging
 import secrets
 
 from apps.devices.models import Dispositivo
-from .models import EMQXUser, EMQXACL
+from .models import DeviceMQTTConfig, EMQXUser, EMQXACL
+from .fleet_status import device_key, fleet_status, loaded_key, remember
 
 logger = logging.getLogger(__name__)
 
@@ -67,67 +69,43 @@ def create_emqx_user_for_device(sender, instance, created, **kwargs):
             )
 
 
-def create_default_acl_rules(emqx_user, dispositivo):
+def default_acl_rules(emqx_user, dispositivo):
     """
-    Crea reglas ACL predeterminadas para un dispositivo IoT.
+    Reglas ACL predeterminadas para un dispositivo IoT (sin guardar).
     
-    Reglas creadas:
+    Reglas:
     1. Permitir publicar en topics del propio dispositivo
     2. Permitir suscribirse a comandos del dispositivo
     3. Denegar acceso a topics de otros dispositivos
     """
     device_id = dispositivo.identificador_unico
     
-    # Regla 1: Permitir publicar datos de sensores
-    EMQXACL.objects.create(
-        username=emqx_user.username,
-        emqx_user=emqx_user,
-        permission='allow',
-        action='publish',
-        topic=f'iot/sensors/{device_id}/#',
-        qos=1,
-        retain=0
-    )
-    
-    # Regla 2: Permitir publicar estado del dispositivo
-    EMQXACL.objects.create(
-        username=emqx_user.username,
-        emqx_user=emqx_user,
-        permission='allow',
-        action='publish',
-        topic=f'iot/devices/{device_id}/status',
-        qos=1,
-        retain=1  # Retener último estado
-    )
+    def rule(**kwargs):
+        return EMQXACL(username=emqx_user.username, emqx_user=emqx_user, **kwargs)
     
-    # Regla 3: Permitir suscribirse a comandos
-    EMQXACL.objects.create(
-        username=emqx_user.username,
-        emqx_user=emqx_user,
-        permission='allow',
-        action='subscribe',
-        topic=f'iot/commands/{device_id}/#',
-        qos=1
-    )
-    
-    # Regla 4: Permitir suscribirse a configuración
-    EMQXACL.objects.create(
-        username=emqx_user.username,
-        emqx_user=emqx_user,
-        permission='allow',
-        action='subscribe',
-        topic=f'iot/config/{device_id}/#',
-        qos=1
-    )
+    return [
+        # Regla 1: Permitir publicar datos de sensores
+        rule(permission='allow', action='publish', topic=f'iot/sensors/{device_id}/#', qos=1, retain=0),
+        # Regla 2: Permitir publicar estado del dispositivo (retener último estado)
+        rule(permission='allow', action='publish', topic=f'iot/devices/{device_id}/status', qos=1, retain=1),
+        # Regla 3: Permitir suscribirse a comandos
+        rule(permission='allow', action='subscribe', topic=f'iot/commands/{device_id}/#', qos=1),
+        # Regla 4: Permitir suscribirse a configuración
+        rule(permission='allow', action='subscribe', topic=f'iot/config/{device_id}/#', qos=1),
+        # Regla 5: Denegar todo lo demás (seguridad)
+        rule(permission='deny', action='all', topic='#'),
+    ]
+
+
+def create_default_acl_rules(emqx_user, dispositivo):
+    """
+    Crea las reglas ACL predeterminadas (default_acl_rules) de un dispositivo IoT.
     
-    # Regla 5: Denegar todo lo demás (seguridad)
-    EMQXACL.objects.create(
-        username=emqx_user.username,
-        emqx_user=emqx_user,
-        permission='deny',
-        action='all',
-        topic='#'  # Wildcard para todos los topics
-    )
+    Se guardan una a una para que log_acl_changes registre cada regla; las
+    flotas sintéticas (apps.devices.flota) las crean con bulk_create.
+    """
+    for rule in default_acl_rules(emqx_user, dispositivo):
+        rule.save()
     
     logger.info(f"✓ Reglas ACL creadas para usuario EMQX '{emqx_user.username}'")
 
@@ -181,3 +159,55 @@ def log_acl_changes(sender, instance, created, **kwargs):
             f"Regla ACL creada: {instance.username} - "
             f"{instance.permission} {instance.action} on '{instance.topic}'"
         )
+
+
+@receiver(pre_save, sender=Dispositivo)
+def remember_fleet_generation(sender, instance, **kwargs):
+    """
+    Anota qué carga de los contadores precede a este guardado (ver
+    fleet_status.FleetStatus.move).
+    """
+    instance._fleet_generation = fleet_status.generation
+
+
+@receiver(post_save, sender=Dispositivo)
+def update_fleet_status(sender, instance, created, **kwargs):
+    """
+    Ajusta los contadores de estado de la flota del proceso al confirmar
+    la transacción.
+    
+    Solo se busca el broker del dispositivo si su estado cambió; si no se
+    conocen los valores anteriores los contadores se recargan.
+    """
+    old_key = None if created else loaded_key(instance, None)
+    if old_key is False:
+        transaction.on_commit(fleet_status.invalidate)
+    elif old_key != device_key(instance, None):
+        broker_id = DeviceMQTTConfig.objects.filter(
+            dispositivo_id=instance.pk
+        ).values_list('broker_id', flat=True).first()
+        old_key = None if created else loaded_key(instance, broker_id)
+        new_key = device_key(instance, broker_id)
+        generation = instance._fleet_generation
+        transaction.on_commit(lambda: fleet_status.move(old_key, new_key, generation))
+    remember(instance)
+
+
+@receiver(post_delete, sender=Dispositivo)
+@receiver(post_delete, sender=DeviceMQTTConfig)
+def reload_fleet_status(sender, instance, **kwargs):
+    """
+    Recarga los contadores de estado de la flota del proceso.
+    """
+    transaction.on_commit(fleet_status.invalidate)
+
+
+@receiver(post_save, sender=DeviceMQTTConfig)
+def reload_fleet_status_on_broker_change(sender, instance, created, **kwargs):
+    """
+    Recarga los contadores de estado de la flota si cambió el broker del dispositivo.
+    """
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None or loaded.get('broker_id') != instance.broker_id:
+        transaction.on_commit(fleet_status.invalidate)
+        instance._loaded_values = {**(loaded or {}), 'broker_id': instance.broker_id}
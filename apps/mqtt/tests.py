@@ -0,0 +1,118 @@
+"""
+Tests de la app MQTT
+"""
+
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import CustomUser
+from apps.accounts.testing import ConsultasConstantesMixin
+from apps.devices.flota import crear_flota, dispositivos_de_flota
+from .fleet_status import fleet_status
+from .models import BrokerConfig, DeviceMQTTConfig, MQTTCredential, MQTTTopic
+
+
+class ListadosConsultasTest(ConsultasConstantesMixin, APITestCase):
+    """Los listados de MQTT usan las mismas consultas con cualquier tamaño de página"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_superuser(
+            username='admin-consultas', email='admin-consultas@example.com', password='x'
+        )
+        # Un usuario EMQX y sus ACL por dispositivo
+        crear_flota(100, 0, prefijo='consultas', password_mqtt='x')
+        dispositivos = list(dispositivos_de_flota('consultas'))
+
+        brokers = BrokerConfig.objects.bulk_create(
+            BrokerConfig(nombre=f'broker {i}', host=f'broker{i}.example.com') for i in range(100)
+        )
+        topics = MQTTTopic.objects.bulk_create(
+            MQTTTopic(nombre=f'topic {i}', topic_pattern=f'devices/{i}/data') for i in range(100)
+        )
+        MQTTCredential.objects.bulk_create(
+            MQTTCredential(
+                dispositivo=d, client_id=d.mqtt_client_id, username=d.identificador_unico, password='x'
+            )
+            for d in dispositivos
+        )
+        configs = DeviceMQTTConfig.objects.bulk_create(
+            DeviceMQTTConfig(dispositivo=d, broker=broker, publish_topic=topic)
+            for d, broker, topic in zip(dispositivos, brokers, topics)
+        )
+        for config, topic in zip(configs, topics):
+            config.subscribe_topics.set([topic])
+
+    def test_brokers(self):
+        # Validador de la ETag, COUNT del paginador y página
+        self.assertConsultasConstantes('mqtt-broker-list', 3)
+
+    def test_topics(self):
+        # Validador de la ETag, COUNT del paginador y página
+        self.assertConsultasConstantes('mqtt-topic-list', 3)
+
+    def test_credenciales(self):
+        # COUNT del paginador y página con su dispositivo
+        self.assertConsultasConstantes('mqtt-credential-list', 2)
+
+    def test_configuraciones(self):
+        # COUNT, página con sus relaciones y topics suscritos
+        self.assertConsultasConstantes('mqtt-device-config-list', 3)
+
+    def test_usuarios_emqx(self):
+        # COUNT, página con su dispositivo y reglas ACL
+        self.assertConsultasConstantes('emqx-user-list', 3)
+
+    def test_acl_emqx(self):
+        # COUNT del paginador y página con su usuario EMQX
+        self.assertConsultasConstantes('emqx-acl-list', 2)
+
+
+class FleetStatusTest(TestCase):
+    """Contadores de estado de la flota ajustados por las señales de Dispositivo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_flota(3, 0, prefijo='estado')
+        dispositivos_de_flota('estado').update(connection_status='online')
+
+    def setUp(self):
+        fleet_status.invalidate()
+        self.dispositivo = dispositivos_de_flota('estado').first()
+
+    def totales(self):
+        return dict(fleet_status.summary()[0])
+
+    def desconectar(self):
+        self.dispositivo.connection_status = 'offline'
+        self.dispositivo.save()
+
+    def test_cambio_de_estado(self):
+        self.assertEqual(self.totales(), {'online': 3})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.desconectar()
+        # Ajustados sin volver a contar
+        with self.assertNumQueries(0):
+            self.assertEqual(self.totales(), {'online': 2, 'offline': 1})
+
+    def test_carga_durante_el_guardado(self):
+        self.totales()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.desconectar()
+            # Otra petición recarga antes del commit y ya ve el cambio
+            fleet_status.invalidate()
+            self.assertEqual(self.totales(), {'online': 2, 'offline': 1})
+        self.assertEqual(self.totales(), {'online': 2, 'offline': 1})
+
+    def test_rollback(self):
+        self.totales()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.desconectar()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        with self.assertNumQueries(0):
+            self.assertEqual(self.totales(), {'online': 3})
@@ -15,13 +15,16 @@ from .serializers import (
     TestMQTTConnectionSerializer, EMQXUserSerializer, EMQXUserDetailSerializer,
     EMQXACLSerializer, CreateEMQXUserWithACLSerializer
 )
+from apps.accounts.conditional import ConditionalListMixin
 from apps.accounts.permissions import CanManageMQTT, CanViewMQTTCredentials
+from apps.accounts.response_cache import cache_response
 from apps.devices.models import Dispositivo
+from .fleet_status import BREAKDOWNS, STATUSES, fleet_status
 
 logger = logging.getLogger(__name__)
 
 
-class BrokerConfigViewSet(viewsets.ModelViewSet):
+class BrokerConfigViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar configuraciones de Brokers MQTT
     """
@@ -133,7 +136,7 @@ class MQTTCredentialViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class MQTTTopicViewSet(viewsets.ModelViewSet):
+class MQTTTopicViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar topics MQTT
     """
@@ -169,6 +172,7 @@ class MQTTTopicViewSet(viewsets.ModelViewSet):
         serializer.save()
     
     @action(detail=False, methods=['get'])
+    @cache_response('mqtt_topics')
     def publish_topics(self, request):
         """
         Obtener topics de publicacion
@@ -179,6 +183,7 @@ class MQTTTopicViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('mqtt_topics')
     def subscribe_topics(self, request):
         """
         Obtener topics de suscripcion
@@ -328,27 +333,64 @@ def device_mqtt_status(request):
     """
     Obtener estado de conexion MQTT de dispositivos
     GET /api/mqtt/device-status/
+    GET /api/mqtt/device-status/?desglose=broker,tipo,operador
+    
+    Se responde desde los contadores en memoria de apps.mqtt.fleet_status.
     """
-    # Operadores solo ven sus dispositivos
-    dispositivos = Dispositivo.objects.filter(mqtt_enabled=True)
+    desglose = [nombre for nombre in request.query_params.get('desglose', '').split(',') if nombre]
+    invalidos = [nombre for nombre in desglose if nombre not in BREAKDOWNS]
+    if invalidos:
+        return Response({
+            'error': f"Desglose invalido: {', '.join(invalidos)}. Use: {', '.join(BREAKDOWNS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
     
+    # Operadores solo ven sus dispositivos
+    operador_id = None
     if not request.user.is_superuser:
         if request.user.rol and request.user.rol.nombre == 'operador':
-            dispositivos = dispositivos.filter(operador_asignado=request.user)
-    
-    # Obtener estadisticas
-    total = dispositivos.count()
-    online = dispositivos.filter(connection_status='online').count()
-    offline = dispositivos.filter(connection_status='offline').count()
-    error = dispositivos.filter(connection_status='error').count()
-    
-    return Response({
-        'total_mqtt_devices': total,
-        'online': online,
-        'offline': offline,
-        'error': error,
-        'percentage_online': round((online / total * 100) if total > 0 else 0, 2)
-    })
+            operador_id = request.user.id
+    
+    totales, detalle = fleet_status.summary(operador_id, desglose)
+    response_data = {
+        ('total_mqtt_devices' if clave == 'total' else clave): valor
+        for clave, valor in _conteos_estado(totales).items()
+    }
+    
+    if desglose:
+        response_data['desglose'] = {
+            nombre: _desglose(nombre, detalle[nombre]) for nombre in desglose
+        }
+    
+    return Response(response_data)
+
+
+def _conteos_estado(conteos):
+    total = sum(conteos.values())
+    return {
+        'total': total,
+        **{estado: conteos.get(estado, 0) for estado in STATUSES},
+        'percentage_online': round((conteos.get('online', 0) / total * 100) if total > 0 else 0, 2),
+    }
+
+
+def _desglose(nombre, conteos_por_valor):
+    """Filas del desglose con el nombre legible de cada broker, tipo u operador"""
+    from apps.accounts.models import CustomUser
+    
+    ids = [valor for valor in conteos_por_valor if valor is not None]
+    if nombre == 'broker':
+        nombres = dict(BrokerConfig.objects.filter(id__in=ids).values_list('id', 'nombre'))
+    elif nombre == 'operador':
+        nombres = dict(CustomUser.objects.filter(id__in=ids).values_list('id', 'username'))
+    else:
+        nombres = dict(Dispositivo.TIPO_DISPOSITIVO_CHOICES)
+    
+    return [
+        {'id': valor, 'nombre': nombres.get(valor), **_conteos_estado(conteos)}
+        for valor, conteos in sorted(
+            conteos_por_valor.items(), key=lambda item: sum(item[1].values()), reverse=True
+        )
+    ]
 
 
 class EMQXUserViewSet(viewsets.ModelViewSet):
@@ -3,7 +3,9 @@ Configuracion del Django Admin para la app Readings
 """
 
 from django.contrib import admin
-from .models import Lectura
+from .models import (
+    Lectura, LecturaRechazada, BrechaLectura, AnomaliaLectura, ReglaAlerta, EventoAlerta
+)
 
 
 @admin.register(Lectura)
@@ -33,3 +35,119 @@ class LecturaAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(LecturaRechazada)
+class LecturaRechazadaAdmin(admin.ModelAdmin):
+    """
+    Admin para lecturas rechazadas (solo lectura)
+    """
+    list_display = ['timestamp', 'motivo', 'dispositivo', 'sensor', 'valor', 'intentos', 'reprocesada']
+    list_filter = ['motivo', 'reprocesada', 'timestamp']
+    search_fields = ['detalle']
+    ordering = ['-timestamp']
+    readonly_fields = [
+        'dispositivo', 'sensor', 'valor', 'payload', 'motivo', 'detalle',
+        'intentos', 'reprocesada', 'reprocesada_en', 'timestamp'
+    ]
+    list_per_page = 50
+    
+    def has_add_permission(self, request):
+        """No permitir agregar manualmente"""
+        return False
+
+
+@admin.register(BrechaLectura)
+class BrechaLecturaAdmin(admin.ModelAdmin):
+    """
+    Admin para brechas de lecturas (solo lectura)
+    """
+    list_display = ['dispositivo', 'sensor', 'inicio', 'fin', 'intervalo_esperado', 'detectada_en']
+    list_filter = ['inicio']
+    search_fields = ['dispositivo__nombre', 'sensor__nombre']
+    ordering = ['-inicio']
+    list_select_related = ['dispositivo', 'sensor']
+    readonly_fields = ['dispositivo', 'sensor', 'inicio', 'fin', 'intervalo_esperado', 'detectada_en']
+    list_per_page = 50
+    
+    def has_add_permission(self, request):
+        """No permitir agregar manualmente"""
+        return False
+
+
+@admin.register(AnomaliaLectura)
+class AnomaliaLecturaAdmin(admin.ModelAdmin):
+    """
+    Admin para anomalías de lecturas (solo lectura)
+    """
+    list_display = ['timestamp', 'dispositivo', 'sensor', 'detector', 'valor', 'esperado', 'puntaje']
+    list_filter = ['detector', 'timestamp']
+    search_fields = ['dispositivo__nombre', 'sensor__nombre']
+    ordering = ['-timestamp']
+    list_select_related = ['dispositivo', 'sensor']
+    readonly_fields = [
+        'lectura', 'dispositivo', 'sensor', 'detector', 'valor',
+        'esperado', 'puntaje', 'timestamp', 'detectada_en'
+    ]
+    list_per_page = 50
+    
+    def has_add_permission(self, request):
+        """No permitir agregar manualmente"""
+        return False
+
+
+@admin.register(ReglaAlerta)
+class ReglaAlertaAdmin(admin.ModelAdmin):
+    """
+    Admin para reglas de alerta
+    """
+    list_display = ['nombre', 'condicion', 'umbral', 'sensor', 'dispositivo', 'tipo_sensor', 'activa']
+    list_filter = ['condicion', 'activa', 'tipo_sensor']
+    search_fields = ['nombre', 'sensor__nombre', 'dispositivo__nombre']
+    ordering = ['nombre']
+    readonly_fields = ['created_by', 'created_at', 'updated_at']
+    
+    fieldsets = (
+        ('Regla', {
+            'fields': ('nombre', 'activa', 'condicion', 'umbral')
+        }),
+        ('Ámbito', {
+            'fields': ('sensor', 'dispositivo', 'tipo_sensor')
+        }),
+        ('Deduplicación', {
+            'fields': ('duracion_segundos', 'histeresis', 'cooldown_segundos')
+        }),
+        ('Notificaciones', {
+            'fields': ('notificar_telegram', 'notificar_email')
+        }),
+        ('Auditoría', {
+            'fields': ('created_by', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(EventoAlerta)
+class EventoAlertaAdmin(admin.ModelAdmin):
+    """
+    Admin para eventos de alerta (solo lectura)
+    """
+    list_display = ['timestamp', 'regla', 'tipo', 'dispositivo', 'sensor', 'valor', 'notificado']
+    list_filter = ['tipo', 'notificado', 'timestamp']
+    search_fields = ['regla__nombre', 'dispositivo__nombre', 'sensor__nombre']
+    ordering = ['-timestamp']
+    list_select_related = ['regla', 'dispositivo', 'sensor']
+    readonly_fields = [
+        'regla', 'lectura', 'dispositivo', 'sensor', 'tipo', 'valor',
+        'notificado', 'timestamp'
+    ]
+    list_per_page = 50
+    
+    def has_add_permission(self, request):
+        """No permitir agregar manualmente"""
+        return False
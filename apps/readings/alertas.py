@@ -0,0 +1,403 @@
+"""
+Motor de reglas de alerta sobre las lecturas
+
+Las reglas activas se compilan en un índice en memoria (por sensor,
+dispositivo o tipo de sensor) que se recarga cuando cambia una regla o
+cada ALERTAS_RECARGA_SEGUNDOS. Cada lote ingerido se ordena por serie
+(dispositivo, sensor) y cada regla se evalúa con una comparación NumPy
+sobre todas sus lecturas del lote; solo se recorre punto a punto la serie
+cuyo estado puede cambiar. La histéresis y el cooldown evitan tormentas de
+notificaciones con sensores que oscilan alrededor del umbral.
+
+Los estados de las series del lote se bloquean (SELECT ... FOR UPDATE)
+mientras se evalúan, así que dos lotes concurrentes de la misma serie no
+disparan dos veces. Las notificaciones se envían después del commit desde
+un hilo aparte: un SMTP o Telegram lento no demora la ingesta.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import ReglaAlerta, EstadoAlerta, EventoAlerta
+
+logger = logging.getLogger(__name__)
+
+# Mínimo tiempo entre la lectura de referencia y la evaluada para calcular
+# la tasa de cambio; evita tasas enormes entre lecturas del mismo lote
+VARIACION_MIN_SEGUNDOS = 1.0
+
+ReglaCompilada = namedtuple('ReglaCompilada', [
+    'id', 'nombre', 'sensor_id', 'dispositivo_id', 'tipo_sensor', 'condicion',
+    'umbral', 'duracion', 'histeresis', 'cooldown', 'telegram', 'email',
+])
+
+
+class IndiceReglas:
+    """
+    Reglas activas indexadas por su campo de ámbito más selectivo
+    """
+
+    def __init__(self, reglas):
+        self.por_sensor = {}
+        self.por_dispositivo = {}
+        self.por_tipo = {}
+        self.total = 0
+
+        for regla in reglas:
+            compilada = ReglaCompilada(
+                id=regla.id,
+                nombre=regla.nombre,
+                sensor_id=regla.sensor_id,
+                dispositivo_id=regla.dispositivo_id,
+                tipo_sensor=regla.tipo_sensor or None,
+                condicion=regla.condicion,
+                umbral=regla.umbral,
+                duracion=regla.duracion_segundos,
+                histeresis=regla.histeresis,
+                cooldown=regla.cooldown_segundos,
+                telegram=regla.notificar_telegram,
+                email=regla.notificar_email,
+            )
+            if compilada.sensor_id:
+                self.por_sensor.setdefault(compilada.sensor_id, []).append(compilada)
+            elif compilada.dispositivo_id:
+                self.por_dispositivo.setdefault(compilada.dispositivo_id, []).append(compilada)
+            elif compilada.tipo_sensor:
+                self.por_tipo.setdefault(compilada.tipo_sensor, []).append(compilada)
+            else:
+                continue
+            self.total += 1
+
+    def candidatas(self, dispositivo_id, sensor_id, tipo_sensor):
+        """Reglas que aplican a una serie"""
+        reglas = (
+            self.por_sensor.get(sensor_id, []) +
+            self.por_dispositivo.get(dispositivo_id, []) +
+            self.por_tipo.get(tipo_sensor, [])
+        )
+        return [
+            regla for regla in reglas
+            if regla.sensor_id in (None, sensor_id)
+            and regla.dispositivo_id in (None, dispositivo_id)
+            and regla.tipo_sensor in (None, tipo_sensor)
+        ]
+
+
+_indice = None
+_indice_cargado = 0.0
+_indice_lock = threading.Lock()
+
+
+def obtener_indice():
+    """Índice de reglas del proceso, recargado si expiró o fue invalidado"""
+    global _indice, _indice_cargado
+    with _indice_lock:
+        if _indice is None or time.monotonic() - _indice_cargado > settings.ALERTAS_RECARGA_SEGUNDOS:
+            _indice = IndiceReglas(ReglaAlerta.objects.filter(activa=True))
+            _indice_cargado = time.monotonic()
+        return _indice
+
+
+def invalidar_indice():
+    """Fuerza la recarga del índice en la próxima evaluación"""
+    global _indice
+    with _indice_lock:
+        _indice = None
+
+
+def _metrica(regla, valores, segundos, lens, estados):
+    """
+    Valor comparado con el umbral para cada lectura de la regla
+
+    Para la tasa de cambio es |Δvalor| / Δt en unidades por minuto respecto
+    a la lectura de referencia de la serie (NaN si no hay referencia o si
+    es demasiado reciente).
+    """
+    if regla.condicion != 'variacion':
+        return valores
+
+    ref_valor = np.array([
+        np.nan if e.ultimo_valor is None else e.ultimo_valor for e in estados
+    ])
+    ref_segundos = np.array([
+        np.nan if e.ultimo_timestamp is None else e.ultimo_timestamp.timestamp() for e in estados
+    ])
+    dt = segundos - np.repeat(ref_segundos, lens)
+    dv = np.abs(valores - np.repeat(ref_valor, lens))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(dt >= VARIACION_MIN_SEGUNDOS, dv / dt * 60.0, np.nan)
+
+
+def _condiciones(regla, metrica):
+    """
+    Returns:
+        tuple: (dispara, despeja) - arrays booleanos; NaN no cumple ninguna
+    """
+    if regla.condicion == 'menor':
+        return metrica < regla.umbral, metrica >= regla.umbral + regla.histeresis
+    return metrica > regla.umbral, metrica <= regla.umbral - regla.histeresis
+
+
+def _recorrer_serie(regla, estado, lecturas, metrica, dispara, despeja):
+    """
+    Aplica duración sostenida, histéresis y cooldown punto a punto
+
+    Returns:
+        list: EventoAlerta sin guardar
+    """
+    eventos = []
+    for i, lectura in enumerate(lecturas):
+        if not estado.activa:
+            if dispara[i]:
+                if estado.condicion_desde is None:
+                    estado.condicion_desde = lectura.timestamp
+                sostenida = (lectura.timestamp - estado.condicion_desde).total_seconds()
+                if sostenida < regla.duracion:
+                    continue
+
+                estado.activa = True
+                notificar = (
+                    estado.ultima_notificacion is None or
+                    (lectura.timestamp - estado.ultima_notificacion).total_seconds() >= regla.cooldown
+                )
+                if notificar:
+                    estado.ultima_notificacion = lectura.timestamp
+                eventos.append(_evento(regla, lectura, 'disparo', metrica[i], notificar))
+            elif not np.isnan(metrica[i]):
+                estado.condicion_desde = None
+        elif despeja[i]:
+            estado.activa = False
+            estado.condicion_desde = None
+            eventos.append(_evento(regla, lectura, 'recuperacion', metrica[i], False))
+    return eventos
+
+
+def _evento(regla, lectura, tipo, valor, notificado):
+    return EventoAlerta(
+        regla_id=regla.id,
+        lectura=lectura,
+        dispositivo_id=lectura.dispositivo_id,
+        sensor_id=lectura.sensor_id,
+        tipo=tipo,
+        valor=float(valor),
+        notificado=notificado,
+        timestamp=lectura.timestamp,
+    )
+
+
+def evaluar_lecturas(lecturas):
+    """
+    Evalúa un lote de lecturas ya guardadas contra las reglas activas
+
+    Usa a lo sumo cuatro consultas por lote (alta de estados faltantes,
+    estados con bloqueo, upsert de estados y eventos), sin importar la
+    cantidad de reglas o lecturas.
+
+    Args:
+        lecturas: Instancias de Lectura con sensor cargado
+
+    Returns:
+        list: EventoAlerta creados
+    """
+    indice = obtener_indice()
+    if not indice.total or not lecturas:
+        return []
+
+    # Ordenar el lote por serie para que cada serie sea un tramo contiguo
+    series = {}
+    for lectura in lecturas:
+        series.setdefault((lectura.dispositivo_id, lectura.sensor_id), []).append(lectura)
+
+    ordenadas, inicios, lens = [], [], []
+    reglas_series = {}
+    for k, (clave, grupo) in enumerate(series.items()):
+        grupo.sort(key=lambda lectura: (lectura.timestamp, lectura.id))
+        inicios.append(len(ordenadas))
+        lens.append(len(grupo))
+        ordenadas.extend(grupo)
+        for regla in indice.candidatas(clave[0], clave[1], grupo[0].sensor.tipo):
+            reglas_series.setdefault(regla, []).append(k)
+
+    if not reglas_series:
+        return []
+
+    claves = list(series)
+    inicios = np.array(inicios)
+    lens = np.array(lens)
+    valores = np.fromiter((lectura.valor for lectura in ordenadas), float, len(ordenadas))
+    segundos = np.fromiter(
+        (lectura.timestamp.timestamp() for lectura in ordenadas), float, len(ordenadas)
+    )
+
+    with transaction.atomic():
+        estados = _bloquear_estados(reglas_series, claves)
+        eventos, modificados = _evaluar_series(
+            reglas_series, claves, estados, ordenadas, inicios, lens, valores, segundos
+        )
+
+        if modificados:
+            EstadoAlerta.objects.bulk_create(
+                modificados,
+                update_conflicts=True,
+                unique_fields=['regla', 'dispositivo', 'sensor'],
+                update_fields=[
+                    'activa', 'condicion_desde', 'ultimo_valor',
+                    'ultimo_timestamp', 'ultima_notificacion'
+                ],
+            )
+        if eventos:
+            EventoAlerta.objects.bulk_create(eventos)
+
+        notificaciones = [evento for evento in eventos if evento.notificado]
+        if notificaciones:
+            reglas = {regla.id: regla for regla in reglas_series}
+            transaction.on_commit(lambda: _notificar_en_segundo_plano(notificaciones, reglas))
+
+    if eventos:
+        logger.warning(
+            f"{len(eventos)} eventos de alerta en {len(lecturas)} lecturas "
+            f"({len(notificaciones)} notificados)"
+        )
+    return eventos
+
+
+def _bloquear_estados(reglas_series, claves):
+    """
+    Estados de las (regla, dispositivo, sensor) del lote, bloqueados hasta el commit
+
+    Los que no existen se crean antes (ON CONFLICT DO NOTHING) para que el
+    bloqueo también cubra las series nuevas. Se crean y bloquean siempre en
+    el mismo orden para no provocar deadlocks entre lotes concurrentes.
+    """
+    claves_estado = sorted(
+        (regla.id,) + claves[k] for regla, ks in reglas_series.items() for k in ks
+    )
+    EstadoAlerta.objects.bulk_create(
+        [
+            EstadoAlerta(regla_id=regla_id, dispositivo_id=dispositivo_id, sensor_id=sensor_id)
+            for regla_id, dispositivo_id, sensor_id in claves_estado
+        ],
+        ignore_conflicts=True,
+    )
+    return {
+        (e.regla_id, e.dispositivo_id, e.sensor_id): e
+        for e in EstadoAlerta.objects.select_for_update().filter(
+            regla_id__in=[regla.id for regla in reglas_series],
+            sensor_id__in={sensor_id for _, sensor_id in claves}
+        ).order_by('regla_id', 'dispositivo_id', 'sensor_id')
+    }
+
+
+def _evaluar_series(reglas_series, claves, estados, ordenadas, inicios, lens, valores, segundos):
+    """
+    Returns:
+        tuple: (eventos, estados modificados)
+    """
+    eventos, modificados = [], []
+    for regla, ks in reglas_series.items():
+        ks = np.array(ks)
+        lens_regla = lens[ks]
+        # Filas de todas las series de la regla, tramo tras tramo
+        desplazamientos = np.concatenate(([0], np.cumsum(lens_regla)[:-1]))
+        filas = np.repeat(inicios[ks] - desplazamientos, lens_regla) + np.arange(lens_regla.sum())
+
+        estados_regla = []
+        for k in ks:
+            clave = (regla.id,) + claves[k]
+            if clave not in estados:
+                estados[clave] = EstadoAlerta(
+                    regla_id=regla.id, dispositivo_id=claves[k][0], sensor_id=claves[k][1]
+                )
+            estados_regla.append(estados[clave])
+
+        metrica = _metrica(regla, valores[filas], segundos[filas], lens_regla, estados_regla)
+        dispara, despeja = _condiciones(regla, metrica)
+        valida = ~np.isnan(metrica)
+        alguna_dispara = np.logical_or.reduceat(dispara, desplazamientos)
+        alguna_despeja = np.logical_or.reduceat(despeja, desplazamientos)
+        alguna_valida = np.logical_or.reduceat(valida, desplazamientos)
+
+        for j, (k, estado) in enumerate(zip(ks, estados_regla)):
+            modificado = False
+            inicio, fin = desplazamientos[j], desplazamientos[j] + lens_regla[j]
+
+            if not estado.activa and not alguna_dispara[j]:
+                # Sin disparos: solo se reinicia la cuenta de duración sostenida
+                if alguna_valida[j] and estado.condicion_desde is not None:
+                    estado.condicion_desde = None
+                    modificado = True
+            elif not (estado.activa and not alguna_despeja[j]):
+                grupo = ordenadas[inicios[k]:inicios[k] + lens[k]]
+                # Con disparo y recuperación en el mismo lote solo cambia
+                # ultima_notificacion, que el cooldown necesita guardada
+                antes = (estado.activa, estado.condicion_desde, estado.ultima_notificacion)
+                eventos.extend(_recorrer_serie(
+                    regla, estado, grupo,
+                    metrica[inicio:fin], dispara[inicio:fin], despeja[inicio:fin]
+                ))
+                modificado = modificado or antes != (
+                    estado.activa, estado.condicion_desde, estado.ultima_notificacion
+                )
+
+            if regla.condicion == 'variacion':
+                # Mover la referencia solo si la última lectura es suficientemente posterior
+                ultima = ordenadas[inicios[k] + lens[k] - 1]
+                if (estado.ultimo_timestamp is None or
+                        (ultima.timestamp - estado.ultimo_timestamp).total_seconds() >= VARIACION_MIN_SEGUNDOS):
+                    estado.ultimo_valor = ultima.valor
+                    estado.ultimo_timestamp = ultima.timestamp
+                    modificado = True
+
+            if modificado:
+                modificados.append(estado)
+
+    return eventos, modificados
+
+
+# Un solo hilo envía las notificaciones en orden; se crea al primer uso
+# (después del fork de los workers)
+_notificador = None
+_notificador_lock = threading.Lock()
+
+
+def _notificar_en_segundo_plano(eventos, reglas):
+    global _notificador
+    with _notificador_lock:
+        if _notificador is None:
+            _notificador = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alertas')
+    _notificador.submit(_notificar_y_cerrar, eventos, reglas)
+
+
+def _notificar_y_cerrar(eventos, reglas):
+    try:
+        notificar_eventos(eventos, reglas)
+    finally:
+        # Los notificadores pueden consultar la base desde este hilo
+        connection.close()
+
+
+def notificar_eventos(eventos, reglas):
+    """Envía las alertas disparadas por los canales de cada regla"""
+    from apps.accounts.telegram_helper import telegram_notifier
+    from apps.accounts.email_helper import email_notifier
+
+    for evento in eventos:
+        regla = reglas[evento.regla_id]
+        lectura = evento.lectura
+        try:
+            if regla.telegram:
+                telegram_notifier.send_reading_alert(
+                    lectura, lectura.sensor,
+                    'min' if regla.condicion == 'menor' else 'max'
+                )
+            if regla.email:
+                email_notifier.send_reading_alert(lectura, lectura.sensor, 'exceeded')
+        except Exception as e:
+            logger.error(f"Error notificando alerta '{regla.nombre}' de lectura {lectura.id}: {e}")
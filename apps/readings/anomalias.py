@@ -0,0 +1,337 @@
+"""
+Detección de anomalías en lecturas
+
+Detectores vectorizados con NumPy sobre ventanas por serie (dispositivo,
+sensor): z-score móvil, EWMA y desviación absoluta mediana (MAD). El
+procesamiento es incremental: un cursor guarda la última lectura analizada
+y para cada serie solo se carga la ventana previa necesaria, nunca el
+histórico completo.
+"""
+
+from datetime import timedelta
+from itertools import takewhile
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Lectura, AnomaliaLectura, CursorProcesamiento
+
+logger = logging.getLogger(__name__)
+
+CURSOR_ANOMALIAS = 'anomalias'
+
+# Constante de consistencia para que la MAD estime la desviación estándar
+# (Iglewicz y Hoaglin)
+CONSTANTE_MAD = 0.6745
+
+# No procesar lecturas más recientes que esto: una transacción que aún no
+# hizo commit podría tener ids menores que los ya visibles
+MARGEN_COMMIT = timedelta(seconds=5)
+
+
+# ============ Detectores (NumPy puro) ============
+
+def _normalizar(desviacion, escala):
+    """desviacion / escala, con escala 0 tratada como infinito (o 0 si no hay desviación)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        puntaje = desviacion / escala
+    return np.where(escala > 0, puntaje, np.where(desviacion > 0, np.inf, 0.0))
+
+
+def zscore_movil(x, ventana):
+    """
+    Z-score de cada punto respecto a la media y desviación de los
+    `ventana` puntos anteriores
+
+    Returns:
+        tuple: (esperado, puntaje) - arrays del tamaño de x, NaN donde no
+        hay historial suficiente
+    """
+    n = len(x)
+    esperado = np.full(n, np.nan)
+    puntaje = np.full(n, np.nan)
+    if n <= ventana:
+        return esperado, puntaje
+
+    # Centrar antes de las sumas acumuladas para no perder precisión
+    centro = x.mean()
+    xc = x - centro
+    suma = np.concatenate(([0.0], np.cumsum(xc)))
+    suma2 = np.concatenate(([0.0], np.cumsum(xc * xc)))
+
+    i = np.arange(ventana, n)
+    media = (suma[i] - suma[i - ventana]) / ventana
+    varianza = np.maximum((suma2[i] - suma2[i - ventana]) / ventana - media * media, 0.0)
+
+    esperado[i] = media + centro
+    puntaje[i] = _normalizar(np.abs(xc[i] - media), np.sqrt(varianza))
+    return esperado, puntaje
+
+
+def mad_movil(x, ventana):
+    """
+    Puntaje robusto (modified z-score) de cada punto respecto a la mediana
+    y la MAD de los `ventana` puntos anteriores
+
+    Returns:
+        tuple: (esperado, puntaje) - arrays del tamaño de x, NaN donde no
+        hay historial suficiente
+    """
+    n = len(x)
+    esperado = np.full(n, np.nan)
+    puntaje = np.full(n, np.nan)
+    if n <= ventana:
+        return esperado, puntaje
+
+    # La ventana k cubre x[k:k+ventana] y evalúa el punto k+ventana
+    ventanas = sliding_window_view(x[:-1], ventana)
+    mediana = np.median(ventanas, axis=1)
+    mad = np.median(np.abs(ventanas - mediana[:, None]), axis=1)
+
+    i = np.arange(ventana, n)
+    esperado[i] = mediana
+    puntaje[i] = _normalizar(CONSTANTE_MAD * np.abs(x[i] - mediana), mad)
+    return esperado, puntaje
+
+
+def _ewma(y, alpha, inicial):
+    """
+    m_t = (1 - alpha) * m_{t-1} + alpha * y_t, vectorizado
+
+    Usa la forma cerrada con potencias de (1 - alpha) en bloques cortos
+    para que las potencias no desborden el rango de float64.
+    """
+    beta = 1.0 - alpha
+    salida = np.empty(len(y))
+    bloque = max(1, int(250 / -np.log10(beta)))
+    anterior = inicial
+
+    for inicio in range(0, len(y), bloque):
+        tramo = y[inicio:inicio + bloque]
+        exponentes = np.arange(1, len(tramo) + 1)
+        acumulado = np.cumsum(tramo * beta ** -exponentes)
+        salida[inicio:inicio + len(tramo)] = beta ** exponentes * (anterior + alpha * acumulado)
+        anterior = salida[inicio + len(tramo) - 1]
+
+    return salida
+
+
+def ewma(x, alpha, ventana):
+    """
+    Puntaje de cada punto respecto a la media y varianza exponencialmente
+    ponderadas hasta el punto anterior. Los primeros `ventana` puntos solo
+    sirven de calentamiento.
+
+    Returns:
+        tuple: (esperado, puntaje) - arrays del tamaño de x, NaN donde no
+        hay historial suficiente
+    """
+    n = len(x)
+    esperado = np.full(n, np.nan)
+    puntaje = np.full(n, np.nan)
+    ventana = max(ventana, 2)
+    if n <= ventana:
+        return esperado, puntaje
+
+    alpha = min(max(alpha, 1e-6), 1 - 1e-6)
+    media = _ewma(x, alpha, x[0])
+    # Varianza exponencial: v_t = (1 - alpha) * (v_{t-1} + alpha * d_t^2)
+    # con d_t = x_t - m_{t-1}; v[j] corresponde a t = j + 1
+    d = x[1:] - media[:-1]
+    varianza = _ewma((1 - alpha) * d * d, alpha, 0.0)
+
+    i = np.arange(ventana, n)
+    esperado[i] = media[i - 1]
+    puntaje[i] = _normalizar(np.abs(x[i] - media[i - 1]), np.sqrt(varianza[i - 2]))
+    return esperado, puntaje
+
+
+def configuracion():
+    """Parámetros de los detectores desde settings"""
+    return {
+        'ventana': settings.ANOMALIAS_VENTANA,
+        'alpha': settings.ANOMALIAS_EWMA_ALPHA,
+        'umbrales': {
+            'zscore': settings.ANOMALIAS_UMBRAL_ZSCORE,
+            'ewma': settings.ANOMALIAS_UMBRAL_EWMA,
+            'mad': settings.ANOMALIAS_UMBRAL_MAD,
+        },
+    }
+
+
+def analizar_serie(historial, nuevos, config):
+    """
+    Evalúa los puntos nuevos de una serie con los tres detectores
+
+    Args:
+        historial: Valores previos de la serie (orden cronológico)
+        nuevos: Valores nuevos a evaluar (orden cronológico)
+        config: Resultado de configuracion()
+
+    Returns:
+        list: (indice en nuevos, detector, esperado, puntaje) de los puntos
+        que superan el umbral de cada detector
+    """
+    x = np.asarray(list(historial) + list(nuevos), dtype=float)
+    desplazamiento = len(historial)
+    ventana = config['ventana']
+
+    resultados = {
+        'zscore': zscore_movil(x, ventana),
+        'ewma': ewma(x, config['alpha'], ventana),
+        'mad': mad_movil(x, ventana),
+    }
+
+    marcados = []
+    for detector, (esperado, puntaje) in resultados.items():
+        # NaN > umbral es False: los puntos sin historial no se marcan
+        indices = np.nonzero(puntaje[desplazamiento:] > config['umbrales'][detector])[0]
+        for i in indices:
+            j = i + desplazamiento
+            marcados.append((int(i), detector, float(esperado[j]), float(puntaje[j])))
+    return marcados
+
+
+# ============ Procesamiento incremental ============
+
+SQL_HISTORIAL = """
+    SELECT s.dispositivo_id, s.sensor_id, h.valor
+    FROM unnest(%(dispositivos)s::bigint[], %(sensores)s::bigint[]) AS s(dispositivo_id, sensor_id)
+    CROSS JOIN LATERAL (
+        SELECT l.valor, l.timestamp, l.id
+        FROM lecturas l
+        WHERE l.sensor_id = s.sensor_id
+          AND l.dispositivo_id = s.dispositivo_id
+          AND l.id <= %(ultimo_id)s
+        ORDER BY l.timestamp DESC, l.id DESC
+        LIMIT %(ventana)s
+    ) h
+    ORDER BY s.dispositivo_id, s.sensor_id, h.timestamp, h.id
+"""
+
+
+def _cargar_historial(series, ultimo_id, ventana):
+    """Últimos `ventana` valores ya procesados de cada serie, en una consulta"""
+    historial = {serie: [] for serie in series}
+    if not series or ventana <= 0:
+        return historial
+
+    claves = list(series)
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_HISTORIAL, {
+            'dispositivos': [d for d, _ in claves],
+            'sensores': [s for _, s in claves],
+            'ultimo_id': ultimo_id,
+            'ventana': ventana,
+        })
+        for dispositivo_id, sensor_id, valor in cursor.fetchall():
+            historial[(dispositivo_id, sensor_id)].append(valor)
+    return historial
+
+
+def procesar_lecturas_nuevas(limite=5000, notificar=None):
+    """
+    Analiza las lecturas posteriores al cursor y guarda las anomalías
+
+    Args:
+        limite: Máximo de lecturas a procesar en esta llamada
+        notificar: Enviar alertas por Telegram/Email (default: ANOMALIAS_NOTIFICAR)
+
+    Returns:
+        dict: {'procesadas': int, 'anomalias': int}
+    """
+    config = configuracion()
+    if notificar is None:
+        notificar = settings.ANOMALIAS_NOTIFICAR
+
+    with transaction.atomic():
+        cursor, _ = CursorProcesamiento.objects.select_for_update().get_or_create(
+            nombre=CURSOR_ANOMALIAS
+        )
+        corte = timezone.now() - MARGEN_COMMIT
+        # Solo por id y hasta la primera lectura dentro del margen: filtrar
+        # por timestamp movería el cursor por encima de lecturas recientes
+        # con id menor que la última procesada y no se analizarían nunca
+        nuevas = list(takewhile(
+            lambda fila: fila[4] < corte,
+            Lectura.objects.filter(id__gt=cursor.ultimo_id).order_by('id').values_list(
+                'id', 'dispositivo_id', 'sensor_id', 'valor', 'timestamp'
+            )[:limite]
+        ))
+        if not nuevas:
+            return {'procesadas': 0, 'anomalias': 0}
+
+        series = {}
+        for fila in nuevas:
+            series.setdefault((fila[1], fila[2]), []).append(fila)
+
+        historial = _cargar_historial(series.keys(), cursor.ultimo_id, config['ventana'])
+
+        anomalias = []
+        for (dispositivo_id, sensor_id), filas in series.items():
+            filas.sort(key=lambda fila: (fila[4], fila[0]))
+            marcados = analizar_serie(
+                historial[(dispositivo_id, sensor_id)],
+                [fila[3] for fila in filas],
+                config
+            )
+            for indice, detector, esperado, puntaje in marcados:
+                lectura_id, _, _, valor, timestamp = filas[indice]
+                anomalias.append(AnomaliaLectura(
+                    lectura_id=lectura_id,
+                    dispositivo_id=dispositivo_id,
+                    sensor_id=sensor_id,
+                    detector=detector,
+                    valor=valor,
+                    esperado=esperado,
+                    puntaje=min(puntaje, 1e12),
+                    timestamp=timestamp,
+                ))
+
+        AnomaliaLectura.objects.bulk_create(anomalias, batch_size=1000)
+
+        cursor.ultimo_id = nuevas[-1][0]
+        cursor.save(update_fields=['ultimo_id', 'updated_at'])
+
+    if anomalias:
+        logger.warning(f"{len(anomalias)} anomalias detectadas en {len(nuevas)} lecturas")
+        if notificar:
+            notificar_anomalias(anomalias)
+
+    return {'procesadas': len(nuevas), 'anomalias': len(anomalias)}
+
+
+def notificar_anomalias(anomalias):
+    """
+    Envía una alerta por serie (la de mayor puntaje) para no saturar al
+    operador cuando varios puntos o detectores marcan el mismo evento
+    """
+    from apps.accounts.telegram_helper import telegram_notifier
+    from apps.accounts.email_helper import email_notifier
+
+    peor_por_serie = {}
+    for anomalia in anomalias:
+        clave = (anomalia.dispositivo_id, anomalia.sensor_id)
+        if clave not in peor_por_serie or anomalia.puntaje > peor_por_serie[clave].puntaje:
+            peor_por_serie[clave] = anomalia
+
+    lecturas = Lectura.objects.select_related(
+        'dispositivo__operador_asignado', 'sensor'
+    ).in_bulk([anomalia.lectura_id for anomalia in peor_por_serie.values()])
+
+    for anomalia in peor_por_serie.values():
+        lectura = lecturas.get(anomalia.lectura_id)
+        if lectura is None:
+            continue
+        try:
+            telegram_notifier.send_reading_alert(
+                lectura, lectura.sensor,
+                'max' if anomalia.valor > anomalia.esperado else 'min'
+            )
+            email_notifier.send_reading_alert(lectura, lectura.sensor, 'exceeded')
+        except Exception as e:
+            logger.error(f"Error notificando anomalia de lectura {lectura.id}: {e}")
@@ -9,3 +9,9 @@ class ReadingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.readings'
     verbose_name = 'Gestión de Lecturas'
+    
+    def ready(self):
+        """
+        Importar señales cuando la aplicación esté lista
+        """
+        import apps.readings.signals  # noqa
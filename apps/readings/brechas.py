@@ -0,0 +1,157 @@
+"""
+Detección de brechas y sensores silenciosos en las lecturas
+
+Todo el cálculo se hace en PostgreSQL con sentencias set-based sobre la
+flota completa: lag(timestamp) por serie (dispositivo, sensor) para las
+brechas cerradas y la última lectura por serie para los sensores que
+dejaron de reportar. El intervalo esperado de cada serie es el
+publish_interval del sensor, o el de la configuración MQTT del dispositivo,
+o LECTURAS_INTERVALO_DEFAULT.
+"""
+
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# Intervalo esperado por serie activa (dispositivo, sensor)
+SQL_ESPERADO = """
+    SELECT ds.dispositivo_id, ds.sensor_id, ds.fecha_asignacion,
+           COALESCE(s.publish_interval, mc.publish_interval, %(intervalo_default)s) AS intervalo
+    FROM dispositivos_sensores ds
+    JOIN sensores s ON s.id = ds.sensor_id
+    JOIN dispositivos d ON d.id = ds.dispositivo_id
+    LEFT JOIN mqtt_device_config mc
+           ON mc.dispositivo_id = ds.dispositivo_id AND mc.is_active
+    WHERE ds.activo
+      AND s.estado = 'activo'
+      AND d.estado <> 'mantenimiento'
+"""
+
+# Brechas cerradas: diferencia entre lecturas consecutivas mayor al umbral.
+# Si ya existía la brecha abierta (sensor silencioso) se cierra con su fin.
+SQL_BRECHAS = f"""
+    WITH esperado AS ({SQL_ESPERADO}),
+    serie AS (
+        SELECT l.dispositivo_id, l.sensor_id, l.timestamp,
+               lag(l.timestamp) OVER (
+                   PARTITION BY l.dispositivo_id, l.sensor_id
+                   ORDER BY l.timestamp
+               ) AS anterior
+        FROM lecturas l
+        WHERE l.timestamp >= %(inicio_escaneo)s
+    )
+    INSERT INTO lecturas_brechas
+        (dispositivo_id, sensor_id, inicio, fin, intervalo_esperado, detectada_en)
+    SELECT se.dispositivo_id, se.sensor_id, se.anterior, se.timestamp, e.intervalo, %(ahora)s
+    FROM serie se
+    JOIN esperado e
+      ON e.dispositivo_id = se.dispositivo_id AND e.sensor_id = se.sensor_id
+    WHERE se.anterior IS NOT NULL
+      AND se.timestamp >= %(desde)s
+      AND se.timestamp - se.anterior > make_interval(secs => e.intervalo * %(factor)s)
+    ON CONFLICT (dispositivo_id, sensor_id, inicio)
+    DO UPDATE SET fin = EXCLUDED.fin
+    WHERE lecturas_brechas.fin IS NULL
+"""
+
+# Brechas abiertas de sensores que volvieron a reportar (incluye los que
+# nunca habían reportado y por eso no tienen lectura anterior para lag)
+SQL_CERRAR = """
+    UPDATE lecturas_brechas b
+    SET fin = sig.timestamp
+    FROM lecturas_brechas ab
+    CROSS JOIN LATERAL (
+        SELECT l.timestamp
+        FROM lecturas l
+        WHERE l.sensor_id = ab.sensor_id
+          AND l.dispositivo_id = ab.dispositivo_id
+          AND l.timestamp > ab.inicio
+        ORDER BY l.timestamp
+        LIMIT 1
+    ) sig
+    WHERE b.id = ab.id AND ab.fin IS NULL
+"""
+
+# Sensores silenciosos: la última lectura (o la asignación, si nunca
+# reportó) es más antigua que el umbral. Se guardan como brechas abiertas.
+SQL_SILENCIOSOS = f"""
+    WITH esperado AS ({SQL_ESPERADO})
+    INSERT INTO lecturas_brechas
+        (dispositivo_id, sensor_id, inicio, fin, intervalo_esperado, detectada_en)
+    SELECT e.dispositivo_id, e.sensor_id,
+           COALESCE(u.timestamp, e.fecha_asignacion), NULL, e.intervalo, %(ahora)s
+    FROM esperado e
+    LEFT JOIN LATERAL (
+        SELECT l.timestamp
+        FROM lecturas l
+        WHERE l.sensor_id = e.sensor_id AND l.dispositivo_id = e.dispositivo_id
+        ORDER BY l.timestamp DESC
+        LIMIT 1
+    ) u ON true
+    WHERE COALESCE(u.timestamp, e.fecha_asignacion)
+          < %(ahora)s - make_interval(secs => e.intervalo * %(factor)s)
+    ON CONFLICT (dispositivo_id, sensor_id, inicio) DO NOTHING
+"""
+
+
+def _intervalo_maximo(intervalo_default):
+    """Mayor intervalo esperado configurado en la flota (segundos)"""
+    from apps.sensors.models import Sensor
+    from apps.mqtt.models import DeviceMQTTConfig
+
+    candidatos = [
+        intervalo_default,
+        Sensor.objects.aggregate(m=Max('publish_interval'))['m'],
+        DeviceMQTTConfig.objects.filter(is_active=True).aggregate(m=Max('publish_interval'))['m'],
+    ]
+    return max(c for c in candidatos if c is not None)
+
+
+def detectar_brechas(desde=None, factor=None, intervalo_default=None):
+    """
+    Detecta brechas y sensores silenciosos en toda la flota
+
+    Args:
+        desde: Solo brechas que terminan después de esta fecha
+            (default: LECTURAS_BRECHAS_VENTANA_HORAS hacia atrás)
+        factor: Multiplicador del intervalo esperado a partir del cual se
+            considera brecha (default: LECTURAS_BRECHA_FACTOR)
+        intervalo_default: Intervalo para series sin publish_interval
+
+    Returns:
+        dict: {'brechas': int, 'silenciosos': int}
+    """
+    ahora = timezone.now()
+    factor = factor or settings.LECTURAS_BRECHA_FACTOR
+    intervalo_default = intervalo_default or settings.LECTURAS_INTERVALO_DEFAULT
+    if desde is None:
+        desde = ahora - timedelta(hours=settings.LECTURAS_BRECHAS_VENTANA_HORAS)
+
+    # Escanear un poco antes de "desde" para que la primera lectura de cada
+    # serie en la ventana tenga su lectura anterior
+    margen = timedelta(seconds=_intervalo_maximo(intervalo_default) * factor)
+
+    params = {
+        'ahora': ahora,
+        'desde': desde,
+        'inicio_escaneo': desde - margen,
+        'factor': float(factor),
+        'intervalo_default': int(intervalo_default),
+    }
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SQL_BRECHAS, params)
+        brechas = cursor.rowcount
+        cursor.execute(SQL_CERRAR)
+        cursor.execute(SQL_SILENCIOSOS, params)
+        silenciosos = cursor.rowcount
+
+    logger.info(f"Deteccion de brechas: {brechas} brechas, {silenciosos} sensores silenciosos")
+    return {'brechas': brechas, 'silenciosos': silenciosos}
@@ -0,0 +1,303 @@
+"""
+Ingesta de lecturas por lotes
+
+Valida un lote completo con un número fijo de consultas (dispositivos,
+sensores y asignaciones) en lugar de consultar por cada lectura, y separa
+las lecturas válidas de las rechazadas para guardarlas con bulk_create.
+"""
+
+import math
+import logging
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import Lectura, LecturaRechazada
+from apps.accounts import metrics
+from apps.devices.models import Dispositivo, DispositivoSensor
+from apps.sensors.models import Sensor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+QOS_VALIDOS = (0, 1, 2)
+
+
+def _a_entero(valor):
+    if isinstance(valor, bool):
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _a_bool(valor):
+    """Booleano como lo interpreta LecturaSerializer ("false", "0", ...), o None"""
+    try:
+        return serializers.BooleanField().to_internal_value(valor)
+    except serializers.ValidationError:
+        return None
+
+
+def _a_float(valor):
+    if isinstance(valor, bool):
+        return None
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return valor if math.isfinite(valor) else None
+
+
+def _rechazo(item, motivo, detalle, dispositivo=None, sensor=None, valor=None):
+    return LecturaRechazada(
+        dispositivo=dispositivo,
+        sensor=sensor,
+        valor=valor,
+        payload=item if isinstance(item, dict) else {'raw': repr(item)[:1000]},
+        motivo=motivo,
+        detalle=detalle[:255],
+    )
+
+
+def _validar_campos_mqtt(item):
+    """Valida los campos opcionales; retorna un mensaje de error o None"""
+    metadata = item.get('metadata_json', {})
+    if metadata is not None and not isinstance(metadata, dict):
+        return 'metadata_json debe ser un objeto'
+
+    qos = item.get('mqtt_qos')
+    if qos is not None and _a_entero(qos) not in QOS_VALIDOS:
+        return f'mqtt_qos invalido: {qos}'
+
+    retained = item.get('mqtt_retained')
+    if retained is not None and _a_bool(retained) is None:
+        return f'mqtt_retained invalido: {retained}'
+
+    message_id = item.get('mqtt_message_id')
+    if message_id is not None and (not isinstance(message_id, str) or len(message_id) > 100):
+        return 'mqtt_message_id debe ser texto de maximo 100 caracteres'
+
+    return None
+
+
+def clasificar_lecturas(items, autenticado=None, recibidas=None):
+    """
+    Valida un lote de lecturas (dicts con el formato de LecturaSerializer)
+
+    Usa tres consultas por lote sin importar su tamaño. Con autenticado (el
+    DispositivoAutenticado de una clave de API) el lote es de ese
+    dispositivo: "dispositivo" es opcional en cada lectura, las de otro se
+    rechazan como no_autorizado y las asignaciones salen de
+    autenticado.sensor_ids, así que solo se consultan los sensores.
+    recibidas: fechas de llegada, paralelas a items (reproceso de
+    rechazadas); se asignan como timestamp de cada Lectura válida.
+
+    Returns:
+        tuple: (validas, rechazadas) - listas de (indice, Lectura) y
+        (indice, LecturaRechazada), ambas sin guardar
+    """
+    items = list(items)
+
+    # Primera pasada: extraer ids para cargar todo de una vez
+    dispositivo_ids, sensor_ids = set(), set()
+    for item in items:
+        if isinstance(item, dict):
+            dispositivo_id = _a_entero(item.get('dispositivo'))
+            sensor_id = _a_entero(item.get('sensor'))
+            if dispositivo_id is not None:
+                dispositivo_ids.add(dispositivo_id)
+            if sensor_id is not None:
+                sensor_ids.add(sensor_id)
+
+    sensores = Sensor.objects.in_bulk(sensor_ids) if sensor_ids else {}
+    if autenticado is not None:
+        # Dispositivo y asignaciones vienen de la caché de claves de API
+        dispositivo_id = autenticado.dispositivo.id
+        dispositivos = {dispositivo_id: autenticado.dispositivo}
+        asignaciones = {(dispositivo_id, sensor_id) for sensor_id in autenticado.sensor_ids}
+    else:
+        dispositivos = Dispositivo.objects.in_bulk(dispositivo_ids) if dispositivo_ids else {}
+        asignaciones = set()
+        if dispositivos and sensores:
+            asignaciones = set(
+                DispositivoSensor.objects.filter(
+                    dispositivo_id__in=dispositivos.keys(),
+                    sensor_id__in=sensores.keys(),
+                    activo=True
+                ).values_list('dispositivo_id', 'sensor_id')
+            )
+
+    validas, rechazadas = [], []
+    for indice, item in enumerate(items):
+        if not isinstance(item, dict):
+            rechazadas.append((indice, _rechazo(
+                item, 'formato_invalido', 'La lectura debe ser un objeto JSON'
+            )))
+            continue
+
+        if autenticado is not None and item.get('dispositivo') is None:
+            dispositivo = autenticado.dispositivo
+        else:
+            dispositivo = dispositivos.get(_a_entero(item.get('dispositivo')))
+        sensor = sensores.get(_a_entero(item.get('sensor')))
+        valor = _a_float(item.get('valor'))
+
+        if autenticado is not None and dispositivo is None:
+            rechazadas.append((indice, _rechazo(
+                item, 'no_autorizado',
+                f"La clave de API no corresponde al dispositivo {item.get('dispositivo')!r}",
+                autenticado.dispositivo, sensor, valor
+            )))
+            continue
+
+        if valor is None:
+            rechazadas.append((indice, _rechazo(
+                item, 'formato_invalido', f"Valor invalido: {item.get('valor')!r}",
+                dispositivo, sensor
+            )))
+            continue
+
+        error_campos = _validar_campos_mqtt(item)
+        if error_campos:
+            rechazadas.append((indice, _rechazo(
+                item, 'formato_invalido', error_campos, dispositivo, sensor, valor
+            )))
+            continue
+
+        if dispositivo is None:
+            rechazadas.append((indice, _rechazo(
+                item, 'dispositivo_inexistente',
+                f"El dispositivo {item.get('dispositivo')!r} no existe",
+                sensor=sensor, valor=valor
+            )))
+            continue
+
+        if sensor is None:
+            rechazadas.append((indice, _rechazo(
+                item, 'sensor_inexistente',
+                f"El sensor {item.get('sensor')!r} no existe",
+                dispositivo=dispositivo, valor=valor
+            )))
+            continue
+
+        if (dispositivo.id, sensor.id) not in asignaciones:
+            rechazadas.append((indice, _rechazo(
+                item, 'sensor_no_asignado',
+                'El sensor no esta asignado a este dispositivo.',
+                dispositivo, sensor, valor
+            )))
+            continue
+
+        if valor < sensor.rango_min or valor > sensor.rango_max:
+            rechazadas.append((indice, _rechazo(
+                item, 'fuera_de_rango',
+                f'El valor {valor} esta fuera del rango permitido '
+                f'({sensor.rango_min} - {sensor.rango_max}).',
+                dispositivo, sensor, valor
+            )))
+            continue
+
+        qos = item.get('mqtt_qos')
+        retained = item.get('mqtt_retained')
+        lectura = Lectura(
+            dispositivo=dispositivo,
+            sensor=sensor,
+            valor=valor,
+            metadata_json=item.get('metadata_json') or {},
+            mqtt_message_id=item.get('mqtt_message_id'),
+            mqtt_qos=_a_entero(qos) if qos is not None else None,
+            mqtt_retained=_a_bool(retained) if retained is not None else False,
+        )
+        if recibidas is not None:
+            lectura.timestamp = recibidas[indice]
+        validas.append((indice, lectura))
+
+    return validas, rechazadas
+
+
+def insertar_con_timestamp(lecturas):
+    """
+    bulk_create que conserva el timestamp asignado a cada lectura
+
+    timestamp es auto_now_add y bulk_create lo reemplaza por la hora actual:
+    se restaura con un UPDATE por lote. Para el reproceso, donde la lectura
+    debe quedar en el momento en que llegó y no en el del reproceso.
+    """
+    timestamps = [lectura.timestamp for lectura in lecturas]
+    creadas = Lectura.objects.bulk_create(lecturas, batch_size=BATCH_SIZE)
+    for lectura, timestamp in zip(creadas, timestamps):
+        lectura.timestamp = timestamp
+    Lectura.objects.bulk_update(creadas, ['timestamp'], batch_size=BATCH_SIZE)
+    return creadas
+
+
+def guardar_rechazadas(rechazadas):
+    """
+    Guarda lecturas rechazadas en un solo INSERT por lote
+
+    Nunca propaga errores: perder el registro de un rechazo no debe
+    romper la ingesta.
+    """
+    if not rechazadas:
+        return []
+    try:
+        return LecturaRechazada.objects.bulk_create(rechazadas, batch_size=BATCH_SIZE)
+    except Exception as e:
+        logger.error(f"Error al guardar lecturas rechazadas: {e}")
+        return []
+
+
+def evaluar_alertas(lecturas):
+    """
+    Evalúa las reglas de alerta sobre lecturas recién guardadas
+
+    Nunca propaga errores: una falla en las alertas no debe perder la
+    ingesta ya confirmada.
+    """
+    if not lecturas:
+        return []
+    try:
+        from .alertas import evaluar_lecturas
+        return evaluar_lecturas(lecturas)
+    except Exception as e:
+        logger.error(f"Error al evaluar reglas de alerta: {e}")
+        return []
+
+
+def ingerir_lecturas(items, autenticado=None):
+    """
+    Valida e inserta un lote de lecturas
+
+    autenticado: DispositivoAutenticado si el lote llega con clave de API
+    (ver clasificar_lecturas)
+
+    Las válidas se insertan con bulk_create y se evalúan contra las reglas
+    de alerta; las rechazadas se envían a la tabla de lecturas rechazadas.
+
+    Returns:
+        tuple: (creadas, rechazadas) - (list[Lectura], list[(indice, LecturaRechazada)])
+    """
+    validas, rechazadas = clasificar_lecturas(items, autenticado)
+
+    creadas = []
+    if validas:
+        with transaction.atomic():
+            creadas = Lectura.objects.bulk_create(
+                [lectura for _, lectura in validas],
+                batch_size=BATCH_SIZE
+            )
+
+    guardar_rechazadas([rechazada for _, rechazada in rechazadas])
+    evaluar_alertas(creadas)
+
+    metrics.INGESTION_BATCH_SIZE.observe(len(items))
+    metrics.READINGS_INGESTED.labels('accepted').inc(len(creadas))
+    metrics.READINGS_INGESTED.labels('rejected').inc(len(rechazadas))
+
+    if rechazadas:
+        logger.warning(f"{len(rechazadas)} lecturas rechazadas enviadas a cuarentena")
+
+    return creadas, rechazadas
@@ -0,0 +1,47 @@
+"""
+Management command para detectar anomalías en las lecturas nuevas
+
+Procesa solo las lecturas posteriores al último cursor guardado. Pensado
+para ejecutarse periódicamente (cron):
+    python manage.py detectar_anomalias --notificar
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.readings.anomalias import procesar_lecturas_nuevas
+
+
+class Command(BaseCommand):
+    help = 'Detecta anomalías (z-score, EWMA, MAD) en las lecturas nuevas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Lecturas por lote (default: 5000)',
+        )
+        parser.add_argument(
+            '--notificar',
+            action='store_true',
+            default=None,
+            help='Enviar alertas por Telegram/Email (default: ANOMALIAS_NOTIFICAR)',
+        )
+
+    def handle(self, *args, **options):
+        total_procesadas = 0
+        total_anomalias = 0
+
+        # Procesar lotes hasta alcanzar las lecturas más recientes
+        while True:
+            resultado = procesar_lecturas_nuevas(
+                limite=options['batch_size'],
+                notificar=options['notificar']
+            )
+            total_procesadas += resultado['procesadas']
+            total_anomalias += resultado['anomalias']
+            if resultado['procesadas'] < options['batch_size']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Lecturas procesadas: {total_procesadas}'))
+        self.stdout.write(self.style.SUCCESS(f'✓ Anomalías detectadas: {total_anomalias}'))
@@ -0,0 +1,50 @@
+"""
+Management command para detectar brechas y sensores silenciosos
+
+Pensado para ejecutarse periódicamente (cron), por ejemplo cada 5 minutos:
+    python manage.py detectar_brechas_lecturas
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+
+from apps.readings.brechas import detectar_brechas
+
+
+class Command(BaseCommand):
+    help = 'Detecta brechas en las lecturas y sensores que dejaron de reportar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Fecha desde la cual buscar brechas (ISO 8601)',
+        )
+        parser.add_argument(
+            '--horas',
+            type=int,
+            help='Buscar brechas en las últimas N horas (alternativa a --desde)',
+        )
+        parser.add_argument(
+            '--factor',
+            type=float,
+            help='Multiplicador del intervalo esperado (default: LECTURAS_BRECHA_FACTOR)',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            desde = parse_datetime(options['desde'])
+            if desde is None:
+                raise CommandError(f"Fecha invalida: {options['desde']}")
+            if timezone.is_naive(desde):
+                desde = timezone.make_aware(desde)
+        elif options['horas']:
+            desde = timezone.now() - timedelta(hours=options['horas'])
+
+        resultado = detectar_brechas(desde=desde, factor=options['factor'])
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Brechas detectadas: {resultado['brechas']}"))
+        self.stdout.write(self.style.SUCCESS(f"✓ Sensores silenciosos nuevos: {resultado['silenciosos']}"))
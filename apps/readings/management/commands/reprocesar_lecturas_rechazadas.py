@@ -0,0 +1,123 @@
+"""
+Management command para reprocesar lecturas rechazadas (dead-letter)
+
+Útil después de corregir el rango de un sensor o su asignación a un
+dispositivo. Revalida por lotes y guarda con bulk_create.
+
+Las lecturas enviadas con clave de API pueden no traer "dispositivo": se
+revalidan con el dispositivo guardado en el rechazo (el de la clave). Las
+no_autorizado (reclamaban otro dispositivo) solo se reprocesan con
+--motivo no_autorizado y siempre como lecturas del dispositivo de la clave,
+nunca del que indicaba el payload.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+import logging
+
+from apps.readings.models import LecturaRechazada
+from apps.readings.ingestion import clasificar_lecturas, insertar_con_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+def _payload_a_reprocesar(rechazada):
+    """Payload a revalidar, con el dispositivo del rechazo si corresponde"""
+    payload = rechazada.payload
+    if not isinstance(payload, dict) or rechazada.dispositivo_id is None:
+        return payload
+    if rechazada.motivo == 'no_autorizado' or payload.get('dispositivo') is None:
+        return {**payload, 'dispositivo': rechazada.dispositivo_id}
+    return payload
+
+
+class Command(BaseCommand):
+    help = 'Revalida e inserta por lotes las lecturas rechazadas pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--motivo', type=str, help='Solo rechazos con este motivo')
+        parser.add_argument('--dispositivo', type=int, help='Solo rechazos de este dispositivo')
+        parser.add_argument('--sensor', type=int, help='Solo rechazos de este sensor')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de lecturas por lote (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra qué se haría sin ejecutar cambios',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('\n🔍 MODO DRY-RUN - No se realizarán cambios\n'))
+
+        pendientes = LecturaRechazada.objects.filter(reprocesada=False)
+        if options['motivo']:
+            pendientes = pendientes.filter(motivo=options['motivo'])
+        else:
+            # Lecturas que reclamaban otro dispositivo que el de la clave: solo a pedido
+            pendientes = pendientes.exclude(motivo='no_autorizado')
+        if options['dispositivo']:
+            pendientes = pendientes.filter(dispositivo_id=options['dispositivo'])
+        if options['sensor']:
+            pendientes = pendientes.filter(sensor_id=options['sensor'])
+
+        total_ok = 0
+        total_fallidas = 0
+        ultimo_id = 0
+
+        # Recorrer por id para no depender de OFFSET en tablas grandes
+        while True:
+            lote = list(
+                pendientes.filter(id__gt=ultimo_id).order_by('id')
+                .only('id', 'payload', 'timestamp', 'motivo', 'dispositivo_id')[:batch_size]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            # Las lecturas conservan la hora en que llegaron, no la del reproceso
+            validas, rechazadas = clasificar_lecturas(
+                [_payload_a_reprocesar(r) for r in lote], recibidas=[r.timestamp for r in lote]
+            )
+            ids_ok = [lote[indice].id for indice, _ in validas]
+
+            # Agrupar fallidas por motivo para actualizar con una consulta por motivo
+            fallidas_por_motivo = {}
+            for indice, rechazada in rechazadas:
+                fallidas_por_motivo.setdefault(rechazada.motivo, []).append(lote[indice].id)
+
+            total_ok += len(ids_ok)
+            total_fallidas += len(rechazadas)
+
+            if dry_run:
+                continue
+
+            with transaction.atomic():
+                insertar_con_timestamp([lectura for _, lectura in validas])
+                LecturaRechazada.objects.filter(id__in=ids_ok).update(
+                    reprocesada=True,
+                    reprocesada_en=timezone.now()
+                )
+                for motivo, ids in fallidas_por_motivo.items():
+                    LecturaRechazada.objects.filter(id__in=ids).update(
+                        motivo=motivo,
+                        intentos=F('intentos') + 1
+                    )
+
+            self.stdout.write(f'  Lote hasta id {ultimo_id}: {len(ids_ok)} insertadas, {len(rechazadas)} siguen rechazadas')
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'✓ Lecturas reprocesadas: {total_ok}'))
+        self.stdout.write(self.style.WARNING(f'- Siguen rechazadas: {total_fallidas}'))
+
+        if not dry_run:
+            logger.info(f'Reproceso de lecturas rechazadas: {total_ok} insertadas, {total_fallidas} fallidas')
@@ -0,0 +1,99 @@
+"""
+Filtros sobre Lectura.metadata_json
+
+Solo se aceptan las claves de METADATA_FILTROS, cada una respaldada por un
+índice:
+- Igualdad (`meta__firmware=1.2.0`, `meta__calidad__in=buena,regular`):
+  contención `@>`, que usa el índice GIN jsonb_path_ops de metadata_json.
+- Rangos sobre claves numéricas (`meta__rssi__lt=-80`): índice B-tree de
+  expresión sobre el valor numérico de la clave (ver metadata_numerico).
+
+Un índice de expresión evita reescribir la tabla de lecturas como lo haría
+una columna generada, y el planner lo usa igual siempre que la consulta
+repita la misma expresión.
+"""
+
+from django.db.models import Case, CharField, FloatField, Func, Q, Value, When
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
+from django.db.models.functions import Cast
+from django.db.models.lookups import Exact
+from rest_framework.exceptions import ValidationError
+
+PREFIJO = 'meta__'
+
+# Parámetro de consulta -> clave en metadata_json y tipo de valor
+METADATA_FILTROS = {
+    'rssi': {'clave': 'rssi', 'tipo': 'numero'},
+    'bateria': {'clave': 'bateria', 'tipo': 'numero'},
+    'firmware': {'clave': 'version_firmware', 'tipo': 'texto'},
+    'calidad': {'clave': 'calidad', 'tipo': 'texto'},
+}
+
+OPERADORES_RANGO = {'lt', 'lte', 'gt', 'gte'}
+
+
+def metadata_numerico(clave):
+    """
+    Valor numérico de una clave de metadata_json, NULL si no es un número
+
+    Equivale a (metadata_json->>clave)::float pero sin fallar cuando el
+    firmware envía texto. La misma expresión define los índices de Lectura.
+    """
+    return Case(
+        When(
+            Exact(
+                Func(KeyTransform(clave, 'metadata_json'), function='jsonb_typeof', output_field=CharField()),
+                Value('number')
+            ),
+            then=Cast(KeyTextTransform(clave, 'metadata_json'), FloatField()),
+        ),
+        output_field=FloatField(),
+    )
+
+
+def _a_numero(parametro, valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        raise ValidationError({parametro: f'Se esperaba un número: {valor!r}'})
+
+
+def filtrar_metadata(queryset, query_params):
+    """
+    Aplica los parámetros meta__<clave>[__<operador>] al queryset
+
+    Raises:
+        ValidationError: Clave no permitida, operador inválido o valor no numérico
+    """
+    for parametro in query_params:
+        if not parametro.startswith(PREFIJO):
+            continue
+
+        nombre, _, operador = parametro[len(PREFIJO):].partition('__')
+        operador = operador or 'exact'
+        filtro = METADATA_FILTROS.get(nombre)
+        if filtro is None:
+            raise ValidationError({
+                parametro: f"Clave no permitida. Disponibles: {', '.join(sorted(METADATA_FILTROS))}"
+            })
+
+        clave = filtro['clave']
+        valor = query_params.get(parametro)
+        numerico = filtro['tipo'] == 'numero'
+
+        if operador in OPERADORES_RANGO and numerico:
+            queryset = queryset.alias(**{f'meta_{nombre}': metadata_numerico(clave)}).filter(
+                **{f'meta_{nombre}__{operador}': _a_numero(parametro, valor)}
+            )
+        elif operador in ('exact', 'in'):
+            valores = valor.split(',') if operador == 'in' else [valor]
+            if numerico:
+                valores = [_a_numero(parametro, v) for v in valores]
+            condicion = Q()
+            for v in valores:
+                condicion |= Q(metadata_json__contains={clave: v})
+            queryset = queryset.filter(condicion)
+        else:
+            raise ValidationError({parametro: f'Operador no soportado: {operador}'})
+
+    return queryset
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+        ('readings', '0001_initial'),
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturaRechazada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.FloatField(blank=True, null=True, verbose_name='Valor')),
+                ('payload', models.JSONField(default=dict, help_text='Lectura tal como fue recibida', verbose_name='Payload')),
+                ('motivo', models.CharField(choices=[('formato_invalido', 'Formato Inválido'), ('dispositivo_inexistente', 'Dispositivo Inexistente'), ('sensor_inexistente', 'Sensor Inexistente'), ('sensor_no_asignado', 'Sensor No Asignado'), ('fuera_de_rango', 'Fuera de Rango')], max_length=30, verbose_name='Motivo')),
+                ('detalle', models.CharField(blank=True, max_length=255, verbose_name='Detalle')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos de Reproceso')),
+                ('reprocesada', models.BooleanField(default=False, verbose_name='Reprocesada')),
+                ('reprocesada_en', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Reproceso')),
+                ('timestamp', models.DateTimeField(auto_now_add=True, verbose_name='Recibida')),
+                ('dispositivo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lecturas_rechazadas', to='devices.dispositivo', verbose_name='Dispositivo')),
+                ('sensor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lecturas_rechazadas', to='sensors.sensor', verbose_name='Sensor')),
+            ],
+            options={
+                'verbose_name': 'Lectura Rechazada',
+                'verbose_name_plural': 'Lecturas Rechazadas',
+                'db_table': 'lecturas_rechazadas',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['-timestamp'], name='idx_rechazada_timestamp'), models.Index(fields=['reprocesada', 'motivo'], name='idx_rechazada_pendiente')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+        ('readings', '0002_lecturarechazada'),
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrechaLectura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField(help_text='Timestamp de la última lectura antes de la brecha', verbose_name='Inicio')),
+                ('fin', models.DateTimeField(blank=True, help_text='Timestamp de la lectura que cerró la brecha (vacío si sigue abierta)', null=True, verbose_name='Fin')),
+                ('intervalo_esperado', models.IntegerField(verbose_name='Intervalo Esperado (segundos)')),
+                ('detectada_en', models.DateTimeField(verbose_name='Fecha de Detección')),
+                ('dispositivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='brechas_lecturas', to='devices.dispositivo', verbose_name='Dispositivo')),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='brechas_lecturas', to='sensors.sensor', verbose_name='Sensor')),
+            ],
+            options={
+                'verbose_name': 'Brecha de Lecturas',
+                'verbose_name_plural': 'Brechas de Lecturas',
+                'db_table': 'lecturas_brechas',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['-inicio'], name='idx_brecha_inicio'), models.Index(fields=['sensor', '-inicio'], name='idx_brecha_sensor_inicio')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='brechalectura',
+            constraint=models.UniqueConstraint(fields=('dispositivo', 'sensor', 'inicio'), name='uniq_brecha_serie_inicio'),
+        ),
+    ]
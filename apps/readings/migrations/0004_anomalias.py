@@ -0,0 +1,52 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+        ('readings', '0003_brechalectura'),
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CursorProcesamiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True, verbose_name='Nombre')),
+                ('ultimo_id', models.BigIntegerField(default=0, verbose_name='Último ID Procesado')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+            ],
+            options={
+                'verbose_name': 'Cursor de Procesamiento',
+                'verbose_name_plural': 'Cursores de Procesamiento',
+                'db_table': 'lecturas_cursores',
+            },
+        ),
+        migrations.CreateModel(
+            name='AnomaliaLectura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('detector', models.CharField(choices=[('zscore', 'Z-Score Móvil'), ('ewma', 'EWMA'), ('mad', 'Desviación Absoluta Mediana')], max_length=10, verbose_name='Detector')),
+                ('valor', models.FloatField(verbose_name='Valor')),
+                ('esperado', models.FloatField(help_text='Media, EWMA o mediana de la ventana según el detector', verbose_name='Valor Esperado')),
+                ('puntaje', models.FloatField(help_text='Desviación normalizada respecto a la ventana', verbose_name='Puntaje')),
+                ('timestamp', models.DateTimeField(verbose_name='Timestamp de la Lectura')),
+                ('detectada_en', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Detección')),
+                ('dispositivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalias', to='devices.dispositivo', verbose_name='Dispositivo')),
+                ('lectura', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalias', to='readings.lectura', verbose_name='Lectura')),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalias', to='sensors.sensor', verbose_name='Sensor')),
+            ],
+            options={
+                'verbose_name': 'Anomalía de Lectura',
+                'verbose_name_plural': 'Anomalías de Lecturas',
+                'db_table': 'lecturas_anomalias',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['-timestamp'], name='idx_anomalia_timestamp'), models.Index(fields=['sensor', '-timestamp'], name='idx_anomalia_sensor_ts')],
+            },
+        ),
+    ]
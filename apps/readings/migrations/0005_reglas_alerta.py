@@ -0,0 +1,104 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+        ('readings', '0004_anomalias'),
+        ('sensors', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReglaAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200, verbose_name='Nombre')),
+                ('tipo_sensor', models.CharField(blank=True, choices=[('temperatura', 'Temperatura'), ('humedad', 'Humedad'), ('presion', 'Presión'), ('luz', 'Luz'), ('movimiento', 'Movimiento'), ('gas', 'Gas'), ('sonido', 'Sonido'), ('distancia', 'Distancia'), ('acelerometro', 'Acelerómetro'), ('giroscopio', 'Giroscopio'), ('otro', 'Otro')], help_text='Aplica a todos los sensores de este tipo', max_length=20, verbose_name='Tipo de Sensor')),
+                ('condicion', models.CharField(choices=[('mayor', 'Por Encima del Umbral'), ('menor', 'Por Debajo del Umbral'), ('variacion', 'Tasa de Cambio')], max_length=10, verbose_name='Condición')),
+                ('umbral', models.FloatField(help_text='Valor límite; para tasa de cambio, unidades por minuto (en valor absoluto)', verbose_name='Umbral')),
+                ('duracion_segundos', models.PositiveIntegerField(default=0, help_text='La condición debe mantenerse este tiempo antes de disparar (0 = inmediato)', verbose_name='Duración Sostenida (segundos)')),
+                ('histeresis', models.FloatField(default=0, help_text='Margen que debe recuperar el valor respecto al umbral para cerrar la alerta', verbose_name='Histéresis')),
+                ('cooldown_segundos', models.PositiveIntegerField(default=300, help_text='Tiempo mínimo entre notificaciones de la misma regla y sensor', verbose_name='Cooldown (segundos)')),
+                ('notificar_telegram', models.BooleanField(default=True, verbose_name='Notificar por Telegram')),
+                ('notificar_email', models.BooleanField(default=True, verbose_name='Notificar por Email')),
+                ('activa', models.BooleanField(default=True, verbose_name='Activa')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reglas_alerta_creadas', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+                ('dispositivo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reglas_alerta', to='devices.dispositivo', verbose_name='Dispositivo')),
+                ('sensor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reglas_alerta', to='sensors.sensor', verbose_name='Sensor')),
+            ],
+            options={
+                'verbose_name': 'Regla de Alerta',
+                'verbose_name_plural': 'Reglas de Alerta',
+                'db_table': 'reglas_alerta',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventoAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('disparo', 'Disparo'), ('recuperacion', 'Recuperación')], max_length=15, verbose_name='Tipo')),
+                ('valor', models.FloatField(help_text='Valor de la lectura, o tasa por minuto en reglas de variación', verbose_name='Valor')),
+                ('notificado', models.BooleanField(default=False, help_text='Falso si el disparo cayó dentro del cooldown', verbose_name='Notificado')),
+                ('timestamp', models.DateTimeField(verbose_name='Timestamp')),
+                ('dispositivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_alerta', to='devices.dispositivo', verbose_name='Dispositivo')),
+                ('lectura', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_alerta', to='readings.lectura', verbose_name='Lectura')),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_alerta', to='sensors.sensor', verbose_name='Sensor')),
+                ('regla', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='readings.reglaalerta', verbose_name='Regla')),
+            ],
+            options={
+                'verbose_name': 'Evento de Alerta',
+                'verbose_name_plural': 'Eventos de Alerta',
+                'db_table': 'alertas_eventos',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadoAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activa', models.BooleanField(default=False, verbose_name='Alerta Activa')),
+                ('condicion_desde', models.DateTimeField(blank=True, null=True, verbose_name='Condición Cumplida Desde')),
+                ('ultimo_valor', models.FloatField(blank=True, null=True, verbose_name='Último Valor')),
+                ('ultimo_timestamp', models.DateTimeField(blank=True, null=True, verbose_name='Último Timestamp')),
+                ('ultima_notificacion', models.DateTimeField(blank=True, null=True, verbose_name='Última Notificación')),
+                ('dispositivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='devices.dispositivo', verbose_name='Dispositivo')),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sensors.sensor', verbose_name='Sensor')),
+                ('regla', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estados', to='readings.reglaalerta', verbose_name='Regla')),
+            ],
+            options={
+                'verbose_name': 'Estado de Alerta',
+                'verbose_name_plural': 'Estados de Alerta',
+                'db_table': 'alertas_estado',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reglaalerta',
+            index=models.Index(fields=['activa'], name='idx_regla_activa'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoalerta',
+            index=models.Index(fields=['-timestamp'], name='idx_evento_timestamp'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoalerta',
+            index=models.Index(fields=['regla', '-timestamp'], name='idx_evento_regla_ts'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoalerta',
+            index=models.Index(fields=['sensor', '-timestamp'], name='idx_evento_sensor_ts'),
+        ),
+        migrations.AddConstraint(
+            model_name='estadoalerta',
+            constraint=models.UniqueConstraint(fields=('regla', 'dispositivo', 'sensor'), name='uniq_estado_regla_serie'),
+        ),
+    ]
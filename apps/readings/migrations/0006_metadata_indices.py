@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:06
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+import django.db.models.fields.json
+import django.db.models.functions.comparison
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY: no bloquear la ingesta en tablas grandes
+    atomic = False
+
+    dependencies = [
+        ('devices', '0001_initial'),
+        ('readings', '0005_reglas_alerta'),
+        ('sensors', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='lectura',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata_json'], name='idx_lectura_metadata_gin', opclasses=['jsonb_path_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='lectura',
+            index=models.Index(models.Case(models.When(django.db.models.lookups.Exact(models.Func(django.db.models.fields.json.KeyTransform('rssi', 'metadata_json'), function='jsonb_typeof', output_field=models.CharField()), models.Value('number')), then=django.db.models.functions.comparison.Cast(django.db.models.fields.json.KeyTextTransform('rssi', 'metadata_json'), models.FloatField())), output_field=models.FloatField()), name='idx_lectura_meta_rssi'),
+        ),
+        AddIndexConcurrently(
+            model_name='lectura',
+            index=models.Index(models.Case(models.When(django.db.models.lookups.Exact(models.Func(django.db.models.fields.json.KeyTransform('bateria', 'metadata_json'), function='jsonb_typeof', output_field=models.CharField()), models.Value('number')), then=django.db.models.functions.comparison.Cast(django.db.models.fields.json.KeyTextTransform('bateria', 'metadata_json'), models.FloatField())), output_field=models.FloatField()), name='idx_lectura_meta_bateria'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0006_metadata_indices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lecturarechazada',
+            name='motivo',
+            field=models.CharField(choices=[('formato_invalido', 'Formato Inválido'), ('dispositivo_inexistente', 'Dispositivo Inexistente'), ('sensor_inexistente', 'Sensor Inexistente'), ('sensor_no_asignado', 'Sensor No Asignado'), ('fuera_de_rango', 'Fuera de Rango'), ('no_autorizado', 'No Autorizado')], max_length=30, verbose_name='Motivo'),
+        ),
+    ]
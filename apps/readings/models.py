@@ -2,8 +2,13 @@
 Modelos de la app Readings - Gestión de Lecturas de Sensores
 """
 
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
+from apps.sensors.models import Sensor
+from .metadata import metadata_numerico
+
 
 class Lectura(models.Model):
     """
@@ -65,6 +70,14 @@ class Lectura(models.Model):
             models.Index(fields=['dispositivo', '-timestamp'], name='idx_lectura_disp_ts'),
             models.Index(fields=['sensor', '-timestamp'], name='idx_lectura_sensor_ts'),
             models.Index(fields=['mqtt_message_id'], name='idx_lectura_mqtt_msg'),
+            # Filtros meta__* (ver apps.readings.metadata)
+            GinIndex(
+                fields=['metadata_json'],
+                opclasses=['jsonb_path_ops'],
+                name='idx_lectura_metadata_gin'
+            ),
+            models.Index(metadata_numerico('rssi'), name='idx_lectura_meta_rssi'),
+            models.Index(metadata_numerico('bateria'), name='idx_lectura_meta_bateria'),
         ]
     
     def __str__(self):
@@ -78,3 +91,417 @@ class Lectura(models.Model):
                 f'El valor {self.valor} está fuera del rango permitido '
                 f'({self.sensor.rango_min} - {self.sensor.rango_max})'
             )
+
+
+class LecturaRechazada(models.Model):
+    """
+    Lecturas rechazadas durante la ingesta (dead-letter)
+    Conserva el payload original para poder reprocesarlo cuando se corrija
+    el rango o la asignación del sensor
+    """
+    MOTIVO_CHOICES = [
+        ('formato_invalido', 'Formato Inválido'),
+        ('dispositivo_inexistente', 'Dispositivo Inexistente'),
+        ('sensor_inexistente', 'Sensor Inexistente'),
+        ('sensor_no_asignado', 'Sensor No Asignado'),
+        ('fuera_de_rango', 'Fuera de Rango'),
+        ('no_autorizado', 'No Autorizado'),
+    ]
+    
+    dispositivo = models.ForeignKey(
+        'devices.Dispositivo',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='lecturas_rechazadas',
+        verbose_name='Dispositivo'
+    )
+    sensor = models.ForeignKey(
+        'sensors.Sensor',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='lecturas_rechazadas',
+        verbose_name='Sensor'
+    )
+    valor = models.FloatField(null=True, blank=True, verbose_name='Valor')
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Payload',
+        help_text='Lectura tal como fue recibida'
+    )
+    motivo = models.CharField(
+        max_length=30,
+        choices=MOTIVO_CHOICES,
+        verbose_name='Motivo'
+    )
+    detalle = models.CharField(max_length=255, blank=True, verbose_name='Detalle')
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos de Reproceso'
+    )
+    reprocesada = models.BooleanField(default=False, verbose_name='Reprocesada')
+    reprocesada_en = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Reproceso'
+    )
+    timestamp = models.DateTimeField(auto_now_add=True, verbose_name='Recibida')
+    
+    class Meta:
+        verbose_name = 'Lectura Rechazada'
+        verbose_name_plural = 'Lecturas Rechazadas'
+        ordering = ['-timestamp']
+        db_table = 'lecturas_rechazadas'
+        indexes = [
+            models.Index(fields=['-timestamp'], name='idx_rechazada_timestamp'),
+            models.Index(fields=['reprocesada', 'motivo'], name='idx_rechazada_pendiente'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_motivo_display()}: {self.payload} ({self.timestamp})"
+
+
+class BrechaLectura(models.Model):
+    """
+    Intervalos sin lecturas (brechas) por sensor de un dispositivo
+    Una brecha sin fin indica un sensor silencioso que aún no reporta
+    """
+    dispositivo = models.ForeignKey(
+        'devices.Dispositivo',
+        on_delete=models.CASCADE,
+        related_name='brechas_lecturas',
+        verbose_name='Dispositivo'
+    )
+    sensor = models.ForeignKey(
+        'sensors.Sensor',
+        on_delete=models.CASCADE,
+        related_name='brechas_lecturas',
+        verbose_name='Sensor'
+    )
+    inicio = models.DateTimeField(
+        verbose_name='Inicio',
+        help_text='Timestamp de la última lectura antes de la brecha'
+    )
+    fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fin',
+        help_text='Timestamp de la lectura que cerró la brecha (vacío si sigue abierta)'
+    )
+    intervalo_esperado = models.IntegerField(
+        verbose_name='Intervalo Esperado (segundos)'
+    )
+    detectada_en = models.DateTimeField(verbose_name='Fecha de Detección')
+    
+    class Meta:
+        verbose_name = 'Brecha de Lecturas'
+        verbose_name_plural = 'Brechas de Lecturas'
+        ordering = ['-inicio']
+        db_table = 'lecturas_brechas'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dispositivo', 'sensor', 'inicio'],
+                name='uniq_brecha_serie_inicio'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-inicio'], name='idx_brecha_inicio'),
+            models.Index(fields=['sensor', '-inicio'], name='idx_brecha_sensor_inicio'),
+        ]
+    
+    def __str__(self):
+        return f"Sensor {self.sensor_id} / Dispositivo {self.dispositivo_id}: {self.inicio} - {self.fin or 'abierta'}"
+    
+    @property
+    def abierta(self):
+        """Indica si el sensor sigue sin reportar"""
+        return self.fin is None
+
+
+class CursorProcesamiento(models.Model):
+    """
+    Última lectura procesada por cada proceso incremental (ej: anomalías)
+    Permite procesar solo las lecturas nuevas sin volver a leer el histórico
+    """
+    nombre = models.CharField(max_length=50, unique=True, verbose_name='Nombre')
+    ultimo_id = models.BigIntegerField(default=0, verbose_name='Último ID Procesado')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')
+    
+    class Meta:
+        verbose_name = 'Cursor de Procesamiento'
+        verbose_name_plural = 'Cursores de Procesamiento'
+        db_table = 'lecturas_cursores'
+    
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_id}"
+
+
+class AnomaliaLectura(models.Model):
+    """
+    Lecturas marcadas como anómalas por los detectores estadísticos
+    """
+    DETECTOR_CHOICES = [
+        ('zscore', 'Z-Score Móvil'),
+        ('ewma', 'EWMA'),
+        ('mad', 'Desviación Absoluta Mediana'),
+    ]
+    
+    lectura = models.ForeignKey(
+        Lectura,
+        on_delete=models.CASCADE,
+        related_name='anomalias',
+        verbose_name='Lectura'
+    )
+    dispositivo = models.ForeignKey(
+        'devices.Dispositivo',
+        on_delete=models.CASCADE,
+        related_name='anomalias',
+        verbose_name='Dispositivo'
+    )
+    sensor = models.ForeignKey(
+        'sensors.Sensor',
+        on_delete=models.CASCADE,
+        related_name='anomalias',
+        verbose_name='Sensor'
+    )
+    detector = models.CharField(
+        max_length=10,
+        choices=DETECTOR_CHOICES,
+        verbose_name='Detector'
+    )
+    valor = models.FloatField(verbose_name='Valor')
+    esperado = models.FloatField(
+        verbose_name='Valor Esperado',
+        help_text='Media, EWMA o mediana de la ventana según el detector'
+    )
+    puntaje = models.FloatField(
+        verbose_name='Puntaje',
+        help_text='Desviación normalizada respecto a la ventana'
+    )
+    timestamp = models.DateTimeField(verbose_name='Timestamp de la Lectura')
+    detectada_en = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Detección')
+    
+    class Meta:
+        verbose_name = 'Anomalía de Lectura'
+        verbose_name_plural = 'Anomalías de Lecturas'
+        ordering = ['-timestamp']
+        db_table = 'lecturas_anomalias'
+        indexes = [
+            models.Index(fields=['-timestamp'], name='idx_anomalia_timestamp'),
+            models.Index(fields=['sensor', '-timestamp'], name='idx_anomalia_sensor_ts'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_detector_display()} - Sensor {self.sensor_id}: {self.valor} (puntaje {self.puntaje:.2f})"
+
+
+class ReglaAlerta(models.Model):
+    """
+    Regla de alerta sobre las lecturas, más allá de rango_min/rango_max
+    
+    El ámbito se define con sensor, dispositivo y/o tipo de sensor: la
+    regla aplica a las lecturas que cumplan todos los campos indicados.
+    """
+    CONDICION_CHOICES = [
+        ('mayor', 'Por Encima del Umbral'),
+        ('menor', 'Por Debajo del Umbral'),
+        ('variacion', 'Tasa de Cambio'),
+    ]
+    
+    nombre = models.CharField(max_length=200, verbose_name='Nombre')
+    sensor = models.ForeignKey(
+        'sensors.Sensor',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reglas_alerta',
+        verbose_name='Sensor'
+    )
+    dispositivo = models.ForeignKey(
+        'devices.Dispositivo',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reglas_alerta',
+        verbose_name='Dispositivo'
+    )
+    tipo_sensor = models.CharField(
+        max_length=20,
+        choices=Sensor.TIPO_SENSOR_CHOICES,
+        blank=True,
+        verbose_name='Tipo de Sensor',
+        help_text='Aplica a todos los sensores de este tipo'
+    )
+    condicion = models.CharField(
+        max_length=10,
+        choices=CONDICION_CHOICES,
+        verbose_name='Condición'
+    )
+    umbral = models.FloatField(
+        verbose_name='Umbral',
+        help_text='Valor límite; para tasa de cambio, unidades por minuto (en valor absoluto)'
+    )
+    duracion_segundos = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Duración Sostenida (segundos)',
+        help_text='La condición debe mantenerse este tiempo antes de disparar (0 = inmediato)'
+    )
+    histeresis = models.FloatField(
+        default=0,
+        verbose_name='Histéresis',
+        help_text='Margen que debe recuperar el valor respecto al umbral para cerrar la alerta'
+    )
+    cooldown_segundos = models.PositiveIntegerField(
+        default=300,
+        verbose_name='Cooldown (segundos)',
+        help_text='Tiempo mínimo entre notificaciones de la misma regla y sensor'
+    )
+    notificar_telegram = models.BooleanField(default=True, verbose_name='Notificar por Telegram')
+    notificar_email = models.BooleanField(default=True, verbose_name='Notificar por Email')
+    activa = models.BooleanField(default=True, verbose_name='Activa')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reglas_alerta_creadas',
+        verbose_name='Creado por'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')
+    
+    class Meta:
+        verbose_name = 'Regla de Alerta'
+        verbose_name_plural = 'Reglas de Alerta'
+        ordering = ['nombre']
+        db_table = 'reglas_alerta'
+        indexes = [
+            models.Index(fields=['activa'], name='idx_regla_activa'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.get_condicion_display()} {self.umbral})"
+    
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if not (self.sensor_id or self.dispositivo_id or self.tipo_sensor):
+            raise ValidationError(
+                'La regla debe indicar al menos un sensor, un dispositivo o un tipo de sensor.'
+            )
+        if self.histeresis < 0:
+            raise ValidationError('La histéresis no puede ser negativa.')
+
+
+class EstadoAlerta(models.Model):
+    """
+    Estado de una regla para una serie (dispositivo, sensor)
+    Guarda lo necesario para evaluar el siguiente lote sin releer lecturas
+    """
+    regla = models.ForeignKey(
+        ReglaAlerta,
+        on_delete=models.CASCADE,
+        related_name='estados',
+        verbose_name='Regla'
+    )
+    dispositivo = models.ForeignKey(
+        'devices.Dispositivo',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Dispositivo'
+    )
+    sensor = models.ForeignKey(
+        'sensors.Sensor',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Sensor'
+    )
+    activa = models.BooleanField(default=False, verbose_name='Alerta Activa')
+    condicion_desde = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Condición Cumplida Desde'
+    )
+    ultimo_valor = models.FloatField(null=True, blank=True, verbose_name='Último Valor')
+    ultimo_timestamp = models.DateTimeField(null=True, blank=True, verbose_name='Último Timestamp')
+    ultima_notificacion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Última Notificación'
+    )
+    
+    class Meta:
+        verbose_name = 'Estado de Alerta'
+        verbose_name_plural = 'Estados de Alerta'
+        db_table = 'alertas_estado'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['regla', 'dispositivo', 'sensor'],
+                name='uniq_estado_regla_serie'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Regla {self.regla_id} - Sensor {self.sensor_id}: {'activa' if self.activa else 'normal'}"
+
+
+class EventoAlerta(models.Model):
+    """
+    Historial de disparos y recuperaciones de las reglas de alerta
+    """
+    TIPO_CHOICES = [
+        ('disparo', 'Disparo'),
+        ('recuperacion', 'Recuperación'),
+    ]
+    
+    regla = models.ForeignKey(
+        ReglaAlerta,
+        on_delete=models.CASCADE,
+        related_name='eventos',
+        verbose_name='Regla'
+    )
+    lectura = models.ForeignKey(
+        Lectura,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='eventos_alerta',
+        verbose_name='Lectura'
+    )
+    dispositivo = models.ForeignKey(
+        'devices.Dispositivo',
+        on_delete=models.CASCADE,
+        related_name='eventos_alerta',
+        verbose_name='Dispositivo'
+    )
+    sensor = models.ForeignKey(
+        'sensors.Sensor',
+        on_delete=models.CASCADE,
+        related_name='eventos_alerta',
+        verbose_name='Sensor'
+    )
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES, verbose_name='Tipo')
+    valor = models.FloatField(
+        verbose_name='Valor',
+        help_text='Valor de la lectura, o tasa por minuto en reglas de variación'
+    )
+    notificado = models.BooleanField(
+        default=False,
+        verbose_name='Notificado',
+        help_text='Falso si el disparo cayó dentro del cooldown'
+    )
+    timestamp = models.DateTimeField(verbose_name='Timestamp')
+    
+    class Meta:
+        verbose_name = 'Evento de Alerta'
+        verbose_name_plural = 'Eventos de Alerta'
+        ordering = ['-timestamp']
+        db_table = 'alertas_eventos'
+        indexes = [
+            models.Index(fields=['-timestamp'], name='idx_evento_timestamp'),
+            models.Index(fields=['regla', '-timestamp'], name='idx_evento_regla_ts'),
+            models.Index(fields=['sensor', '-timestamp'], name='idx_evento_sensor_ts'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.regla_id}: {self.valor} ({self.timestamp})"
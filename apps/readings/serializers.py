@@ -3,11 +3,15 @@ Serializers para la app Readings
 """
 
 from rest_framework import serializers
-from .models import Lectura
+from .models import (
+    Lectura, LecturaRechazada, BrechaLectura, AnomaliaLectura, ReglaAlerta, EventoAlerta
+)
+from apps.accounts.metrics import TimedListSerializer, TimedSerializerMixin
+from apps.accounts.sparse_fields import SparseFieldsSerializerMixin
 from apps.devices.models import DispositivoSensor
 
 
-class LecturaSerializer(serializers.ModelSerializer):
+class LecturaSerializer(TimedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer para el modelo Lectura
     """
@@ -23,12 +27,20 @@ class LecturaSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Lectura
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'dispositivo', 'dispositivo_nombre', 'sensor',
             'sensor_nombre', 'sensor_unidad', 'valor', 'timestamp',
             'metadata_json', 'mqtt_message_id', 'mqtt_qos', 'mqtt_retained'
         ]
         read_only_fields = ['timestamp']
+        list_fields = ['id', 'dispositivo', 'sensor', 'valor', 'timestamp']
+        expandable_fields = {
+            'dispositivo': ['dispositivo_nombre'],
+            'sensor': ['sensor_nombre', 'sensor_unidad'],
+            'metadata': ['metadata_json'],
+            'mqtt': ['mqtt_message_id', 'mqtt_qos', 'mqtt_retained'],
+        }
     
     def validate(self, attrs):
         dispositivo = attrs.get('dispositivo')
@@ -66,10 +78,161 @@ class LecturaSerializer(serializers.ModelSerializer):
 class LecturaBulkSerializer(serializers.Serializer):
     """
     Serializer para crear multiples lecturas a la vez
+    
+    La validacion de cada lectura se hace por lote en apps.readings.ingestion;
+    las lecturas invalidas se guardan en cuarentena en lugar de descartarse.
+    context['autenticado']: DispositivoAutenticado si el lote llega con la
+    clave de API de un dispositivo.
     """
-    lecturas = LecturaSerializer(many=True)
+    lecturas = serializers.ListField(allow_empty=False)
     
     def create(self, validated_data):
-        lecturas_data = validated_data['lecturas']
-        lecturas = [Lectura(**lectura_data) for lectura_data in lecturas_data]
-        return Lectura.objects.bulk_create(lecturas)
+        from .ingestion import ingerir_lecturas
+        creadas, rechazadas = ingerir_lecturas(
+            validated_data['lecturas'], self.context.get('autenticado')
+        )
+        return {'creadas': creadas, 'rechazadas': rechazadas}
+
+
+class LecturaRechazadaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para lecturas rechazadas (solo lectura)
+    """
+    motivo_display = serializers.CharField(source='get_motivo_display', read_only=True)
+    
+    class Meta:
+        model = LecturaRechazada
+        fields = [
+            'id', 'dispositivo', 'sensor', 'valor', 'payload', 'motivo',
+            'motivo_display', 'detalle', 'intentos', 'reprocesada',
+            'reprocesada_en', 'timestamp'
+        ]
+        read_only_fields = fields
+
+
+class BrechaLecturaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para brechas de lecturas (solo lectura)
+    """
+    dispositivo_nombre = serializers.CharField(
+        source='dispositivo.nombre',
+        read_only=True
+    )
+    sensor_nombre = serializers.CharField(source='sensor.nombre', read_only=True)
+    abierta = serializers.BooleanField(read_only=True)
+    duracion_segundos = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BrechaLectura
+        fields = [
+            'id', 'dispositivo', 'dispositivo_nombre', 'sensor', 'sensor_nombre',
+            'inicio', 'fin', 'abierta', 'duracion_segundos',
+            'intervalo_esperado', 'detectada_en'
+        ]
+        read_only_fields = fields
+    
+    def get_duracion_segundos(self, obj):
+        from django.utils import timezone
+        fin = obj.fin or timezone.now()
+        return int((fin - obj.inicio).total_seconds())
+
+
+class AnomaliaLecturaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para anomalías de lecturas (solo lectura)
+    """
+    detector_display = serializers.CharField(source='get_detector_display', read_only=True)
+    dispositivo_nombre = serializers.CharField(
+        source='dispositivo.nombre',
+        read_only=True
+    )
+    sensor_nombre = serializers.CharField(source='sensor.nombre', read_only=True)
+    
+    class Meta:
+        model = AnomaliaLectura
+        fields = [
+            'id', 'lectura', 'dispositivo', 'dispositivo_nombre', 'sensor',
+            'sensor_nombre', 'detector', 'detector_display', 'valor',
+            'esperado', 'puntaje', 'timestamp', 'detectada_en'
+        ]
+        read_only_fields = fields
+
+
+class ReglaAlertaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para reglas de alerta
+    """
+    condicion_display = serializers.CharField(source='get_condicion_display', read_only=True)
+    sensor_nombre = serializers.CharField(source='sensor.nombre', read_only=True, default=None)
+    dispositivo_nombre = serializers.CharField(
+        source='dispositivo.nombre',
+        read_only=True,
+        default=None
+    )
+    created_by_username = serializers.CharField(
+        source='created_by.username',
+        read_only=True,
+        default=None
+    )
+    
+    class Meta:
+        model = ReglaAlerta
+        fields = [
+            'id', 'nombre', 'sensor', 'sensor_nombre', 'dispositivo',
+            'dispositivo_nombre', 'tipo_sensor', 'condicion', 'condicion_display',
+            'umbral', 'duracion_segundos', 'histeresis', 'cooldown_segundos',
+            'notificar_telegram', 'notificar_email', 'activa',
+            'created_by', 'created_by_username', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        def actual(campo):
+            if campo in attrs:
+                return attrs[campo]
+            return getattr(self.instance, campo, None) if self.instance else None
+        
+        if not (actual('sensor') or actual('dispositivo') or actual('tipo_sensor')):
+            raise serializers.ValidationError(
+                "La regla debe indicar al menos un sensor, un dispositivo o un tipo de sensor."
+            )
+        if (actual('histeresis') or 0) < 0:
+            raise serializers.ValidationError("La histeresis no puede ser negativa.")
+        
+        # Solo los superusuarios crean reglas de toda la flota (por tipo de
+        # sensor) o sobre dispositivos ajenos: la regla notifica a sus dueños
+        request = self.context.get('request')
+        if request and not request.user.is_superuser:
+            dispositivo = actual('dispositivo')
+            if dispositivo is None:
+                raise serializers.ValidationError({
+                    'dispositivo': "Debe indicar uno de sus dispositivos."
+                })
+            if dispositivo.operador_asignado_id != request.user.id:
+                raise serializers.ValidationError({
+                    'dispositivo': "Solo puede crear reglas sobre sus dispositivos asignados."
+                })
+        
+        return attrs
+
+
+class EventoAlertaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para eventos de alerta (solo lectura)
+    """
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+    regla_nombre = serializers.CharField(source='regla.nombre', read_only=True)
+    dispositivo_nombre = serializers.CharField(
+        source='dispositivo.nombre',
+        read_only=True
+    )
+    sensor_nombre = serializers.CharField(source='sensor.nombre', read_only=True)
+    
+    class Meta:
+        model = EventoAlerta
+        fields = [
+            'id', 'regla', 'regla_nombre', 'lectura', 'dispositivo',
+            'dispositivo_nombre', 'sensor', 'sensor_nombre', 'tipo',
+            'tipo_display', 'valor', 'notificado', 'timestamp'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,19 @@
+"""
+Señales de la app Readings
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ReglaAlerta
+from .alertas import invalidar_indice
+
+
+@receiver(post_save, sender=ReglaAlerta)
+@receiver(post_delete, sender=ReglaAlerta)
+def invalidar_indice_reglas(sender, instance, **kwargs):
+    """
+    Recompila el índice de reglas del proceso en la próxima evaluación.
+    Los demás procesos lo recargan al vencer ALERTAS_RECARGA_SEGUNDOS.
+    """
+    invalidar_indice()
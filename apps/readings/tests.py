@@ -0,0 +1,493 @@
+"""
+Tests de la app Readings
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from apps.accounts.fast_serializers import ValuesSerializer, plan_cache
+from apps.accounts.models import CustomUser
+from apps.accounts.testing import ConsultasConstantesMixin
+from apps.devices.flota import crear_flota, dispositivos_de_flota
+from apps.devices.models import DispositivoSensor
+from . import alertas, anomalias
+from .ingestion import clasificar_lecturas, insertar_con_timestamp
+from .models import (
+    AnomaliaLectura, BrechaLectura, CursorProcesamiento, EventoAlerta, Lectura,
+    LecturaRechazada, ReglaAlerta
+)
+from .serializers import LecturaRechazadaSerializer, LecturaSerializer, ReglaAlertaSerializer
+
+
+class _RechazadaConNombres(LecturaRechazadaSerializer):
+    """Campos de una FK nula sin default: DRF los omite de la fila"""
+    dispositivo_nombre = serializers.CharField(source='dispositivo.nombre', read_only=True)
+    sensor_nombre = serializers.CharField(source='sensor.nombre', read_only=True, allow_null=True)
+
+    class Meta(LecturaRechazadaSerializer.Meta):
+        fields = LecturaRechazadaSerializer.Meta.fields + ['dispositivo_nombre', 'sensor_nombre']
+        read_only_fields = fields
+
+
+class ValuesSerializerTest(TestCase):
+    """
+    ValuesSerializer (listados rápidos) produce el mismo JSON que el
+    serializer de DRF del que se compila
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_user(
+            username='valores', email='valores@example.com', password=None
+        )
+        crear_flota(2, 2, prefijo='valores')
+        asignaciones = list(
+            DispositivoSensor.objects.filter(dispositivo__in=dispositivos_de_flota('valores'))
+            .select_related('dispositivo', 'sensor')
+        )
+        cls.asignacion = asignaciones[0]
+
+        Lectura.objects.bulk_create([
+            Lectura(
+                dispositivo=asignacion.dispositivo, sensor=asignacion.sensor, valor=i + 0.5,
+                metadata_json={'rssi': -60 - i} if i % 2 else {}, mqtt_message_id=f'm{i}' if i % 3 else None,
+                mqtt_qos=(None, 0, 1, 2)[i % 4], mqtt_retained=bool(i % 2),
+            )
+            for i, asignacion in enumerate(asignaciones * 3)
+        ])
+
+        LecturaRechazada.objects.bulk_create([
+            LecturaRechazada(payload={'valor': 'x'}, motivo='formato_invalido', detalle='sin FK'),
+            LecturaRechazada(
+                dispositivo=cls.asignacion.dispositivo, sensor=cls.asignacion.sensor, valor=1.0,
+                payload={'valor': 1}, motivo='fuera_de_rango', detalle='con FK',
+            ),
+        ])
+
+        ReglaAlerta.objects.bulk_create([
+            ReglaAlerta(nombre='por tipo', tipo_sensor='temperatura', condicion='mayor', umbral=30),
+            ReglaAlerta(
+                nombre='por sensor', sensor=cls.asignacion.sensor, dispositivo=cls.asignacion.dispositivo,
+                condicion='variacion', umbral=5, created_by=cls.usuario,
+            ),
+        ])
+
+    def assertMismoJSON(self, queryset, serializer_class, **kwargs):
+        """Compara el JSON de ambos caminos para las filas del queryset"""
+        fast = ValuesSerializer(serializer_class(**kwargs))
+        queryset = queryset.order_by('id')
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(fast.to_representation(fast.values(queryset))),
+            renderer.render(serializer_class(queryset, many=True, **kwargs).data),
+        )
+
+    def test_lecturas_todos_los_campos(self):
+        self.assertMismoJSON(Lectura.objects.all(), LecturaSerializer)
+
+    def test_lecturas_campos_de_listado(self):
+        self.assertMismoJSON(Lectura.objects.all(), LecturaSerializer, fields=LecturaSerializer.Meta.list_fields)
+
+    def test_rechazadas_con_fk_nula_y_display(self):
+        self.assertMismoJSON(LecturaRechazada.objects.all(), _RechazadaConNombres)
+        fast = ValuesSerializer(_RechazadaConNombres())
+        fila = fast.to_representation(fast.values(LecturaRechazada.objects.filter(dispositivo__isnull=True)))[0]
+        self.assertNotIn('dispositivo_nombre', fila)
+        self.assertIsNone(fila['sensor_nombre'])
+        self.assertEqual(fila['motivo_display'], 'Formato Inválido')
+
+    def test_reglas_con_fk_nula_con_default(self):
+        self.assertMismoJSON(ReglaAlerta.objects.all(), ReglaAlertaSerializer)
+
+
+class ListadosConsultasTest(ConsultasConstantesMixin, APITestCase):
+    """Los listados de readings usan las mismas consultas con cualquier tamaño de página"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_superuser(
+            username='admin-consultas', email='admin-consultas@example.com', password='x'
+        )
+        crear_flota(100, 1, 1, prefijo='consultas', operador=cls.usuario)
+        lecturas = list(Lectura.objects.select_related('dispositivo', 'sensor'))
+        ahora = timezone.now()
+
+        LecturaRechazada.objects.bulk_create(
+            LecturaRechazada(
+                dispositivo=l.dispositivo, sensor=l.sensor, valor=l.valor,
+                payload={'valor': l.valor}, motivo='fuera_de_rango', detalle='test',
+            )
+            for l in lecturas
+        )
+        BrechaLectura.objects.bulk_create(
+            BrechaLectura(
+                dispositivo=l.dispositivo, sensor=l.sensor, inicio=l.timestamp,
+                intervalo_esperado=60, detectada_en=ahora,
+            )
+            for l in lecturas
+        )
+        AnomaliaLectura.objects.bulk_create(
+            AnomaliaLectura(
+                lectura=l, dispositivo=l.dispositivo, sensor=l.sensor, detector='zscore',
+                valor=l.valor, esperado=0, puntaje=5, timestamp=l.timestamp,
+            )
+            for l in lecturas
+        )
+        reglas = ReglaAlerta.objects.bulk_create(
+            ReglaAlerta(
+                nombre=f'regla {i}', sensor=l.sensor, dispositivo=l.dispositivo,
+                condicion='mayor', umbral=0, created_by=cls.usuario,
+            )
+            for i, l in enumerate(lecturas)
+        )
+        EventoAlerta.objects.bulk_create(
+            EventoAlerta(
+                regla=regla, lectura=l, dispositivo=l.dispositivo, sensor=l.sensor,
+                tipo='disparo', valor=l.valor, timestamp=l.timestamp,
+            )
+            for regla, l in zip(reglas, lecturas)
+        )
+
+    # Todos: COUNT del paginador y la página con sus relaciones (select_related)
+
+    def test_lecturas(self):
+        self.assertConsultasConstantes('reading-list', 2)
+
+    def test_lecturas_con_nombres(self):
+        self.assertConsultasConstantes('reading-list', 2, '&expand=dispositivo,sensor')
+
+    def test_rechazadas(self):
+        self.assertConsultasConstantes('reading-rechazada-list', 2)
+
+    def test_brechas(self):
+        self.assertConsultasConstantes('reading-gap-list', 2)
+
+    def test_anomalias(self):
+        self.assertConsultasConstantes('reading-anomalia-list', 2)
+
+    def test_reglas(self):
+        self.assertConsultasConstantes('reading-alerta-regla-list', 2)
+
+    def test_eventos(self):
+        self.assertConsultasConstantes('reading-alerta-list', 2)
+
+    def test_plan_compilado_una_vez(self):
+        plan_cache.clear()
+        with mock.patch('apps.accounts.fast_serializers.ValuesSerializer', wraps=ValuesSerializer) as compilar:
+            for params in ('', '?page_size=5', '?fields=id,valor', '?fields=valor,id'):
+                self.assertEqual(self.client.get(f"{reverse('reading-list')}{params}").status_code, 200)
+        # Uno por conjunto de campos: los de listado e id,valor
+        self.assertEqual(compilar.call_count, 2)
+
+
+class DetectoresAnomaliasTest(TestCase):
+    """Los detectores vectorizados coinciden con su definición punto a punto"""
+
+    VENTANA = 10
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.x = np.concatenate((20 + rng.normal(0, 0.5, 40), [40.0]))
+
+    def test_zscore_movil(self):
+        esperado, puntaje = anomalias.zscore_movil(self.x, self.VENTANA)
+        self.assertTrue(np.isnan(puntaje[:self.VENTANA]).all())
+        for i in range(self.VENTANA, len(self.x)):
+            previos = self.x[i - self.VENTANA:i]
+            self.assertAlmostEqual(esperado[i], previos.mean())
+            self.assertAlmostEqual(puntaje[i], abs(self.x[i] - previos.mean()) / previos.std(), places=6)
+        self.assertGreater(puntaje[-1], 3.5)
+
+    def test_mad_movil(self):
+        esperado, puntaje = anomalias.mad_movil(self.x, self.VENTANA)
+        self.assertTrue(np.isnan(puntaje[:self.VENTANA]).all())
+        for i in range(self.VENTANA, len(self.x)):
+            previos = self.x[i - self.VENTANA:i]
+            mediana = np.median(previos)
+            mad = np.median(np.abs(previos - mediana))
+            self.assertAlmostEqual(esperado[i], mediana)
+            self.assertAlmostEqual(puntaje[i], anomalias.CONSTANTE_MAD * abs(self.x[i] - mediana) / mad)
+        self.assertGreater(puntaje[-1], 3.5)
+
+    def test_ewma(self):
+        alpha = 0.05
+        esperado, puntaje = anomalias.ewma(self.x, alpha, self.VENTANA)
+        self.assertTrue(np.isnan(puntaje[:self.VENTANA]).all())
+
+        # Recurrencia directa: media y varianza hasta el punto anterior
+        media, varianza = self.x[0], 0.0
+        for i in range(1, len(self.x)):
+            if i >= self.VENTANA:
+                self.assertAlmostEqual(esperado[i], media)
+                self.assertAlmostEqual(puntaje[i], abs(self.x[i] - media) / np.sqrt(varianza), places=6)
+            d = self.x[i] - media
+            media = media + alpha * d
+            varianza = (1 - alpha) * (varianza + alpha * d * d)
+        self.assertGreater(puntaje[-1], 3.5)
+
+    def test_serie_constante(self):
+        x = np.array([5.0] * self.VENTANA + [5.0, 6.0])
+        for detector in (anomalias.zscore_movil, anomalias.mad_movil):
+            _, puntaje = detector(x, self.VENTANA)
+            self.assertEqual(puntaje[self.VENTANA], 0.0)
+            self.assertEqual(puntaje[-1], np.inf)
+
+    def test_analizar_serie_separa_historial(self):
+        config = {'ventana': self.VENTANA, 'alpha': 0.05, 'umbrales': {'zscore': 3.5, 'ewma': 3.5, 'mad': 3.5}}
+        marcados = anomalias.analizar_serie(self.x[:30], self.x[30:], config)
+        self.assertEqual({(indice, detector) for indice, detector, _, _ in marcados},
+                         {(10, 'zscore'), (10, 'ewma'), (10, 'mad')})
+
+
+@override_settings(ANOMALIAS_VENTANA=10)
+class CursorAnomaliasTest(TestCase):
+    """procesar_lecturas_nuevas avanza el cursor sin saltar lecturas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_flota(1, 1, prefijo='anomalias')
+        cls.asignacion = DispositivoSensor.objects.get(dispositivo__in=dispositivos_de_flota('anomalias'))
+
+    def crear(self, valores, hace=timedelta(hours=1)):
+        lecturas = Lectura.objects.bulk_create(
+            Lectura(dispositivo_id=self.asignacion.dispositivo_id, sensor_id=self.asignacion.sensor_id, valor=v)
+            for v in valores
+        )
+        ids = [lectura.id for lectura in lecturas]
+        Lectura.objects.filter(id__in=ids).update(timestamp=timezone.now() - hace)
+        return ids
+
+    def procesar(self):
+        return anomalias.procesar_lecturas_nuevas(notificar=False)
+
+    def ultimo_id(self):
+        return CursorProcesamiento.objects.get(nombre=anomalias.CURSOR_ANOMALIAS).ultimo_id
+
+    def test_se_detiene_en_la_primera_lectura_reciente(self):
+        antiguas = self.crear([20, 21, 20])
+        reciente = self.crear([21], hace=timedelta(0))
+        posteriores = self.crear([20, 21])
+
+        self.assertEqual(self.procesar(), {'procesadas': 3, 'anomalias': 0})
+        self.assertEqual(self.ultimo_id(), antiguas[-1])
+
+        # Fuera del margen: se procesa junto con las que venían detrás
+        Lectura.objects.filter(id__in=reciente).update(timestamp=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.procesar(), {'procesadas': 3, 'anomalias': 0})
+        self.assertEqual(self.ultimo_id(), posteriores[-1])
+        self.assertEqual(self.procesar(), {'procesadas': 0, 'anomalias': 0})
+
+    def test_historial_de_llamadas_anteriores(self):
+        self.crear([20, 21] * 10)
+        self.assertEqual(self.procesar(), {'procesadas': 20, 'anomalias': 0})
+
+        # El pico se evalúa contra la ventana ya procesada
+        pico = self.crear([40])
+        self.assertEqual(self.procesar(), {'procesadas': 1, 'anomalias': 3})
+        self.assertEqual(
+            set(AnomaliaLectura.objects.filter(lectura_id=pico[0]).values_list('detector', flat=True)),
+            {'zscore', 'ewma', 'mad'},
+        )
+
+    def test_limite(self):
+        ids = self.crear([20] * 5)
+        anomalias.procesar_lecturas_nuevas(limite=2, notificar=False)
+        self.assertEqual(self.ultimo_id(), ids[1])
+
+
+class IngestionTest(TestCase):
+    """Clasificación de lotes, inserción con timestamp y reproceso de rechazadas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Dos dispositivos con un sensor de temperatura (-10 a 50) cada uno
+        crear_flota(2, 1, prefijo='ingesta')
+        cls.propia, cls.ajena = DispositivoSensor.objects.filter(
+            dispositivo__in=dispositivos_de_flota('ingesta')
+        ).order_by('dispositivo_id')
+
+    def lectura(self, **campos):
+        return {'dispositivo': self.propia.dispositivo_id, 'sensor': self.propia.sensor_id, 'valor': 20, **campos}
+
+    def motivos(self, items):
+        validas, rechazadas = clasificar_lecturas(items)
+        return [indice for indice, _ in validas], {indice: r.motivo for indice, r in rechazadas}
+
+    def test_validas(self):
+        items = [
+            self.lectura(),
+            self.lectura(valor='21.5', mqtt_qos='1', mqtt_retained='false', mqtt_message_id='m1'),
+            self.lectura(valor=50, metadata_json={'rssi': -70}),
+        ]
+        validas, rechazadas = clasificar_lecturas(items)
+        self.assertEqual(rechazadas, [])
+        self.assertEqual([indice for indice, _ in validas], [0, 1, 2])
+        lectura = validas[1][1]
+        self.assertEqual(
+            (lectura.valor, lectura.mqtt_qos, lectura.mqtt_retained, lectura.mqtt_message_id),
+            (21.5, 1, False, 'm1'),
+        )
+        self.assertEqual(validas[2][1].metadata_json, {'rssi': -70})
+
+    def test_motivos_de_rechazo(self):
+        items = [
+            ['no', 'es', 'objeto'],
+            self.lectura(valor='abc'),
+            self.lectura(valor=float('nan')),
+            self.lectura(valor=True),
+            self.lectura(mqtt_qos=3),
+            self.lectura(mqtt_retained='quizas'),
+            self.lectura(metadata_json=[1]),
+            self.lectura(mqtt_message_id='x' * 101),
+            self.lectura(dispositivo=999999),
+            self.lectura(sensor=999999),
+            self.lectura(sensor=self.ajena.sensor_id),
+            self.lectura(valor=50.1),
+            self.lectura(valor=-10.1),
+            self.lectura(),
+        ]
+        validas, motivos = self.motivos(items)
+        self.assertEqual(validas, [13])
+        self.assertEqual(motivos, {
+            0: 'formato_invalido', 1: 'formato_invalido', 2: 'formato_invalido', 3: 'formato_invalido',
+            4: 'formato_invalido', 5: 'formato_invalido', 6: 'formato_invalido', 7: 'formato_invalido',
+            8: 'dispositivo_inexistente', 9: 'sensor_inexistente', 10: 'sensor_no_asignado',
+            11: 'fuera_de_rango', 12: 'fuera_de_rango',
+        })
+
+    def test_asignacion_inactiva(self):
+        DispositivoSensor.objects.filter(id=self.propia.id).update(activo=False)
+        self.assertEqual(self.motivos([self.lectura()]), ([], {0: 'sensor_no_asignado'}))
+
+    def test_consultas_fijas_por_lote(self):
+        # Sensores, dispositivos y asignaciones
+        for cantidad in (1, 100):
+            with self.subTest(cantidad=cantidad), self.assertNumQueries(3):
+                clasificar_lecturas([self.lectura()] * cantidad)
+
+    def test_insertar_con_timestamp(self):
+        hace_un_dia = timezone.now() - timedelta(days=1)
+        validas, _ = clasificar_lecturas([self.lectura()] * 3, recibidas=[hace_un_dia] * 3)
+        creadas = insertar_con_timestamp([lectura for _, lectura in validas])
+        self.assertEqual(len(creadas), 3)
+        self.assertEqual(
+            set(Lectura.objects.filter(id__in=[l.id for l in creadas]).values_list('timestamp', flat=True)),
+            {hace_un_dia},
+        )
+
+    def test_reproceso_conserva_la_hora_de_llegada(self):
+        recibida = timezone.now() - timedelta(hours=2)
+        _, rechazadas = clasificar_lecturas([self.lectura(valor=60), self.lectura(valor=80)])
+        guardadas = LecturaRechazada.objects.bulk_create(r for _, r in rechazadas)
+        LecturaRechazada.objects.filter(id__in=[r.id for r in guardadas]).update(timestamp=recibida)
+
+        # Se amplía el rango: la primera pasa a ser válida
+        self.propia.sensor.rango_max = 70
+        self.propia.sensor.save()
+        call_command('reprocesar_lecturas_rechazadas', stdout=StringIO())
+
+        lectura = Lectura.objects.get(sensor_id=self.propia.sensor_id)
+        self.assertEqual((lectura.valor, lectura.timestamp), (60, recibida))
+        reprocesada, pendiente = LecturaRechazada.objects.order_by('id')
+        self.assertTrue(reprocesada.reprocesada)
+        self.assertFalse(pendiente.reprocesada)
+        self.assertEqual((pendiente.motivo, pendiente.intentos), ('fuera_de_rango', 1))
+
+
+class AlertasTest(TestCase):
+    """Histéresis, cooldown, duración sostenida y tasa de cambio de las reglas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_flota(1, 1, prefijo='alertas')
+        cls.asignacion = DispositivoSensor.objects.select_related('dispositivo', 'sensor').get(
+            dispositivo__in=dispositivos_de_flota('alertas')
+        )
+        cls.inicio = timezone.now() - timedelta(days=1)
+
+    def setUp(self):
+        alertas.invalidar_indice()
+
+    def regla(self, **campos):
+        campos = {'condicion': 'mayor', 'umbral': 30, 'cooldown_segundos': 0, **campos}
+        regla = ReglaAlerta.objects.create(
+            nombre='test', sensor=self.asignacion.sensor, dispositivo=self.asignacion.dispositivo,
+            notificar_telegram=False, notificar_email=False, **campos
+        )
+        alertas.invalidar_indice()
+        return regla
+
+    def lote(self, *puntos):
+        """Ingiere (segundos desde el inicio, valor) como un lote y devuelve sus eventos"""
+        lecturas = [
+            Lectura(
+                dispositivo=self.asignacion.dispositivo, sensor=self.asignacion.sensor, valor=valor,
+                timestamp=self.inicio + timedelta(seconds=segundos),
+            )
+            for segundos, valor in puntos
+        ]
+        eventos = alertas.evaluar_lecturas(insertar_con_timestamp(lecturas))
+        return [(evento.tipo, evento.lectura.valor) for evento in eventos]
+
+    def test_histeresis(self):
+        self.regla(histeresis=2)
+        self.assertEqual(self.lote((0, 31), (60, 29), (120, 28.5)), [('disparo', 31)])
+        # 28 = umbral - histéresis: despeja; luego puede volver a disparar
+        self.assertEqual(
+            self.lote((180, 28), (240, 31)),
+            [('recuperacion', 28), ('disparo', 31)],
+        )
+
+    def test_cooldown(self):
+        self.regla(cooldown_segundos=300)
+        # Disparo y recuperación en el mismo lote: la notificación igual cuenta
+        self.lote((0, 31), (60, 29))
+        self.lote((120, 31), (180, 29))
+        self.lote((360, 31))
+        disparos = EventoAlerta.objects.filter(tipo='disparo').order_by('timestamp')
+        self.assertEqual([evento.notificado for evento in disparos], [True, False, True])
+
+    def test_duracion_entre_lotes(self):
+        self.regla(duracion_segundos=120)
+        self.assertEqual(self.lote((0, 31)), [])
+        self.assertEqual(self.lote((60, 31)), [])
+        self.assertEqual(self.lote((120, 32)), [('disparo', 32)])
+
+    def test_duracion_se_reinicia(self):
+        self.regla(duracion_segundos=120)
+        self.lote((0, 31))
+        self.lote((60, 29))
+        self.assertEqual(self.lote((120, 31)), [])
+        self.assertEqual(self.lote((180, 31)), [])
+        self.assertEqual(self.lote((240, 31)), [('disparo', 31)])
+
+    def test_condicion_menor(self):
+        self.regla(condicion='menor', umbral=0, histeresis=1)
+        self.assertEqual(self.lote((0, -1), (60, 0.5), (120, 1)), [('disparo', -1), ('recuperacion', 1)])
+
+    def test_tasa_de_cambio(self):
+        # Más de 10 unidades por minuto respecto a la lectura anterior
+        self.regla(condicion='variacion', umbral=10)
+        self.assertEqual(self.lote((0, 20)), [])
+        self.assertEqual(self.lote((60, 25)), [])
+        self.assertEqual(self.lote((120, 40)), [('disparo', 40)])
+        evento = EventoAlerta.objects.get()
+        self.assertAlmostEqual(evento.valor, 15.0)
+        # Estable: la tasa vuelve a 0 y despeja
+        self.assertEqual(self.lote((180, 40)), [('recuperacion', 40)])
+
+    def test_tasa_de_cambio_lecturas_muy_cercanas(self):
+        self.regla(condicion='variacion', umbral=10)
+        self.lote((0, 20))
+        # A menos de VARIACION_MIN_SEGUNDOS de la referencia no se evalúa
+        self.assertEqual(self.lote((0.5, 45)), [])
@@ -5,10 +5,20 @@ URL Configuration para la app Readings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import LecturaViewSet
+from .views import (
+    LecturaViewSet, LecturaRechazadaViewSet, BrechaLecturaViewSet, AnomaliaLecturaViewSet,
+    ReglaAlertaViewSet, EventoAlertaViewSet
+)
 
 # Router para los ViewSets
 router = DefaultRouter()
+# Registrar antes de 'readings' para que no se confunda con /readings/{id}/
+router.register(r'readings/rechazadas', LecturaRechazadaViewSet, basename='reading-rechazada')
+router.register(r'readings/gaps', BrechaLecturaViewSet, basename='reading-gap')
+router.register(r'readings/anomalias', AnomaliaLecturaViewSet, basename='reading-anomalia')
+# 'readings/alertas/reglas' antes de 'readings/alertas' por la misma razón
+router.register(r'readings/alertas/reglas', ReglaAlertaViewSet, basename='reading-alerta-regla')
+router.register(r'readings/alertas', EventoAlertaViewSet, basename='reading-alerta')
 router.register(r'readings', LecturaViewSet, basename='reading')
 
 urlpatterns = [
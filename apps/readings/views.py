@@ -6,38 +6,80 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Avg, Max, Min, Count
+from django.db.models import Avg, Max, Min, Count, Q
 import logging
 
-from .models import Lectura
-from .serializers import LecturaSerializer, LecturaBulkSerializer
-from apps.accounts.permissions import CanCreateReadings
+from .models import (
+    Lectura, LecturaRechazada, BrechaLectura, AnomaliaLectura, ReglaAlerta, EventoAlerta
+)
+from .serializers import (
+    LecturaSerializer, LecturaBulkSerializer, LecturaRechazadaSerializer,
+    BrechaLecturaSerializer, AnomaliaLecturaSerializer, ReglaAlertaSerializer,
+    EventoAlertaSerializer
+)
+from .ingestion import clasificar_lecturas, guardar_rechazadas, evaluar_alertas, ingerir_lecturas
+from .metadata import filtrar_metadata
+from apps.accounts import metrics
+from apps.accounts.authentication import StatelessJWTAuthentication
+from apps.accounts.permissions import (
+    CanCreateReadings, IsSuperuserOrOperator, CanManageSensors
+)
+from apps.accounts.fast_serializers import FastListMixin
+from apps.accounts.sparse_fields import SparseFieldsViewSetMixin
+from apps.devices.authentication import DispositivoAPIKeyAuthentication, dispositivo_autenticado
 
 logger = logging.getLogger(__name__)
 
 
-class LecturaViewSet(viewsets.ModelViewSet):
+class LecturaViewSet(FastListMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar Lecturas de sensores
+    
+    Listado, detalle y ultimas aceptan ?fields= y
+    ?expand=dispositivo,sensor,metadata,mqtt. Acepta tokens con claims
+    (JWT_STATELESS_CLAIMS) sin consultar el usuario, y claves de API de
+    dispositivos (Authorization: ApiKey ...) para create y bulk.
     """
     queryset = Lectura.objects.select_related(
         'dispositivo', 'sensor'
     ).all()
     serializer_class = LecturaSerializer
+    authentication_classes = [StatelessJWTAuthentication, DispositivoAPIKeyAuthentication]
     permission_classes = [IsAuthenticated, CanCreateReadings]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    sparse_actions = ('list', 'retrieve', 'ultimas')
+    fast_actions = ('list', 'ultimas')
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
+        # Solo unir y leer lo que se va a serializar (?fields= / ?expand=)
+        relaciones = [
+            relacion for relacion, campos in (
+                ('dispositivo', ('dispositivo_nombre',)),
+                ('sensor', ('sensor_nombre', 'sensor_unidad')),
+            )
+            if self.wants(*campos)
+        ]
+        queryset = queryset.select_related(None)
+        if relaciones:
+            queryset = queryset.select_related(*relaciones)
+        if not self.wants('metadata_json'):
+            queryset = queryset.defer('metadata_json')
+        
         # Si el usuario es operador, solo ver lecturas de sus dispositivos
+        # (los del token si vienen en sus claims)
         if not self.request.user.is_superuser:
             if self.request.user.rol and self.request.user.rol.nombre == 'operador':
-                queryset = queryset.filter(
-                    dispositivo__operador_asignado=self.request.user
-                )
+                dispositivos = getattr(self.request.user, 'assigned_device_ids', None)
+                if dispositivos is not None:
+                    queryset = queryset.filter(dispositivo_id__in=dispositivos)
+                else:
+                    queryset = queryset.filter(
+                        dispositivo__operador_asignado=self.request.user
+                    )
         
         # Filtrar por dispositivo
         dispositivo_id = self.request.query_params.get('dispositivo', None)
@@ -63,11 +105,46 @@ class LecturaViewSet(viewsets.ModelViewSet):
         if mqtt_only is not None:
             queryset = queryset.exclude(mqtt_message_id__isnull=True)
         
+        # Filtrar por metadata_json (meta__rssi__lt=-80, meta__firmware=1.2.0)
+        queryset = filtrar_metadata(queryset, self.request.query_params)
+        
         return queryset
     
+    def create(self, request, *args, **kwargs):
+        autenticado = dispositivo_autenticado(request)
+        if autenticado is not None:
+            return self._create_con_clave(request, autenticado)
+        
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            # Conservar la lectura rechazada para poder reprocesarla
+            _, rechazadas = clasificar_lecturas([request.data])
+            guardar_rechazadas([rechazada for _, rechazada in rechazadas])
+            metrics.READINGS_INGESTED.labels('rejected').inc()
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    
+    def _create_con_clave(self, request, autenticado):
+        """Crea una lectura de un dispositivo con clave de API (como un lote de uno)"""
+        creadas, rechazadas = ingerir_lecturas([request.data], autenticado)
+        if not creadas:
+            rechazada = rechazadas[0][1]
+            return Response(
+                {'motivo': rechazada.motivo, 'detalle': rechazada.detalle},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = self.get_serializer(creadas[0])
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
     def perform_create(self, serializer):
         logger.info(f"Creando lectura para sensor: {serializer.validated_data.get('sensor')}")
-        serializer.save()
+        lectura = serializer.save()
+        evaluar_alertas([lectura])
+        metrics.READINGS_INGESTED.labels('accepted').inc()
     
     @action(detail=False, methods=['post'])
     def bulk(self, request):
@@ -75,19 +152,38 @@ class LecturaViewSet(viewsets.ModelViewSet):
         Crear multiples lecturas a la vez
         POST /api/readings/bulk/
         Body: {"lecturas": [{...}, {...}, ...]}
+        
+        Las lecturas invalidas no bloquean el lote: se guardan en
+        /api/readings/rechazadas/ y se reportan en "errores". Con la clave
+        de API de un dispositivo, "dispositivo" es opcional en cada lectura.
         """
-        serializer = LecturaBulkSerializer(data=request.data)
+        serializer = LecturaBulkSerializer(
+            data=request.data, context={'autenticado': dispositivo_autenticado(request)}
+        )
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        if serializer.is_valid():
-            lecturas = serializer.save()
-            logger.info(f"Creadas {len(lecturas)} lecturas en bulk")
-            
-            return Response({
-                'message': f'{len(lecturas)} lecturas creadas exitosamente',
-                'count': len(lecturas)
-            }, status=status.HTTP_201_CREATED)
+        resultado = serializer.save()
+        creadas = resultado['creadas']
+        rechazadas = resultado['rechazadas']
+        logger.info(f"Creadas {len(creadas)} lecturas en bulk ({len(rechazadas)} rechazadas)")
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        response_data = {
+            'message': f'{len(creadas)} lecturas creadas exitosamente',
+            'count': len(creadas),
+            'rechazadas': len(rechazadas),
+        }
+        if rechazadas:
+            response_data['errores'] = [
+                {'indice': indice, 'motivo': rechazada.motivo, 'detalle': rechazada.detalle}
+                for indice, rechazada in rechazadas
+            ]
+        
+        # Solo es un error si no se pudo guardar ninguna lectura
+        if not creadas:
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(response_data, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
@@ -128,6 +224,267 @@ class LecturaViewSet(viewsets.ModelViewSet):
         if limit > 100:
             limit = 100
         
+        fast = self.fast_serializer()
+        if fast is not None:
+            return Response(fast.to_representation(fast.values(self.get_queryset())[:limit]))
+        
         queryset = self.get_queryset()[:limit]
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+
+class LecturaRechazadaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet para consultar lecturas rechazadas (solo lectura)
+    El reproceso se hace con: python manage.py reprocesar_lecturas_rechazadas
+    """
+    queryset = LecturaRechazada.objects.all()
+    serializer_class = LecturaRechazadaSerializer
+    permission_classes = [IsAuthenticated, IsSuperuserOrOperator]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['timestamp', 'motivo']
+    ordering = ['-timestamp']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Operadores solo ven rechazos de sus dispositivos
+        if not self.request.user.is_superuser:
+            if self.request.user.rol and self.request.user.rol.nombre == 'operador':
+                queryset = queryset.filter(
+                    dispositivo__operador_asignado=self.request.user
+                )
+        
+        # Por defecto solo pendientes de reproceso
+        incluir_reprocesadas = self.request.query_params.get('incluir_reprocesadas', None)
+        if not (incluir_reprocesadas and incluir_reprocesadas.lower() in ['true', '1', 'yes']):
+            queryset = queryset.filter(reprocesada=False)
+        
+        # Filtrar por motivo
+        motivo = self.request.query_params.get('motivo', None)
+        if motivo:
+            queryset = queryset.filter(motivo=motivo)
+        
+        # Filtrar por dispositivo
+        dispositivo_id = self.request.query_params.get('dispositivo', None)
+        if dispositivo_id:
+            queryset = queryset.filter(dispositivo_id=dispositivo_id)
+        
+        # Filtrar por sensor
+        sensor_id = self.request.query_params.get('sensor', None)
+        if sensor_id:
+            queryset = queryset.filter(sensor_id=sensor_id)
+        
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def resumen(self, request):
+        """
+        Rechazos agregados por motivo, dispositivo y sensor
+        GET /api/readings/rechazadas/resumen/
+        """
+        grupos = self.get_queryset().order_by().values(
+            'motivo', 'dispositivo', 'sensor'
+        ).annotate(
+            total=Count('id'),
+            primera=Min('timestamp'),
+            ultima=Max('timestamp')
+        ).order_by('-total')
+        
+        return Response({
+            'total': sum(grupo['total'] for grupo in grupos),
+            'grupos': list(grupos),
+        })
+
+
+class BrechaLecturaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet para consultar brechas de lecturas y sensores silenciosos
+    Las brechas se calculan con: python manage.py detectar_brechas_lecturas
+    """
+    queryset = BrechaLectura.objects.select_related('dispositivo', 'sensor').all()
+    serializer_class = BrechaLecturaSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['inicio', 'fin']
+    ordering = ['-inicio']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Operadores solo ven brechas de sus dispositivos
+        if not self.request.user.is_superuser:
+            if self.request.user.rol and self.request.user.rol.nombre == 'operador':
+                queryset = queryset.filter(
+                    dispositivo__operador_asignado=self.request.user
+                )
+        
+        # Filtrar por dispositivo
+        dispositivo_id = self.request.query_params.get('dispositivo', None)
+        if dispositivo_id:
+            queryset = queryset.filter(dispositivo_id=dispositivo_id)
+        
+        # Filtrar por sensor
+        sensor_id = self.request.query_params.get('sensor', None)
+        if sensor_id:
+            queryset = queryset.filter(sensor_id=sensor_id)
+        
+        # Solo sensores silenciosos (brechas abiertas) o solo cerradas
+        abiertas = self.request.query_params.get('abiertas', None)
+        if abiertas is not None:
+            queryset = queryset.filter(fin__isnull=abiertas.lower() in ['true', '1', 'yes'])
+        
+        # Filtrar por rango de fechas
+        fecha_inicio = self.request.query_params.get('fecha_inicio', None)
+        fecha_fin = self.request.query_params.get('fecha_fin', None)
+        if fecha_inicio:
+            queryset = queryset.filter(inicio__gte=fecha_inicio)
+        if fecha_fin:
+            queryset = queryset.filter(inicio__lte=fecha_fin)
+        
+        return queryset
+
+
+class AnomaliaLecturaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet para consultar anomalías detectadas en las lecturas
+    Las anomalías se calculan con: python manage.py detectar_anomalias
+    """
+    queryset = AnomaliaLectura.objects.select_related('dispositivo', 'sensor').all()
+    serializer_class = AnomaliaLecturaSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['timestamp', 'puntaje']
+    ordering = ['-timestamp']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Operadores solo ven anomalías de sus dispositivos
+        if not self.request.user.is_superuser:
+            if self.request.user.rol and self.request.user.rol.nombre == 'operador':
+                queryset = queryset.filter(
+                    dispositivo__operador_asignado=self.request.user
+                )
+        
+        # Filtrar por dispositivo
+        dispositivo_id = self.request.query_params.get('dispositivo', None)
+        if dispositivo_id:
+            queryset = queryset.filter(dispositivo_id=dispositivo_id)
+        
+        # Filtrar por sensor
+        sensor_id = self.request.query_params.get('sensor', None)
+        if sensor_id:
+            queryset = queryset.filter(sensor_id=sensor_id)
+        
+        # Filtrar por detector
+        detector = self.request.query_params.get('detector', None)
+        if detector:
+            queryset = queryset.filter(detector=detector)
+        
+        # Filtrar por rango de fechas
+        fecha_inicio = self.request.query_params.get('fecha_inicio', None)
+        fecha_fin = self.request.query_params.get('fecha_fin', None)
+        if fecha_inicio:
+            queryset = queryset.filter(timestamp__gte=fecha_inicio)
+        if fecha_fin:
+            queryset = queryset.filter(timestamp__lte=fecha_fin)
+        
+        return queryset
+
+
+class ReglaAlertaViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet para gestionar reglas de alerta sobre las lecturas
+    """
+    queryset = ReglaAlerta.objects.select_related('sensor', 'dispositivo', 'created_by').all()
+    serializer_class = ReglaAlertaSerializer
+    permission_classes = [IsAuthenticated, CanManageSensors]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['nombre']
+    ordering_fields = ['nombre', 'created_at']
+    ordering = ['nombre']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Operadores solo ven reglas de sus dispositivos o creadas por ellos
+        if not self.request.user.is_superuser:
+            if self.request.user.rol and self.request.user.rol.nombre == 'operador':
+                queryset = queryset.filter(
+                    Q(dispositivo__operador_asignado=self.request.user) |
+                    Q(created_by=self.request.user)
+                )
+        
+        # Filtrar por sensor
+        sensor_id = self.request.query_params.get('sensor', None)
+        if sensor_id:
+            queryset = queryset.filter(sensor_id=sensor_id)
+        
+        # Filtrar por dispositivo
+        dispositivo_id = self.request.query_params.get('dispositivo', None)
+        if dispositivo_id:
+            queryset = queryset.filter(dispositivo_id=dispositivo_id)
+        
+        # Filtrar por tipo de sensor
+        tipo_sensor = self.request.query_params.get('tipo_sensor', None)
+        if tipo_sensor:
+            queryset = queryset.filter(tipo_sensor=tipo_sensor)
+        
+        # Filtrar por estado
+        activa = self.request.query_params.get('activa', None)
+        if activa is not None:
+            queryset = queryset.filter(activa=activa.lower() == 'true')
+        
+        return queryset
+    
+    def perform_create(self, serializer):
+        logger.info(f"Creando regla de alerta: {serializer.validated_data.get('nombre')}")
+        serializer.save(created_by=self.request.user)
+    
+    def perform_update(self, serializer):
+        logger.info(f"Actualizando regla de alerta: {serializer.instance.nombre}")
+        serializer.save()
+
+
+class EventoAlertaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet para consultar el historial de disparos y recuperaciones
+    """
+    queryset = EventoAlerta.objects.select_related('regla', 'dispositivo', 'sensor').all()
+    serializer_class = EventoAlertaSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['timestamp']
+    ordering = ['-timestamp']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Operadores solo ven eventos de sus dispositivos
+        if not self.request.user.is_superuser:
+            if self.request.user.rol and self.request.user.rol.nombre == 'operador':
+                queryset = queryset.filter(
+                    dispositivo__operador_asignado=self.request.user
+                )
+        
+        # Filtrar por regla, dispositivo, sensor y tipo
+        for param, campo in (
+            ('regla', 'regla_id'),
+            ('dispositivo', 'dispositivo_id'),
+            ('sensor', 'sensor_id'),
+            ('tipo', 'tipo'),
+        ):
+            valor = self.request.query_params.get(param, None)
+            if valor:
+                queryset = queryset.filter(**{campo: valor})
+        
+        # Filtrar por rango de fechas
+        fecha_inicio = self.request.query_params.get('fecha_inicio', None)
+        fecha_fin = self.request.query_params.get('fecha_fin', None)
+        if fecha_inicio:
+            queryset = queryset.filter(timestamp__gte=fecha_inicio)
+        if fecha_fin:
+            queryset = queryset.filter(timestamp__lte=fecha_fin)
+        
+        return queryset
@@ -4,9 +4,11 @@ Serializers para la app Sensors
 
 from rest_framework import serializers
 from .models import Sensor
+from apps.accounts.metrics import TimedListSerializer, TimedSerializerMixin
+from apps.accounts.sparse_fields import SparseFieldsSerializerMixin
 
 
-class SensorSerializer(serializers.ModelSerializer):
+class SensorSerializer(TimedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer para el modelo Sensor
     """
@@ -19,6 +21,7 @@ class SensorSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Sensor
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'nombre', 'tipo', 'tipo_display', 'unidad_medida',
             'rango_min', 'rango_max', 'estado', 'estado_display',
@@ -27,6 +30,12 @@ class SensorSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_by', 'created_at', 'updated_at']
+        list_fields = [
+            'id', 'nombre', 'tipo', 'tipo_display', 'unidad_medida',
+            'rango_min', 'rango_max', 'estado', 'estado_display',
+            'mqtt_topic_suffix', 'publish_interval'
+        ]
+        expandable_fields = {'created_by': ['created_by', 'created_by_username']}
     
     def validate(self, attrs):
         rango_min = attrs.get('rango_min')
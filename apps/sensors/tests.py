@@ -0,0 +1,33 @@
+"""
+Tests de la app Sensors
+"""
+
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import CustomUser
+from apps.accounts.testing import ConsultasConstantesMixin
+from .models import Sensor
+
+
+class SensorListConsultasTest(ConsultasConstantesMixin, APITestCase):
+    """El listado de sensores usa las mismas consultas con cualquier tamaño de página"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_superuser(
+            username='admin-consultas', email='admin-consultas@example.com', password='x'
+        )
+        Sensor.objects.bulk_create(
+            Sensor(
+                nombre=f'sensor {i}', tipo='temperatura', unidad_medida='°C',
+                rango_min=-10, rango_max=50, created_by=cls.usuario,
+            )
+            for i in range(100)
+        )
+
+    def test_listado(self):
+        # Validador de la ETag, COUNT del paginador y página con su creador
+        self.assertConsultasConstantes('sensor-list', 3)
+
+    def test_listado_con_creador(self):
+        self.assertConsultasConstantes('sensor-list', 3, '&expand=created_by')
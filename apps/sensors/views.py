@@ -10,14 +10,20 @@ import logging
 
 from .models import Sensor
 from .serializers import SensorSerializer
+from apps.accounts.conditional import ConditionalListMixin, static_response
 from apps.accounts.permissions import CanManageSensors
+from apps.accounts.response_cache import cache_response
+from apps.accounts.sparse_fields import SparseFieldsViewSetMixin
 
 logger = logging.getLogger(__name__)
 
 
-class SensorViewSet(viewsets.ModelViewSet):
+class SensorViewSet(ConditionalListMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar Sensores
+    
+    Listado y detalle aceptan ?fields= y ?expand=created_by; el listado y
+    los tipos responden 304 con If-None-Match
     """
     queryset = Sensor.objects.select_related('created_by').all()
     serializer_class = SensorSerializer
@@ -26,10 +32,16 @@ class SensorViewSet(viewsets.ModelViewSet):
     search_fields = ['nombre', 'tipo', 'descripcion']
     ordering_fields = ['nombre', 'tipo', 'created_at']
     ordering = ['-created_at']
+    # created_by_username: renombrar al creador también cambia la ETag
+    related_validator_fields = ('created_by__updated_at',)
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
+        # Solo unir created_by si se va a serializar (?fields= / ?expand=)
+        if not self.wants('created_by_username'):
+            queryset = queryset.select_related(None)
+        
         # Filtrar por tipo de sensor
         tipo = self.request.query_params.get('tipo', None)
         if tipo:
@@ -56,6 +68,7 @@ class SensorViewSet(viewsets.ModelViewSet):
         serializer.save()
     
     @action(detail=False, methods=['get'])
+    @cache_response('sensors')
     def available(self, request):
         """
         Obtener sensores disponibles para asignar (activos)
@@ -66,15 +79,17 @@ class SensorViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('sensors')
     def tipos(self, request):
         """
         Obtener lista de tipos de sensores disponibles
         GET /api/sensors/tipos/
         """
         tipos = [{'value': t[0], 'label': t[1]} for t in Sensor.TIPO_SENSOR_CHOICES]
-        return Response(tipos)
+        return static_response(request, Response(tipos))
     
     @action(detail=False, methods=['get'])
+    @cache_response('sensors')
     def mqtt_enabled(self, request):
         """
         Obtener sensores con MQTT configurado
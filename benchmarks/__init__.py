@@ -0,0 +1,6 @@
+"""
+Benchmarks de rendimiento del backend
+
+Scripts independientes; se ejecutan desde la raíz del proyecto, p. ej.:
+    python -m benchmarks.bench_anomalias
+"""
@@ -0,0 +1,92 @@
+"""
+Benchmark del costo de AccessLogMiddleware por petición
+
+Mide process_request + process_response sobre una respuesta ya generada,
+con el escritor síncrono (un INSERT por petición, comportamiento anterior)
+y con la cola + hilo de apps.accounts.access_log_writer. Reporta p50/p99
+del overhead en el hilo de la petición. Requiere la base de datos
+configurada; los registros creados se borran al terminar.
+
+Uso:
+    python -m benchmarks.bench_access_log --peticiones 5000
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def _medir(peticiones, asincrono):
+    from django.contrib.auth.models import AnonymousUser
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from apps.accounts.access_log_writer import AccessLogWriter
+    from apps.accounts import middleware
+
+    writer = AccessLogWriter()
+    writer.enabled = asincrono
+    middleware.access_log_writer, original = writer, middleware.access_log_writer
+
+    factory = RequestFactory()
+    mw = middleware.AccessLogMiddleware(lambda request: HttpResponse())
+    tiempos = []
+    try:
+        for i in range(peticiones):
+            request = factory.get('/api/readings/', {'page': i % 10}, HTTP_USER_AGENT='bench')
+            request.user = AnonymousUser()
+            response = HttpResponse('ok')
+            inicio = time.perf_counter()
+            mw.process_request(request)
+            mw.process_response(request, response)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        writer.shutdown()
+        drenado = (time.perf_counter() - inicio) * 1000
+    finally:
+        middleware.access_log_writer = original
+
+    return tiempos, drenado, writer.stats()
+
+
+def ejecutar(peticiones):
+    from apps.accounts.models import AccessLog
+
+    ultimo_id = AccessLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    try:
+        for nombre, asincrono in (('sincrono', False), ('cola + hilo', True)):
+            tiempos, drenado, stats = _medir(peticiones, asincrono)
+            print(f'== {nombre}')
+            print(f'   p50: {statistics.median(tiempos):.3f} ms   '
+                  f'p99: {_percentil(tiempos, 99):.3f} ms   '
+                  f'max: {max(tiempos):.3f} ms')
+            print(f'   escritos: {stats["written"]}  descartados: {stats["dropped"]}  '
+                  f'fallidos: {stats["failed"]}  drenado final: {drenado:.1f} ms')
+    finally:
+        AccessLog.objects.filter(id__gt=ultimo_id, user_agent='bench').delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peticiones', type=int, default=5000)
+    args = parser.parse_args()
+
+    _configurar_django()
+    ejecutar(args.peticiones)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark de los detectores de anomalías (apps.readings.anomalias)
+
+Mide el throughput en lecturas por segundo en un solo core: los detectores
+son NumPy puro y se ejecutan en el proceso que llama, así que el resultado
+escala linealmente con los procesos que corran detectar_anomalias en
+paralelo sobre series distintas.
+
+Uso:
+    python -m benchmarks.bench_anomalias --series 500 --lecturas 200
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _limitar_a_un_core():
+    """Fija el proceso a un core para que el resultado sea por core"""
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+
+def ejecutar(series, lecturas, ventana, repeticiones):
+    from apps.readings.anomalias import analizar_serie, configuracion
+
+    config = configuracion()
+    config['ventana'] = ventana
+
+    rng = np.random.default_rng(42)
+    datos = []
+    for _ in range(series):
+        # Serie con deriva lenta, ruido y algunos picos inyectados
+        base = 20 + np.cumsum(rng.normal(0, 0.05, ventana + lecturas))
+        valores = base + rng.normal(0, 0.5, ventana + lecturas)
+        picos = rng.choice(lecturas, size=max(1, lecturas // 100), replace=False) + ventana
+        valores[picos] += rng.choice([-8, 8], size=len(picos))
+        datos.append((valores[:ventana].tolist(), valores[ventana:].tolist()))
+
+    tiempos = []
+    marcados = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        marcados = 0
+        for historial, nuevos in datos:
+            marcados += len(analizar_serie(historial, nuevos, config))
+        tiempos.append(time.perf_counter() - inicio)
+
+    total = series * lecturas
+    mejor = min(tiempos)
+    print(f'Series: {series}  lecturas/serie: {lecturas}  ventana: {ventana}')
+    print(f'Lecturas evaluadas por pasada: {total}  marcadas: {marcados}')
+    print(f'Mejor tiempo: {mejor * 1000:.1f} ms  mediana: {np.median(tiempos) * 1000:.1f} ms')
+    print(f'Throughput: {total / mejor:,.0f} lecturas/s por core')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, default=500, help='Series (dispositivo, sensor) por lote')
+    parser.add_argument('--lecturas', type=int, default=200, help='Lecturas nuevas por serie')
+    parser.add_argument('--ventana', type=int, default=30, help='Tamaño de ventana de los detectores')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    _configurar_django()
+    _limitar_a_un_core()
+    ejecutar(args.series, args.lecturas, args.ventana, args.repeticiones)
+
+
+if __name__ == '__main__':
+    main()
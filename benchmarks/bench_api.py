@@ -0,0 +1,223 @@
+"""
+Benchmark de los endpoints más usados de la API
+
+Crea una flota sintética (apps.devices.flota) de N dispositivos con M
+sensores y K lecturas por sensor, y pide cada endpoint en proceso con
+APIClient, pasando por todo el stack de middlewares. Reporta peticiones por
+segundo y p50/p95/p99 por escenario, más el overhead de AccessLogMiddleware
+(ver bench_access_log). El resultado es un dict/JSON comparable con un
+baseline guardado (ver comparar y el comando `manage.py bench`). La flota y
+los registros de acceso generados se borran al terminar.
+
+Uso:
+    python -m benchmarks.bench_api --dispositivos 200 --sensores 4 --lecturas 100 --salida bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+PREFIJO = 'bench'
+USER_AGENT = 'bench-api'
+LOTE_BULK = 100
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def _resumen(tiempos, total_s, **extra):
+    return {
+        'peticiones': len(tiempos),
+        'rps': round(len(tiempos) / total_s, 1) if total_s else None,
+        'p50_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(_percentil(tiempos, 95), 3),
+        'p99_ms': round(_percentil(tiempos, 99), 3),
+        'max_ms': round(max(tiempos), 3),
+        **extra,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _escenarios(dispositivo_ids, asignaciones, rng):
+    """[(nombre, método, función que devuelve (url, datos))]"""
+    def lote_bulk():
+        lecturas = [
+            {'dispositivo': d, 'sensor': s, 'valor': round(rng.uniform(minimo, maximo), 2)}
+            for d, s, minimo, maximo in rng.sample(asignaciones, min(LOTE_BULK, len(asignaciones)))
+        ]
+        return '/api/readings/bulk/', {'lecturas': lecturas}
+
+    return [
+        ('readings_list', 'get', lambda: ('/api/readings/?page_size=50', None)),
+        ('readings_bulk', 'post', lote_bulk),
+        ('readings_estadisticas', 'get', lambda: ('/api/readings/estadisticas/', None)),
+        ('readings_ultimas', 'get', lambda: ('/api/readings/ultimas/?limit=100', None)),
+        ('devices_list', 'get', lambda: ('/api/devices/?page_size=50', None)),
+        ('devices_detail', 'get', lambda: (f'/api/devices/{rng.choice(dispositivo_ids)}/', None)),
+        ('dashboard_stats', 'get', lambda: ('/api/dashboard/stats/', None)),
+        ('device_mqtt_status', 'get', lambda: ('/api/mqtt/device-status/', None)),
+    ]
+
+
+def _medir_escenario(client, host, metodo, peticion, repeticiones, calentamiento):
+    tiempos, estados = [], set()
+    for i in range(calentamiento + repeticiones):
+        url, datos = peticion()
+        inicio = time.perf_counter()
+        if metodo == 'post':
+            response = client.post(url, datos, format='json', HTTP_HOST=host, HTTP_USER_AGENT=USER_AGENT)
+        else:
+            response = client.get(url, HTTP_HOST=host, HTTP_USER_AGENT=USER_AGENT)
+        transcurrido = (time.perf_counter() - inicio) * 1000
+        estados.add(response.status_code)
+        if i >= calentamiento:
+            tiempos.append(transcurrido)
+    return tiempos, sorted(estados)
+
+
+def ejecutar(dispositivos, sensores, lecturas, repeticiones, calentamiento=5,
+             peticiones_middleware=2000, conservar=False, semilla=42):
+    """
+    Ejecuta todos los escenarios
+
+    Returns:
+        dict: {'meta': {...}, 'escenarios': {nombre: resumen}}
+    """
+    from django.conf import settings
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    from apps.accounts.access_log_writer import access_log_writer
+    from apps.accounts.models import AccessLog, CustomUser
+    from apps.devices.flota import crear_flota, dispositivos_de_flota, eliminar_flota
+    from apps.devices.models import DispositivoSensor
+    from apps.readings.models import Lectura
+    from benchmarks.bench_access_log import _medir
+
+    usuario = CustomUser.objects.filter(is_superuser=True).order_by('id').first()
+    if usuario is None:
+        raise RuntimeError('Se necesita un superusuario para el benchmark')
+
+    ultimo_log = AccessLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    eliminar_flota(PREFIJO)
+
+    inicio = time.perf_counter()
+    creados = crear_flota(dispositivos, sensores, lecturas, prefijo=PREFIJO, semilla=semilla)
+    siembra_s = time.perf_counter() - inicio
+    print(f"Flota: {creados['dispositivos']} dispositivos, {creados['sensores']} sensores, "
+          f"{creados['lecturas']} lecturas ({siembra_s:.1f} s)\n")
+
+    resultados = {
+        'meta': {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'postgres': connection.cursor().connection.info.server_version,
+            'dispositivos': dispositivos,
+            'sensores_por_dispositivo': sensores,
+            'lecturas_por_sensor': lecturas,
+            'lecturas_totales': Lectura.objects.count(),
+            'repeticiones': repeticiones,
+            'siembra_s': round(siembra_s, 2),
+        },
+        'escenarios': {},
+    }
+
+    try:
+        rng = random.Random(semilla)
+        dispositivo_ids = list(dispositivos_de_flota(PREFIJO).values_list('id', flat=True))
+        asignaciones = list(
+            DispositivoSensor.objects.filter(dispositivo_id__in=dispositivo_ids)
+            .values_list('dispositivo_id', 'sensor_id', 'sensor__rango_min', 'sensor__rango_max')
+        )
+
+        client = APIClient()
+        client.force_authenticate(usuario)
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+
+        print(f"{'Escenario':<24} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  HTTP")
+        for nombre, metodo, peticion in _escenarios(dispositivo_ids, asignaciones, rng):
+            inicio = time.perf_counter()
+            tiempos, estados = _medir_escenario(client, host, metodo, peticion, repeticiones, calentamiento)
+            # El calentamiento entra en el tiempo total; se descuenta proporcionalmente
+            total_s = (time.perf_counter() - inicio) * repeticiones / (repeticiones + calentamiento)
+            resumen = _resumen(tiempos, total_s, http=estados)
+            if nombre == 'readings_bulk':
+                resumen['lecturas_por_s'] = round(resumen['rps'] * min(LOTE_BULK, len(asignaciones)), 1)
+            resultados['escenarios'][nombre] = resumen
+            print(f"{nombre:<24} {resumen['rps']:>8} {resumen['p50_ms']:>9} {resumen['p95_ms']:>9} "
+                  f"{resumen['p99_ms']:>9}  {','.join(map(str, estados))}")
+
+        tiempos, _, _ = _medir(peticiones_middleware, True)
+        resumen = _resumen(tiempos, sum(tiempos) / 1000)
+        resultados['escenarios']['access_log_middleware'] = resumen
+        print(f"{'access_log_middleware':<24} {resumen['rps']:>8} {resumen['p50_ms']:>9} "
+              f"{resumen['p95_ms']:>9} {resumen['p99_ms']:>9}")
+    finally:
+        access_log_writer.flush()
+        if not conservar:
+            eliminar_flota(PREFIJO)
+        AccessLog.objects.filter(id__gt=ultimo_log, user_agent__in=[USER_AGENT, 'bench']).delete()
+
+    return resultados
+
+
+def comparar(resultados, baseline, tolerancia):
+    """
+    Escenarios cuyo p50 empeoró más de `tolerancia` (%) respecto al baseline
+
+    Returns:
+        list: [(escenario, p50 baseline, p50 actual, % de cambio)]
+    """
+    regresiones = []
+    for nombre, actual in resultados['escenarios'].items():
+        anterior = baseline.get('escenarios', {}).get(nombre)
+        if not anterior or not anterior.get('p50_ms'):
+            continue
+        cambio = (actual['p50_ms'] - anterior['p50_ms']) / anterior['p50_ms'] * 100
+        if cambio > tolerancia:
+            regresiones.append((nombre, anterior['p50_ms'], actual['p50_ms'], round(cambio, 1)))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dispositivos', type=int, default=200)
+    parser.add_argument('--sensores', type=int, default=4)
+    parser.add_argument('--lecturas', type=int, default=100)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el resultado')
+    parser.add_argument('--conservar', action='store_true', help='No borrar la flota al terminar')
+    args = parser.parse_args()
+
+    _configurar_django()
+    resultados = ejecutar(args.dispositivos, args.sensores, args.lecturas, args.repeticiones,
+                          conservar=args.conservar)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as salida:
+            json.dump(resultados, salida, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
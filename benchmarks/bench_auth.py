@@ -0,0 +1,163 @@
+"""
+Benchmark de autenticación JWT: consultas y tiempo por petición
+
+Crea un operador con una flota sintética asignada (apps.devices.flota),
+obtiene un token de POST /api/auth/login/ con JWT_STATELESS_CLAIMS (claims
+de rol, permisos y dispositivos) y otro sin claims, y mide:
+- authenticate() de JWTAuthentication (simplejwt), CachedJWTAuthentication
+  (caché caliente), StatelessJWTAuthentication con claims y
+  DispositivoAPIKeyAuthentication con la clave de API de un dispositivo:
+  consultas SQL y microsegundos por llamada
+- GET /api/readings/ y POST /api/readings/bulk/ con cada token (y el bulk
+  con la clave de API): consultas totales y consultas a
+  usuarios/roles/permisos por petición
+
+El operador, la flota (con la clave de API) y sus registros de acceso se
+borran al terminar.
+
+Uso:
+    python -m benchmarks.bench_auth --peticiones 500
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+PREFIJO = 'bench-auth'
+USER_AGENT = 'bench-auth'
+PASSWORD = 'bench-auth-Pass-123'
+
+# Tablas que lee la autenticación
+TABLAS_AUTH = ('"users"', '"roles"', '"permisos"')
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _contar_consultas(funcion):
+    """(resultado, consultas totales, consultas a tablas de autenticación)"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as consultas:
+        resultado = funcion()
+    sql = [consulta['sql'] for consulta in consultas.captured_queries]
+    return resultado, len(sql), sum(1 for s in sql if any(tabla in s for tabla in TABLAS_AUTH))
+
+
+def _medir_autenticacion(clase, token, peticiones, esquema='Bearer'):
+    from django.test import RequestFactory
+
+    autenticador = clase()
+    request = RequestFactory().get('/api/readings/', HTTP_AUTHORIZATION=f'{esquema} {token}')
+    autenticador.authenticate(request)  # calienta la caché del usuario
+
+    _, consultas, _ = _contar_consultas(lambda: autenticador.authenticate(request))
+    tiempos = []
+    for _ in range(peticiones):
+        inicio = time.perf_counter()
+        autenticador.authenticate(request)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return {'consultas': consultas, 'p50_us': round(statistics.median(tiempos), 1)}
+
+
+def ejecutar(peticiones, dispositivos=20):
+    """
+    Returns:
+        dict: {'authenticate': {clase: {...}}, 'endpoints': {escenario: {...}}}
+    """
+    from django.conf import settings
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from apps.accounts.access_log_writer import access_log_writer
+    from apps.accounts.authentication import CLAIM, CachedJWTAuthentication, StatelessJWTAuthentication
+    from apps.accounts.models import AccessLog, CustomUser, Rol
+    from apps.devices.authentication import KEYWORD, DispositivoAPIKeyAuthentication
+    from apps.devices.flota import crear_flota, eliminar_flota
+    from apps.devices.models import DispositivoAPIKey, DispositivoSensor
+
+    eliminar_flota(PREFIJO)
+    CustomUser.objects.filter(username=PREFIJO).delete()
+    operador = CustomUser.objects.create_user(
+        username=PREFIJO, email=f'{PREFIJO}@example.com', password=PASSWORD,
+        rol=Rol.objects.get(nombre='operador'),
+    )
+    crear_flota(dispositivos, 2, 5, prefijo=PREFIJO, operador=operador)
+
+    host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+    client = APIClient()
+    resultados = {'authenticate': {}, 'endpoints': {}}
+    habilitado = settings.JWT_STATELESS_CLAIMS
+    try:
+        settings.JWT_STATELESS_CLAIMS = True
+        respuesta = client.post('/api/auth/login/', {'username': PREFIJO, 'password': PASSWORD},
+                                format='json', HTTP_HOST=host, HTTP_USER_AGENT=USER_AGENT)
+        con_claims = respuesta.data['access']
+        if CLAIM not in AccessToken(con_claims):
+            raise RuntimeError('El token de login no trae claims')
+        sin_claims = str(AccessToken.for_user(operador))
+        asignacion = DispositivoSensor.objects.filter(dispositivo__operador_asignado=operador).first()
+        _, clave = DispositivoAPIKey.generar(asignacion.dispositivo, nombre=PREFIJO)
+
+        print(f"{'authenticate()':<40} {'consultas':>9} {'p50 µs':>9}")
+        for nombre, clase, token, esquema in (
+            ('JWTAuthentication', JWTAuthentication, sin_claims, 'Bearer'),
+            ('CachedJWTAuthentication', CachedJWTAuthentication, sin_claims, 'Bearer'),
+            ('StatelessJWTAuthentication', StatelessJWTAuthentication, con_claims, 'Bearer'),
+            ('DispositivoAPIKeyAuthentication', DispositivoAPIKeyAuthentication, clave, KEYWORD),
+        ):
+            r = resultados['authenticate'][nombre] = _medir_autenticacion(clase, token, peticiones, esquema)
+            print(f"{nombre:<40} {r['consultas']:>9} {r['p50_us']:>9}")
+
+        lote = {'lecturas': [{'dispositivo': asignacion.dispositivo_id, 'sensor': asignacion.sensor_id, 'valor': 1}]}
+        print(f"\n{'Endpoint':<40} {'consultas':>9} {'auth':>6}  HTTP")
+        for nombre, credencial in (
+            ('sin claims', f'Bearer {sin_claims}'),
+            ('con claims', f'Bearer {con_claims}'),
+            ('clave de API', f'{KEYWORD} {clave}'),
+        ):
+            client.credentials(HTTP_AUTHORIZATION=credencial)
+            for endpoint, peticion in (
+                ('GET /api/readings/', lambda: client.get(
+                    '/api/readings/?page_size=10', HTTP_HOST=host, HTTP_USER_AGENT=USER_AGENT)),
+                ('POST /api/readings/bulk/', lambda: client.post(
+                    '/api/readings/bulk/', lote, format='json', HTTP_HOST=host, HTTP_USER_AGENT=USER_AGENT)),
+            ):
+                if nombre == 'clave de API' and endpoint.startswith('GET'):
+                    continue  # la clave solo sirve para crear lecturas
+                peticion()
+                respuesta, consultas, auth = _contar_consultas(peticion)
+                escenario = f'{endpoint} ({nombre})'
+                resultados['endpoints'][escenario] = {
+                    'consultas': consultas, 'consultas_auth': auth, 'http': respuesta.status_code,
+                }
+                print(f"{escenario:<40} {consultas:>9} {auth:>6}  {respuesta.status_code}")
+    finally:
+        settings.JWT_STATELESS_CLAIMS = habilitado
+        # Espera al hilo del escritor: sus registros referencian al operador
+        access_log_writer.shutdown()
+        AccessLog.objects.filter(user_agent=USER_AGENT).delete()
+        eliminar_flota(PREFIJO)
+        operador.delete()
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peticiones', type=int, default=500)
+    parser.add_argument('--dispositivos', type=int, default=20, help='Dispositivos asignados al operador')
+    args = parser.parse_args()
+
+    _configurar_django()
+    ejecutar(args.peticiones, args.dispositivos)
+
+
+if __name__ == '__main__':
+    main()
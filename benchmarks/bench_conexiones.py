@@ -0,0 +1,174 @@
+"""
+Benchmark de conexiones a PostgreSQL: una por petición vs persistentes
+
+Levanta la aplicación WSGI en un servidor HTTP de un solo hilo (como un
+worker síncrono de gunicorn) y hace peticiones reales por HTTP con
+DB_CONN_MAX_AGE=0 (una conexión por petición), con conexiones persistentes
+y con persistentes + DB_CONN_HEALTH_CHECKS. Para cada modo reporta
+peticiones por segundo, latencia p50/p95 y conexiones abiertas a la base:
+- GET /api/readings/?page_size=10 con el JWT de un operador
+- POST /api/readings/bulk/ con la clave de API de un dispositivo
+
+La ganancia crece con la latencia de red y TLS hasta PostgreSQL: corra el
+benchmark contra la base real (DB_HOST) y no contra una local. El operador,
+la flota y sus registros de acceso se borran al terminar.
+
+Uso:
+    python -m benchmarks.bench_conexiones --peticiones 300
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import urllib.request
+
+PREFIJO = 'bench-conn'
+USER_AGENT = 'bench-conexiones'
+
+# (nombre, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+MODOS = (
+    ('por petición', 0, False),
+    ('persistente', 60, False),
+    ('persistente + health checks', 60, True),
+)
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _servidor():
+    """Servidor WSGI de un solo hilo en un puerto libre; retorna (servidor, hilo, url base)"""
+    from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+    from django.core.wsgi import get_wsgi_application
+
+    class _Silencioso(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    servidor = make_server('127.0.0.1', 0, get_wsgi_application(), handler_class=_Silencioso)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    return servidor, hilo, f'http://127.0.0.1:{servidor.server_port}'
+
+
+def _peticion(url, host, autorizacion, cuerpo=None):
+    headers = {'Host': host, 'Authorization': autorizacion, 'User-Agent': USER_AGENT}
+    if cuerpo is not None:
+        headers['Content-Type'] = 'application/json'
+        cuerpo = json.dumps(cuerpo).encode()
+    with urllib.request.urlopen(urllib.request.Request(url, data=cuerpo, headers=headers)) as respuesta:
+        respuesta.read()
+        return respuesta.status
+
+
+def _medir(peticion, peticiones):
+    tiempos = []
+    inicio_total = time.perf_counter()
+    for _ in range(peticiones):
+        inicio = time.perf_counter()
+        peticion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    total = time.perf_counter() - inicio_total
+    tiempos.sort()
+    return {
+        'req_s': round(peticiones / total, 1),
+        'p50_ms': round(statistics.median(tiempos), 2),
+        'p95_ms': round(tiempos[int(len(tiempos) * 0.95) - 1], 2),
+    }
+
+
+def ejecutar(peticiones):
+    """
+    Returns:
+        dict: {modo: {escenario: {'req_s', 'p50_ms', 'p95_ms', 'conexiones'}}}
+    """
+    from django.conf import settings
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from apps.accounts.access_log_writer import access_log_writer
+    from apps.accounts.models import AccessLog, CustomUser, Rol
+    from apps.devices.authentication import KEYWORD
+    from apps.devices.flota import crear_flota, eliminar_flota
+    from apps.devices.models import DispositivoAPIKey, DispositivoSensor
+
+    eliminar_flota(PREFIJO)
+    CustomUser.objects.filter(username=PREFIJO).delete()
+    operador = CustomUser.objects.create_user(
+        username=PREFIJO, email=f'{PREFIJO}@example.com', password=None,
+        rol=Rol.objects.get(nombre='operador'),
+    )
+    crear_flota(5, 2, 20, prefijo=PREFIJO, operador=operador)
+    asignacion = DispositivoSensor.objects.filter(dispositivo__operador_asignado=operador).first()
+    _, clave = DispositivoAPIKey.generar(asignacion.dispositivo, nombre=PREFIJO)
+    token = str(AccessToken.for_user(operador))
+    lote = {'lecturas': [{'sensor': asignacion.sensor_id, 'valor': 1}]}
+
+    host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+    servidor, hilo, base = _servidor()
+    escenarios = (
+        ('GET /api/readings/', lambda: _peticion(
+            f'{base}/api/readings/?page_size=10', host, f'Bearer {token}')),
+        ('POST /api/readings/bulk/', lambda: _peticion(
+            f'{base}/api/readings/bulk/', host, f'{KEYWORD} {clave}', lote)),
+    )
+
+    # Solo las conexiones del servidor (no las del escritor de AccessLog)
+    abiertas = []
+
+    def contar(sender, connection, **kwargs):
+        if threading.current_thread() is hilo:
+            abiertas.append(connection.alias)
+
+    connection_created.connect(contar)
+
+    # El servidor crea su conexión con este mismo diccionario de configuración
+    configuracion = connections.settings['default']
+    original = (configuracion['CONN_MAX_AGE'], configuracion['CONN_HEALTH_CHECKS'])
+    resultados = {}
+    try:
+        print(f"{'Modo':<30} {'Escenario':<26} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'conexiones':>11}")
+        for modo, max_age, health_checks in MODOS:
+            configuracion['CONN_MAX_AGE'] = max_age
+            configuracion['CONN_HEALTH_CHECKS'] = health_checks
+            resultados[modo] = {}
+            for escenario, peticion in escenarios:
+                peticion()  # calienta cachés y la conexión del modo
+                abiertas.clear()
+                r = resultados[modo][escenario] = _medir(peticion, peticiones)
+                r['conexiones'] = len(abiertas)
+                print(f"{modo:<30} {escenario:<26} {r['req_s']:>8} {r['p50_ms']:>8} "
+                      f"{r['p95_ms']:>8} {r['conexiones']:>11}")
+    finally:
+        configuracion['CONN_MAX_AGE'], configuracion['CONN_HEALTH_CHECKS'] = original
+        connection_created.disconnect(contar)
+        servidor.shutdown()
+        servidor.server_close()
+        # Espera al hilo del escritor: sus registros referencian al operador
+        access_log_writer.shutdown()
+        AccessLog.objects.filter(user_agent=USER_AGENT).delete()
+        eliminar_flota(PREFIJO)
+        operador.delete()
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peticiones', type=int, default=300, help='Peticiones por modo y escenario')
+    args = parser.parse_args()
+
+    _configurar_django()
+    ejecutar(args.peticiones)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark de codificación y decodificación JSON de la API
+
+Compara JSONRenderer/JSONParser de DRF (json de la biblioteca estándar) con
+OrjsonRenderer/OrjsonParser (apps.accounts) sobre payloads sintéticos con
+la forma de la API: una página de N lecturas expandidas (como
+GET /api/readings/?expand=...) y un lote de N lecturas para
+POST /api/readings/bulk/. Verifica que ambos produzcan el mismo JSON y los
+mismos datos. No usa la base de datos.
+
+Uso:
+    python -m benchmarks.bench_json --lecturas 10000
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import time
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _payloads(lecturas, semilla=42):
+    """(página de lecturas como la devuelve la API, lote para /bulk/)"""
+    rng = random.Random(semilla)
+    pagina = []
+    lote = []
+    for i in range(lecturas):
+        dispositivo, sensor = rng.randint(1, 500), rng.randint(1, 2000)
+        valor = round(rng.uniform(-20, 80), 2)
+        pagina.append({
+            'id': i + 1,
+            'dispositivo': dispositivo,
+            'dispositivo_nombre': f'Estación {dispositivo}',
+            'sensor': sensor,
+            'sensor_nombre': f'Temperatura {sensor}',
+            'sensor_unidad': '°C',
+            'valor': valor,
+            'timestamp': f'2024-05-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:{(i * 7) % 60:02d}',
+            'metadata_json': {'rssi': rng.randint(-120, -40), 'bateria': round(rng.uniform(3.0, 4.2), 2)},
+            'mqtt_message_id': f'msg-{i}',
+            'mqtt_qos': 1,
+            'mqtt_retained': False,
+        })
+        lote.append({'dispositivo': dispositivo, 'sensor': sensor, 'valor': valor})
+    return (
+        {'count': lecturas, 'next': None, 'previous': None, 'results': pagina},
+        {'lecturas': lote},
+    )
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, resultado
+
+
+def ejecutar(lecturas, repeticiones):
+    """
+    Returns:
+        dict: {operación: {'stdlib_ms', 'orjson_ms', 'aceleracion', 'bytes', 'identico'}}
+    """
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from apps.accounts.parsers import OrjsonParser
+    from apps.accounts.renderers import OrjsonRenderer
+
+    pagina, lote = _payloads(lecturas)
+    cuerpo_lote = JSONRenderer().render(lote)
+    resultados = {}
+
+    casos = [
+        ('render_pagina', JSONRenderer().render, OrjsonRenderer().render, pagina),
+        ('render_lote', JSONRenderer().render, OrjsonRenderer().render, lote),
+        ('parse_lote', lambda cuerpo: JSONParser().parse(io.BytesIO(cuerpo)),
+         lambda cuerpo: OrjsonParser().parse(io.BytesIO(cuerpo)), cuerpo_lote),
+    ]
+
+    print(f"{'Operación':<16} {'bytes':>10} {'stdlib ms':>10} {'orjson ms':>10} {'x':>6}  resultado")
+    for nombre, estandar, rapido, entrada in casos:
+        estandar_ms, esperado = _medir(lambda: estandar(entrada), repeticiones)
+        rapido_ms, obtenido = _medir(lambda: rapido(entrada), repeticiones)
+        tamano = len(entrada) if isinstance(entrada, bytes) else len(esperado)
+        resultados[nombre] = {
+            'stdlib_ms': round(estandar_ms, 2),
+            'orjson_ms': round(rapido_ms, 2),
+            'aceleracion': round(estandar_ms / rapido_ms, 1),
+            'bytes': tamano,
+            'identico': esperado == obtenido,
+        }
+        r = resultados[nombre]
+        print(f"{nombre:<16} {tamano:>10} {r['stdlib_ms']:>10} {r['orjson_ms']:>10} {r['aceleracion']:>6}  "
+              f"{'idéntico' if r['identico'] else 'DISTINTO'}")
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lecturas', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    _configurar_django()
+    resultados = ejecutar(args.lecturas, args.repeticiones)
+    if not all(r['identico'] for r in resultados.values()):
+        raise SystemExit('orjson produce un resultado distinto al de la biblioteca estándar')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark de estrategias de indexación para filtros sobre metadata_json
+
+Crea una tabla temporal con la forma de `lecturas` (UNLOGGED, se borra al
+final) y compara, para las consultas que genera apps.readings.metadata:
+- Sin índice (seq scan)
+- GIN jsonb_path_ops sobre metadata_json (igualdad por contención @>)
+- B-tree de expresión sobre el valor numérico de la clave (rangos)
+- Columna generada STORED + B-tree (rangos)
+
+Reporta tiempo de construcción, tamaño de cada índice/columna, costo de
+inserción y latencia de cada consulta. Requiere PostgreSQL.
+
+Uso:
+    python -m benchmarks.bench_metadata --filas 50000000
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+TABLA = 'bench_lecturas_metadata'
+
+# Expresión idéntica a apps.readings.metadata.metadata_numerico('rssi')
+EXPRESION_RSSI = (
+    "(CASE WHEN jsonb_typeof(metadata_json -> 'rssi') = 'number' "
+    "THEN (metadata_json ->> 'rssi')::double precision END)"
+)
+
+CONSULTAS = {
+    'igualdad': f"SELECT count(*) FROM {TABLA} WHERE metadata_json @> '{{\"version_firmware\": \"2.0.0-beta\"}}'",
+    'rango_expresion': f"SELECT count(*) FROM {TABLA} WHERE {EXPRESION_RSSI} < -118",
+    'rango_generada': f"SELECT count(*) FROM {TABLA} WHERE meta_rssi < -118",
+    'pagina_rango': (
+        f"SELECT id FROM {TABLA} WHERE {EXPRESION_RSSI} < -118 "
+        f"ORDER BY timestamp DESC LIMIT 50"
+    ),
+}
+
+ESTRATEGIAS = [
+    ('sin_indice', []),
+    ('gin_jsonb_path_ops', [
+        f"CREATE INDEX bench_meta_gin ON {TABLA} USING gin (metadata_json jsonb_path_ops)",
+    ]),
+    ('btree_expresion', [
+        f"CREATE INDEX bench_meta_rssi_expr ON {TABLA} ({EXPRESION_RSSI})",
+    ]),
+    ('columna_generada', [
+        f"ALTER TABLE {TABLA} ADD COLUMN meta_rssi double precision "
+        f"GENERATED ALWAYS AS {EXPRESION_RSSI} STORED",
+        f"CREATE INDEX bench_meta_rssi_col ON {TABLA} (meta_rssi)",
+    ]),
+]
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _crear_tabla(cursor, filas):
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+    cursor.execute(f"""
+        CREATE UNLOGGED TABLE {TABLA} (
+            id bigserial PRIMARY KEY,
+            sensor_id bigint NOT NULL,
+            valor double precision NOT NULL,
+            timestamp timestamptz NOT NULL,
+            metadata_json jsonb NOT NULL
+        )
+    """)
+    # RSSI entre -40 y -120 (~2.5% por debajo de -118), un 0.1% de lecturas
+    # con firmware beta y un 1% con rssi no numérico
+    cursor.execute(f"""
+        INSERT INTO {TABLA} (sensor_id, valor, timestamp, metadata_json)
+        SELECT g %% 1000, random() * 100, now() - g * interval '1 second',
+               jsonb_build_object(
+                   'rssi', CASE WHEN g %% 100 = 0 THEN to_jsonb('n/a'::text)
+                                ELSE to_jsonb(-40 - (g %% 81)) END,
+                   'bateria', g %% 101,
+                   'version_firmware', CASE WHEN g %% 1000 = 0 THEN '2.0.0-beta'
+                                            ELSE '1.' || (g %% 5) || '.0' END,
+                   'calidad', CASE WHEN g %% 3 = 0 THEN 'buena' ELSE 'regular' END
+               )
+        FROM generate_series(1, %s) g
+    """, [filas])
+    cursor.execute(f"VACUUM ANALYZE {TABLA}")
+
+
+def _tamano(cursor, relacion):
+    cursor.execute("SELECT pg_size_pretty(pg_relation_size(%s))", [relacion])
+    return cursor.fetchone()[0]
+
+
+def _medir(cursor, sql, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    cursor.execute(f"EXPLAIN {sql}")
+    plan = cursor.fetchall()
+    nodo = next((linea[0].strip() for linea in plan if 'Scan' in linea[0]), plan[0][0])
+    return statistics.median(tiempos), nodo.split('  (')[0]
+
+
+def _deshacer(cursor):
+    """Quita índices y columna generada para medir cada estrategia por separado"""
+    cursor.execute(
+        "SELECT indexrelid::regclass::text FROM pg_index "
+        "WHERE indrelid = %s::regclass AND NOT indisprimary", [TABLA]
+    )
+    for (indice,) in cursor.fetchall():
+        cursor.execute(f"DROP INDEX {indice}")
+    cursor.execute(f"ALTER TABLE {TABLA} DROP COLUMN IF EXISTS meta_rssi")
+
+
+def _medir_insercion(cursor, lote):
+    """Milisegundos para insertar un lote con los índices actuales"""
+    inicio = time.perf_counter()
+    cursor.execute(f"""
+        INSERT INTO {TABLA} (sensor_id, valor, timestamp, metadata_json)
+        SELECT g %% 1000, 1, now(), jsonb_build_object('rssi', -60, 'bateria', 50,
+               'version_firmware', '1.0.0', 'calidad', 'buena')
+        FROM generate_series(1, %s) g
+    """, [lote])
+    return (time.perf_counter() - inicio) * 1000
+
+
+def ejecutar(filas, repeticiones, lote_insercion, conservar):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        print(f'Creando {TABLA} con {filas:,} filas...')
+        inicio = time.perf_counter()
+        _crear_tabla(cursor, filas)
+        print(f'  {time.perf_counter() - inicio:.1f} s, tabla {_tamano(cursor, TABLA)}\n')
+
+        for nombre, sentencias in ESTRATEGIAS:
+            inicio = time.perf_counter()
+            for sql in sentencias:
+                cursor.execute(sql)
+            cursor.execute(f"ANALYZE {TABLA}")
+            construccion = time.perf_counter() - inicio
+
+            print(f'== {nombre} (construcción {construccion:.1f} s)')
+            cursor.execute(
+                "SELECT indexrelid::regclass::text FROM pg_index "
+                "WHERE indrelid = %s::regclass AND NOT indisprimary", [TABLA]
+            )
+            for (indice,) in cursor.fetchall():
+                print(f'   índice {indice}: {_tamano(cursor, indice)}')
+            print(f'   tabla: {_tamano(cursor, TABLA)}')
+            print(f'   inserción de {lote_insercion:,} filas: {_medir_insercion(cursor, lote_insercion):.1f} ms')
+
+            for consulta, sql in CONSULTAS.items():
+                if 'meta_rssi ' in sql and nombre != 'columna_generada':
+                    continue
+                mediana, nodo = _medir(cursor, sql, repeticiones)
+                print(f'   {consulta:<16} {mediana:>10.1f} ms  {nodo}')
+            print()
+            _deshacer(cursor)
+
+        if not conservar:
+            cursor.execute(f"DROP TABLE {TABLA}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=50_000_000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--lote-insercion', type=int, default=10_000)
+    parser.add_argument('--conservar', action='store_true', help='No borrar la tabla al terminar')
+    args = parser.parse_args()
+
+    _configurar_django()
+    ejecutar(args.filas, args.repeticiones, args.lote_insercion, args.conservar)
+
+
+if __name__ == '__main__':
+    main()
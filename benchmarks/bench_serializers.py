@@ -0,0 +1,130 @@
+"""
+Benchmark de serialización de listados: DRF vs ValuesSerializer
+
+Crea una flota sintética (apps.devices.flota) y serializa la misma página
+de lecturas y de dispositivos con el ModelSerializer y con
+apps.accounts.fast_serializers.ValuesSerializer, incluyendo la consulta y
+el render a JSON. Reporta filas por segundo de cada uno y verifica que el
+JSON producido sea idéntico byte a byte. La flota se borra al terminar.
+
+Uso:
+    python -m benchmarks.bench_serializers --dispositivos 200 --sensores 4 --lecturas 50 --filas 1000
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+PREFIJO = 'bench-ser'
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _casos(filas):
+    """[(nombre, clase del serializer, campos, queryset, method_fields)] como los arman las vistas"""
+    from django.db.models import Count
+
+    from apps.devices.flota import dispositivos_de_flota
+    from apps.devices.serializers import DispositivoSerializer
+    from apps.readings.models import Lectura
+    from apps.readings.serializers import LecturaSerializer
+
+    dispositivos = dispositivos_de_flota(PREFIJO)
+    lecturas = Lectura.objects.filter(dispositivo__in=dispositivos).order_by('-timestamp')
+    meta = LecturaSerializer.Meta
+    expandidos = set(meta.list_fields).union(*meta.expandable_fields.values())
+
+    return [
+        ('lecturas_compactas', LecturaSerializer, set(meta.list_fields),
+         lecturas.defer('metadata_json')[:filas], {}),
+        ('lecturas_expandidas', LecturaSerializer, expandidos,
+         lecturas.select_related('dispositivo', 'sensor')[:filas], {}),
+        ('dispositivos', DispositivoSerializer, set(DispositivoSerializer.Meta.list_fields),
+         dispositivos.select_related('operador_asignado')
+         .annotate(num_sensores=Count('dispositivosensor')).order_by('-created_at')[:filas],
+         {'cantidad_sensores': 'num_sensores'}),
+    ]
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        contenido = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), contenido
+
+
+def ejecutar(dispositivos, sensores, lecturas, filas, repeticiones, conservar=False):
+    """
+    Compara ambos serializers en cada caso
+
+    Returns:
+        dict: {caso: {'filas', 'drf_filas_s', 'rapido_filas_s', 'aceleracion', 'identico'}}
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from apps.accounts.fast_serializers import ValuesSerializer
+    from apps.devices.flota import crear_flota, eliminar_flota
+
+    eliminar_flota(PREFIJO)
+    creados = crear_flota(dispositivos, sensores, lecturas, prefijo=PREFIJO)
+    print(f"Flota: {creados['dispositivos']} dispositivos, {creados['sensores']} sensores, "
+          f"{creados['lecturas']} lecturas\n")
+
+    renderer = JSONRenderer()
+    resultados = {}
+    try:
+        print(f"{'Caso':<22} {'filas':>6} {'DRF filas/s':>12} {'rápido filas/s':>15} {'x':>6}  JSON")
+        for nombre, clase, campos, queryset, method_fields in _casos(filas):
+            rapido = ValuesSerializer(clase(fields=campos), method_fields)
+            n = len(queryset)
+
+            drf_s, drf_json = _medir(
+                lambda: renderer.render(clase(queryset.all(), many=True, fields=campos).data), repeticiones,
+            )
+            rapido_s, rapido_json = _medir(
+                lambda: renderer.render(rapido.to_representation(rapido.values(queryset.all()))), repeticiones,
+            )
+
+            resultados[nombre] = {
+                'filas': n,
+                'drf_filas_s': round(n / drf_s),
+                'rapido_filas_s': round(n / rapido_s),
+                'aceleracion': round(drf_s / rapido_s, 2),
+                'identico': drf_json == rapido_json,
+            }
+            r = resultados[nombre]
+            print(f"{nombre:<22} {n:>6} {r['drf_filas_s']:>12} {r['rapido_filas_s']:>15} "
+                  f"{r['aceleracion']:>6}  {'idéntico' if r['identico'] else 'DISTINTO'}")
+    finally:
+        if not conservar:
+            eliminar_flota(PREFIJO)
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dispositivos', type=int, default=200)
+    parser.add_argument('--sensores', type=int, default=4)
+    parser.add_argument('--lecturas', type=int, default=50)
+    parser.add_argument('--filas', type=int, default=1000, help='Filas por página serializada')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--conservar', action='store_true', help='No borrar la flota al terminar')
+    args = parser.parse_args()
+
+    _configurar_django()
+    resultados = ejecutar(args.dispositivos, args.sensores, args.lecturas, args.filas,
+                          args.repeticiones, conservar=args.conservar)
+    if not all(r['identico'] for r in resultados.values()):
+        raise SystemExit('El JSON de ValuesSerializer difiere del de DRF')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+"""
+Simulador de carga: publica lecturas de una flota sintética
+
+Cada sensor de la flota (apps.devices.flota, ver `manage.py generar_flota`)
+publica una lectura cada `publish_interval` segundos, dividido por
+--velocidad y con ±--jitter de variación, durante --duracion segundos. Un
+solo event loop de asyncio maneja todos los sensores.
+
+Destinos:
+- mqtt: publica con QoS 1 en iot/sensors/<identificador>/<sufijo> del
+  broker. Cada dispositivo se conecta con su usuario EMQX y la contraseña
+  de la flota; con --usuario (superusuario MQTT) se usan --conexiones
+  conexiones compartidas. La latencia es publicación -> PUBACK y, con
+  --monitor, publicación -> entrega a un suscriptor.
+- http: agrupa las lecturas en lotes de hasta --lote y las envía a
+  POST /api/readings/bulk/ con --concurrencia peticiones en paralelo. La
+  latencia va desde que se genera la lectura hasta la respuesta.
+
+Reporta tasa objetivo y lograda, latencias p50/p95/p99 y errores.
+
+Uso:
+    python -m benchmarks.simular_carga --prefijo flota --destino mqtt --password <pass> --duracion 60
+    python -m benchmarks.simular_carga --prefijo flota --destino http --token <jwt> --velocidad 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+
+LOTE_HTTP = 500
+
+
+def _configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def cargar_sensores(prefijo):
+    """Sensores de la flota con lo necesario para simularlos (usa la base de datos)"""
+    from apps.devices.flota import dispositivos_de_flota
+    from apps.devices.models import DispositivoSensor
+
+    filas = DispositivoSensor.objects.filter(
+        dispositivo__in=dispositivos_de_flota(prefijo), activo=True,
+    ).values_list(
+        'dispositivo_id', 'sensor_id', 'dispositivo__identificador_unico', 'dispositivo__mqtt_client_id',
+        'sensor__mqtt_topic_suffix', 'sensor__tipo', 'sensor__publish_interval',
+        'sensor__rango_min', 'sensor__rango_max',
+    )
+    return [
+        {
+            'dispositivo': dispositivo_id,
+            'sensor': sensor_id,
+            'identificador': identificador,
+            'client_id': client_id or f'device_{identificador}',
+            'topic': f'iot/sensors/{identificador}/{sufijo or tipo}',
+            'intervalo': intervalo or 60,
+            'minimo': minimo,
+            'maximo': maximo,
+        }
+        for (dispositivo_id, sensor_id, identificador, client_id, sufijo, tipo,
+             intervalo, minimo, maximo) in filas
+    ]
+
+
+class Resultados:
+    """Contadores y latencias de una simulación"""
+
+    def __init__(self):
+        self.enviadas = 0
+        self.confirmadas = 0
+        self.errores = Counter()
+        self.latencias = []
+        self.latencias_entrega = []
+
+    def error(self, motivo, cantidad=1):
+        self.errores[motivo] += cantidad
+
+    def resumen(self, duracion_s, tasa_objetivo):
+        resumen = {
+            'duracion_s': round(duracion_s, 1),
+            'tasa_objetivo': round(tasa_objetivo, 1),
+            'tasa_lograda': round(self.confirmadas / duracion_s, 1) if duracion_s else 0,
+            'enviadas': self.enviadas,
+            'confirmadas': self.confirmadas,
+            'errores': dict(self.errores),
+        }
+        for nombre, valores in (('latencia', self.latencias), ('latencia_entrega', self.latencias_entrega)):
+            if valores:
+                resumen[nombre] = {
+                    'p50_ms': round(statistics.median(valores), 2),
+                    'p95_ms': round(_percentil(valores, 95), 2),
+                    'p99_ms': round(_percentil(valores, 99), 2),
+                    'max_ms': round(max(valores), 2),
+                }
+        return resumen
+
+
+def _lectura(sensor, rng):
+    return {
+        'dispositivo': sensor['dispositivo'],
+        'sensor': sensor['sensor'],
+        'valor': round(rng.uniform(sensor['minimo'], sensor['maximo']), 2),
+        'metadata_json': {'rssi': rng.randint(-120, -40), 'bateria': rng.randint(0, 100)},
+    }
+
+
+class _ClienteMQTT:
+    """
+    Cliente paho integrado al event loop de asyncio
+
+    paho 1.x no es asyncio; en lugar de un hilo loop_start() por conexión
+    se registran sus sockets en el loop (patrón de los ejemplos de paho).
+    """
+
+    def __init__(self, loop, client_id, username, password):
+        import paho.mqtt.client as mqtt
+
+        self.loop = loop
+        self.conectado = loop.create_future()
+        self.client = mqtt.Client(client_id=client_id, clean_session=True)
+        self.client.username_pw_set(username, password)
+        self.client.on_connect = self._on_connect
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+        self._misc = None
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if not self.conectado.done():
+            self.conectado.set_result(rc)
+
+    def _on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+        self._misc = self.loop.create_task(self._loop_misc())
+
+    def _on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        if self._misc:
+            self._misc.cancel()
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def _loop_misc(self):
+        while self.client.loop_misc() == 0:
+            await asyncio.sleep(1)
+
+    async def conectar(self, host, port, timeout=10):
+        self.client.connect(host, port, keepalive=60)
+        return await asyncio.wait_for(self.conectado, timeout)
+
+    def desconectar(self):
+        self.client.disconnect()
+
+
+class DestinoMQTT:
+    def __init__(self, sensores, resultados, host, port, password=None, usuario=None,
+                 conexiones=10, monitor=False):
+        self.sensores = sensores
+        self.resultados = resultados
+        self.host, self.port = host, port
+        self.password, self.usuario = password, usuario
+        self.conexiones = conexiones
+        self.monitor = monitor
+        self._clientes = {}
+        self._pendientes = {}
+        self._monitor = None
+
+    async def iniciar(self):
+        loop = asyncio.get_running_loop()
+        if self.usuario:
+            claves = [f'pool-{i}' for i in range(self.conexiones)]
+            credenciales = {clave: (f'sim-{os.getpid()}-{clave}', self.usuario) for clave in claves}
+        else:
+            claves = sorted({sensor['client_id'] for sensor in self.sensores})
+            credenciales = {clave: (clave, clave) for clave in claves}
+
+        for clave, (client_id, username) in credenciales.items():
+            cliente = _ClienteMQTT(loop, client_id, username, self.password)
+            cliente.client.on_publish = (
+                lambda client, userdata, mid, _clave=clave: self._confirmada(_clave, mid)
+            )
+            self._clientes[clave] = cliente
+
+        resultados = await asyncio.gather(
+            *(cliente.conectar(self.host, self.port) for cliente in self._clientes.values()),
+            return_exceptions=True,
+        )
+        fallidas = [r for r in resultados if r != 0]
+        for r in fallidas:
+            self.resultados.error(f'conexion: {r!r}' if isinstance(r, Exception) else f'conexion rc={r}')
+
+        if self.usuario:
+            claves = list(self._clientes)
+            for i, sensor in enumerate(self.sensores):
+                sensor['_cliente'] = claves[i % len(claves)]
+        else:
+            for sensor in self.sensores:
+                sensor['_cliente'] = sensor['client_id']
+
+        if self.monitor:
+            self._monitor = _ClienteMQTT(loop, f'sim-{os.getpid()}-monitor', self.usuario, self.password)
+            self._monitor.client.on_message = self._entregada
+            await self._monitor.conectar(self.host, self.port)
+            # Solo las lecturas del simulador traen 'enviado'; el resto se ignora
+            self._monitor.client.subscribe('iot/sensors/#', qos=0)
+
+    async def enviar(self, sensor, lectura):
+        cliente = self._clientes[sensor['_cliente']]
+        if not cliente.conectado.done() or cliente.conectado.result() != 0:
+            self.resultados.error('sin conexion')
+            return
+        lectura['enviado'] = time.time()
+        info = cliente.client.publish(sensor['topic'], json.dumps(lectura), qos=1)
+        self.resultados.enviadas += 1
+        if info.rc != 0:
+            self.resultados.error(f'publish rc={info.rc}')
+            return
+        self._pendientes[(sensor['_cliente'], info.mid)] = time.perf_counter()
+
+    def _confirmada(self, clave, mid):
+        inicio = self._pendientes.pop((clave, mid), None)
+        if inicio is not None:
+            self.resultados.confirmadas += 1
+            self.resultados.latencias.append((time.perf_counter() - inicio) * 1000)
+
+    def _entregada(self, client, userdata, message):
+        try:
+            enviado = json.loads(message.payload)['enviado']
+        except (ValueError, KeyError, TypeError):
+            return
+        self.resultados.latencias_entrega.append((time.time() - enviado) * 1000)
+
+    async def terminar(self, espera=5):
+        # Dar tiempo a los PUBACK pendientes
+        limite = time.perf_counter() + espera
+        while self._pendientes and time.perf_counter() < limite:
+            await asyncio.sleep(0.1)
+        if self._pendientes:
+            self.resultados.error('sin PUBACK', len(self._pendientes))
+        for cliente in list(self._clientes.values()) + ([self._monitor] if self._monitor else []):
+            cliente.desconectar()
+        await asyncio.sleep(0.1)
+
+
+class DestinoHTTP:
+    def __init__(self, resultados, url, token, lote=LOTE_HTTP, concurrencia=4):
+        self.resultados = resultados
+        self.url = url.rstrip('/') + '/api/readings/bulk/'
+        self.token = token
+        self.lote = lote
+        self.concurrencia = concurrencia
+        self._cola = None
+        self._trabajadores = []
+
+    async def iniciar(self):
+        import requests
+
+        self._session = requests.Session()
+        self._session.headers['Authorization'] = f'Bearer {self.token}'
+        self._cola = asyncio.Queue()
+        self._trabajadores = [asyncio.create_task(self._trabajar()) for _ in range(self.concurrencia)]
+
+    async def enviar(self, sensor, lectura):
+        self.resultados.enviadas += 1
+        await self._cola.put((time.perf_counter(), lectura))
+
+    async def _trabajar(self):
+        while True:
+            items = [await self._cola.get()]
+            # Completar el lote con lo que ya esté en cola, sin esperar más de 1 s
+            limite = time.perf_counter() + 1
+            while len(items) < self.lote and time.perf_counter() < limite:
+                try:
+                    items.append(self._cola.get_nowait())
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.05)
+            await self._enviar_lote(items)
+            for _ in items:
+                self._cola.task_done()
+
+    async def _enviar_lote(self, items):
+        try:
+            response = await asyncio.to_thread(
+                self._session.post, self.url, json={'lecturas': [lectura for _, lectura in items]}, timeout=30,
+            )
+        except Exception as e:
+            self.resultados.error(type(e).__name__, len(items))
+            return
+        fin = time.perf_counter()
+        if response.status_code not in (200, 201):
+            self.resultados.error(f'HTTP {response.status_code}', len(items))
+            return
+        rechazadas = response.json().get('rechazadas', 0)
+        if rechazadas:
+            self.resultados.error('rechazadas', rechazadas)
+        self.resultados.confirmadas += len(items) - rechazadas
+        self.resultados.latencias.extend((fin - inicio) * 1000 for inicio, _ in items)
+
+    async def terminar(self, espera=30):
+        try:
+            await asyncio.wait_for(self._cola.join(), espera)
+        except asyncio.TimeoutError:
+            self.resultados.error('sin respuesta', self._cola.qsize())
+        for trabajador in self._trabajadores:
+            trabajador.cancel()
+
+
+async def _simular_sensor(destino, sensor, fin, velocidad, jitter, rng):
+    intervalo = sensor['intervalo'] / velocidad
+    loop = asyncio.get_running_loop()
+    # Desfase inicial aleatorio para que los sensores no publiquen a la vez
+    proximo = loop.time() + rng.uniform(0, intervalo)
+    while proximo < fin:
+        await asyncio.sleep(max(0, proximo - loop.time()))
+        await destino.enviar(sensor, _lectura(sensor, rng))
+        proximo += intervalo * (1 + rng.uniform(-jitter, jitter))
+
+
+async def simular(sensores, destino, resultados, duracion, velocidad=1.0, jitter=0.1, semilla=42):
+    """
+    Publica las lecturas de `sensores` en `destino` durante `duracion` segundos
+
+    Returns:
+        dict: Resumen (ver Resultados.resumen)
+    """
+    rng = random.Random(semilla)
+    await destino.iniciar()
+    loop = asyncio.get_running_loop()
+    inicio = loop.time()
+    fin = inicio + duracion
+    await asyncio.gather(*(
+        _simular_sensor(destino, sensor, fin, velocidad, jitter, rng) for sensor in sensores
+    ))
+    await destino.terminar()
+    tasa_objetivo = sum(velocidad / sensor['intervalo'] for sensor in sensores)
+    return resultados.resumen(loop.time() - inicio, tasa_objetivo)
+
+
+def ejecutar(prefijo, destino, duracion, velocidad=1.0, jitter=0.1, host='localhost', port=1883,
+             password=None, usuario=None, conexiones=10, monitor=False, url='http://localhost:8000',
+             token=None, lote=LOTE_HTTP, concurrencia=4):
+    sensores = cargar_sensores(prefijo)
+    if not sensores:
+        raise RuntimeError(f"La flota '{prefijo}' no tiene sensores activos")
+
+    resultados = Resultados()
+    if destino == 'mqtt':
+        if not password:
+            raise RuntimeError('El destino mqtt requiere --password')
+        if monitor and not usuario:
+            raise RuntimeError('--monitor requiere --usuario (superusuario MQTT)')
+        salida = DestinoMQTT(sensores, resultados, host, port, password, usuario, conexiones, monitor)
+    else:
+        if not token:
+            raise RuntimeError('El destino http requiere --token')
+        salida = DestinoHTTP(resultados, url, token, lote, concurrencia)
+
+    return asyncio.run(simular(sensores, salida, resultados, duracion, velocidad, jitter))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--prefijo', default='flota')
+    parser.add_argument('--destino', choices=['mqtt', 'http'], default='mqtt')
+    parser.add_argument('--duracion', type=float, default=60)
+    parser.add_argument('--velocidad', type=float, default=1.0, help='Multiplica la tasa de publicación')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Variación del intervalo (0.1 = ±10%%)')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--password', help='Contraseña MQTT de la flota o de --usuario')
+    parser.add_argument('--usuario', help='Superusuario MQTT para conexiones compartidas')
+    parser.add_argument('--conexiones', type=int, default=10)
+    parser.add_argument('--monitor', action='store_true')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--token', help='Access token JWT para el destino http')
+    parser.add_argument('--lote', type=int, default=LOTE_HTTP)
+    parser.add_argument('--concurrencia', type=int, default=4)
+    parser.add_argument('--salida', help='Archivo JSON donde guardar el resumen')
+    args = parser.parse_args()
+
+    _configurar_django()
+    resumen = ejecutar(
+        args.prefijo, args.destino, args.duracion, args.velocidad, args.jitter, args.host, args.port,
+        args.password, args.usuario, args.conexiones, args.monitor, args.url, args.token,
+        args.lote, args.concurrencia,
+    )
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as salida:
+            json.dump(resumen, salida, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
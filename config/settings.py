@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Métricas Prometheus: primero para medir la petición completa
+    'apps.accounts.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Must be before CommonMiddleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,7 +79,19 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
-
+#
+# Conexiones persistentes: cada hilo que atiende peticiones reutiliza su
+# conexión durante DB_CONN_MAX_AGE segundos en lugar de abrir una (TCP/TLS +
+# autenticación) por petición; 0 vuelve a una conexión por petición. Con
+# DB_CONN_HEALTH_CHECKS la conexión reutilizada se verifica al empezar cada
+# petición y se reabre si PostgreSQL (o un reinicio/failover) la cerró.
+# Cada hilo mantiene su propia conexión abierta: el total es
+# instancias × workers × hilos por worker, más una por proceso del escritor
+# de AccessLog, y debe quedar por debajo de max_connections de PostgreSQL
+# (menos superuser_reserved_connections y las de EMQX y los comandos). Con
+# más workers que conexiones disponibles, usar PgBouncer en modo transaction
+# y DB_CONN_MAX_AGE=0. runserver cierra la conexión de cada petición (un
+# hilo por petición): solo se reutilizan con gunicorn/uwsgi
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -86,6 +100,23 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='iot_password_123'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+        },
+    }
+}
+
+# Caché (estadísticas del dashboard, respuestas de la API, ...)
+# LocMemCache es por proceso: con varios workers cada uno cachea por su
+# cuenta y las invalidaciones no se comparten, solo vence el TTL. Para una
+# caché compartida: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# y CACHE_LOCATION=redis://localhost:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
     }
 }
 
@@ -139,12 +170,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.accounts.pagination.StandardPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
@@ -153,9 +184,16 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
     'DATE_FORMAT': '%Y-%m-%d',
+    # JSON con orjson (apps.accounts.renderers / parsers); la API navegable
+    # solo en desarrollo
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'apps.accounts.renderers.OrjsonRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.accounts.parsers.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -174,6 +212,8 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    # El refresh agrega los claims de JWT_STATELESS_CLAIMS, como el login
+    'TOKEN_REFRESH_SERIALIZER': 'apps.accounts.serializers.TokenRefreshWithClaimsSerializer',
 }
 
 # CORS Configuration
@@ -223,6 +263,124 @@ EMQX_CONFIG = {
     'TOPIC_PREFIX': config('EMQX_MQTT_TOPIC_PREFIX', default='iot/sensors'),
 }
 
+# Detección de brechas en lecturas (apps.readings.brechas)
+# Se considera brecha cuando pasan más de FACTOR x intervalo esperado sin lecturas
+LECTURAS_BRECHA_FACTOR = config('LECTURAS_BRECHA_FACTOR', default=2.0, cast=float)
+LECTURAS_INTERVALO_DEFAULT = config('LECTURAS_INTERVALO_DEFAULT', default=60, cast=int)
+LECTURAS_BRECHAS_VENTANA_HORAS = config('LECTURAS_BRECHAS_VENTANA_HORAS', default=24, cast=int)
+
+# Detección de anomalías en lecturas (apps.readings.anomalias)
+# Puntajes mayores al umbral se guardan en lecturas_anomalias
+ANOMALIAS_VENTANA = config('ANOMALIAS_VENTANA', default=30, cast=int)
+ANOMALIAS_EWMA_ALPHA = config('ANOMALIAS_EWMA_ALPHA', default=0.05, cast=float)
+ANOMALIAS_UMBRAL_ZSCORE = config('ANOMALIAS_UMBRAL_ZSCORE', default=3.5, cast=float)
+ANOMALIAS_UMBRAL_EWMA = config('ANOMALIAS_UMBRAL_EWMA', default=3.5, cast=float)
+ANOMALIAS_UMBRAL_MAD = config('ANOMALIAS_UMBRAL_MAD', default=3.5, cast=float)
+ANOMALIAS_NOTIFICAR = config('ANOMALIAS_NOTIFICAR', default=False, cast=bool)
+
+# Reglas de alerta (apps.readings.alertas)
+# Cada proceso recarga su índice de reglas con esta frecuencia como máximo
+ALERTAS_RECARGA_SEGUNDOS = config('ALERTAS_RECARGA_SEGUNDOS', default=30, cast=int)
+
+# Registro de accesos (apps.accounts.access_log_writer)
+# Los AccessLog se guardan por lotes en un hilo; con ACCESS_LOG_ASYNC=False
+# se guardan dentro del request como antes
+ACCESS_LOG_ASYNC = config('ACCESS_LOG_ASYNC', default=True, cast=bool)
+ACCESS_LOG_QUEUE_SIZE = config('ACCESS_LOG_QUEUE_SIZE', default=10000, cast=int)
+ACCESS_LOG_BATCH_SIZE = config('ACCESS_LOG_BATCH_SIZE', default=500, cast=int)
+ACCESS_LOG_FLUSH_INTERVAL_MS = config('ACCESS_LOG_FLUSH_INTERVAL_MS', default=1000, cast=int)
+# Muestreo: errores (>= 400) y peticiones lentas se registran siempre; el
+# resto con la tasa de su módulo (ver AccessLogMiddleware.MODULE_MAP),
+# p. ej. ACCESS_LOG_SAMPLE_RATES=readings=0.05,devices=0.5
+ACCESS_LOG_SAMPLE_RATE_DEFAULT = config('ACCESS_LOG_SAMPLE_RATE_DEFAULT', default=1.0, cast=float)
+ACCESS_LOG_SAMPLE_RATES = {
+    module: float(rate)
+    for module, rate in (
+        item.split('=', 1) for item in config('ACCESS_LOG_SAMPLE_RATES', default='', cast=Csv())
+    )
+}
+# Expresiones regulares de endpoints que nunca se registran, separadas por ';'
+ACCESS_LOG_EXCLUDE_PATTERNS = config('ACCESS_LOG_EXCLUDE_PATTERNS', default='', cast=Csv(delimiter=';'))
+
+# Particiones mensuales y retención de access_logs/audit_logs (apps.accounts.partitions)
+# Días de retención, 0 = sin límite; las particiones vencidas se exportan a
+# LOG_ARCHIVE_DIR (csv.gz) antes de borrarse si está configurado
+ACCESS_LOG_RETENTION_DAYS = config('ACCESS_LOG_RETENTION_DAYS', default=30, cast=int)
+AUDIT_LOG_RETENTION_DAYS = config('AUDIT_LOG_RETENTION_DAYS', default=730, cast=int)
+LOG_PARTITIONS_AHEAD_MONTHS = config('LOG_PARTITIONS_AHEAD_MONTHS', default=3, cast=int)
+LOG_ARCHIVE_DIR = config('LOG_ARCHIVE_DIR', default='')
+
+# Métricas Prometheus (apps.accounts.metrics), expuestas en /metrics
+# Con varios workers (gunicorn) definir PROMETHEUS_MULTIPROC_DIR con un
+# directorio vacío al arrancar para sumar las métricas de todos los procesos;
+# gunicorn.conf.py marca los workers que terminan (child_exit)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default='')
+if PROMETHEUS_MULTIPROC_DIR:
+    # prometheus_client lee la variable al importarse, después de settings
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', PROMETHEUS_MULTIPROC_DIR)
+
+# Presupuesto de consultas SQL por petición (apps.accounts.query_budget)
+# Para desarrollo y CI: avisa (o falla con QUERY_BUDGET_RAISE) cuando una vista
+# supera su presupuesto o repite una consulta (N+1). Presupuestos por vista
+# con su view_name, p. ej. QUERY_BUDGET_PER_VIEW=device-list=5,reading-list=4
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=False, cast=bool)
+QUERY_BUDGET_RAISE = config('QUERY_BUDGET_RAISE', default=False, cast=bool)
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=20, cast=int)
+QUERY_BUDGET_PER_VIEW = {
+    view: int(budget)
+    for view, budget in (
+        item.split('=', 1) for item in config('QUERY_BUDGET_PER_VIEW', default='', cast=Csv())
+    )
+}
+QUERY_BUDGET_REPEAT_THRESHOLD = config('QUERY_BUDGET_REPEAT_THRESHOLD', default=5, cast=int)
+QUERY_BUDGET_REPORT_FILE = config('QUERY_BUDGET_REPORT_FILE', default='')
+if QUERY_BUDGET_ENABLED:
+    MIDDLEWARE.insert(MIDDLEWARE.index('apps.accounts.middleware.MetricsMiddleware') + 1,
+                      'apps.accounts.middleware.QueryBudgetMiddleware')
+
+# Estadísticas del dashboard (apps.accounts.dashboard)
+# Segundos en caché; total_lecturas usa la estimación de PostgreSQL cuando
+# supera DASHBOARD_EXACT_COUNT_LIMIT filas y el conteo exacto por debajo;
+# mis_lecturas de los operadores se cuenta hasta ese límite y luego se estima
+DASHBOARD_CACHE_SECONDS = config('DASHBOARD_CACHE_SECONDS', default=30, cast=int)
+DASHBOARD_EXACT_COUNT_LIMIT = config('DASHBOARD_EXACT_COUNT_LIMIT', default=100000, cast=int)
+
+# Usuarios autenticados por JWT (apps.accounts.authentication)
+# Segundos que se guarda el usuario con su rol y permisos; guardarlo o
+# cambiar roles/permisos lo descarta antes
+AUTH_USER_CACHE_SECONDS = config('AUTH_USER_CACHE_SECONDS', default=60, cast=int)
+
+# Tokens JWT con claims (apps.accounts.authentication)
+# True: login_view agrega rol, permisos y dispositivos asignados al access
+# token y /api/readings/ confía en ellos sin leer el usuario. Conviene con
+# un JWT_ACCESS_TOKEN_LIFETIME corto. Las revocaciones llegan a cada
+# proceso en JWT_DENYLIST_REFRESH_SECONDS como máximo
+JWT_STATELESS_CLAIMS = config('JWT_STATELESS_CLAIMS', default=False, cast=bool)
+JWT_DENYLIST_REFRESH_SECONDS = config('JWT_DENYLIST_REFRESH_SECONDS', default=10, cast=int)
+
+# Claves de API de dispositivos (apps.devices.authentication)
+# Segundos que cada proceso guarda una clave con su dispositivo y sensores;
+# en el proceso que la modifica se descarta antes. Una clave revocada deja
+# de valer en los demás procesos en este tiempo como máximo
+DEVICE_API_KEY_CACHE_SECONDS = config('DEVICE_API_KEY_CACHE_SECONDS', default=60, cast=int)
+
+# Caché de respuestas (apps.accounts.response_cache)
+# Segundos que se guarda cada respuesta; las señales de los modelos la
+# invalidan antes, este límite cubre escrituras por lotes y otros procesos
+# con LocMemCache. 0 desactiva la caché
+RESPONSE_CACHE_SECONDS = config('RESPONSE_CACHE_SECONDS', default=300, cast=int)
+
+# Estado de conexión de la flota (apps.mqtt.fleet_status)
+# Cada proceso recarga sus contadores con esta frecuencia como máximo
+FLEET_STATUS_REFRESH_SECONDS = config('FLEET_STATUS_REFRESH_SECONDS', default=30, cast=int)
+
+# Serialización rápida de listados (apps.accounts.fast_serializers)
+# Arma la respuesta desde values_list() en lugar de instancias del modelo;
+# la salida es la misma, False vuelve a los serializers de DRF
+FAST_SERIALIZERS_ENABLED = config('FAST_SERIALIZERS_ENABLED', default=True, cast=bool)
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
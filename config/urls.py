@@ -4,6 +4,7 @@ URL configuration for iot_sensor_platform project.
 
 from django.contrib import admin
 from django.urls import path, include
+from apps.accounts.metrics import metrics_view
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -14,6 +15,9 @@ urlpatterns = [
     # Django Admin
     path('admin/', admin.site.urls),
     
+    # Métricas Prometheus
+    path('metrics', metrics_view, name='metrics'),
+    
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
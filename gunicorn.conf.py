@@ -0,0 +1,23 @@
+"""
+Configuración de gunicorn
+
+gunicorn la carga sola desde el directorio de trabajo:
+    gunicorn config.wsgi:application --workers 4
+
+Con PROMETHEUS_MULTIPROC_DIR (métricas de varios workers, ver
+apps.accounts.metrics) el directorio debe estar vacío al arrancar y cada
+worker que termina se marca como muerto: si no, los gauges "livesum"
+(p. ej. access_log_queue_depth) siguen sumando sus últimos valores.
+"""
+
+from decouple import config
+
+# Misma variable que config/settings.py (el proceso maestro no carga Django)
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default='')
+
+
+def child_exit(server, worker):
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid, PROMETHEUS_MULTIPROC_DIR)